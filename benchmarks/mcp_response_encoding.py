@@ -0,0 +1,78 @@
+"""Benchmark: bytes and milliseconds to encode large MCP tool responses.
+
+Encodes a synthetic get_attendance_records-style result the way
+call_mcp_tool does for each response format: indented JSON of row dicts
+("json", the default) and column/row arrays ("compact", orjson-backed when
+orjson is installed).
+
+    python benchmarks/mcp_response_encoding.py --rows 10000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from teacher_assistant import server  # noqa: E402
+
+
+def make_result(rows: int) -> dict:
+    start = date(2025, 1, 1)
+    created = datetime(2025, 1, 1, 8, 30)
+    records = [
+        {
+            "id": i,
+            "student_id": 1000 + i % 500,
+            "student_name": f"Student {i % 500}",
+            "attendance_date": start + timedelta(days=i % 180),
+            "status": ("present", "absent", "late")[i % 3],
+            "notes": None if i % 4 else "arrived after assembly",
+            "sentiment_score": Decimal("0.25"),
+            "created_at": created + timedelta(minutes=i),
+        }
+        for i in range(rows)
+    ]
+    return {
+        "success": True,
+        "message": f"Retrieved {rows} attendance records.",
+        "records": records,
+    }
+
+
+def measure(fn, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn()
+        best = min(best, time.perf_counter() - start)
+    return len(payload.encode("utf-8")), best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = make_result(args.rows)
+    cases = [
+        ("json", lambda: server.encode_tool_response(result, "json")),
+        ("json, no indent", lambda: json.dumps(
+            result, separators=(",", ":"), default=server.json_serializer
+        )),
+        ("compact", lambda: server.encode_tool_response(result, "compact")),
+    ]
+
+    print(f"rows: {args.rows}, orjson: {'yes' if server.orjson else 'no'}")
+    print(f"{'format':>16} {'bytes':>12} {'ms':>9}")
+    for name, fn in cases:
+        size, ms = measure(fn, args.repeat)
+        print(f"{name:>16} {size:>12,} {ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: process RSS while churning synthetic HTTP chat sessions.
+
+Creates sessions through the same InMemorySessionService + HttpSessionCache
+pair used by main.py and samples resident memory as they are added. With a
+bounded cache the RSS curve should flatten once the cache is full.
+
+    python benchmarks/session_cache_rss.py --sessions 1000000 --max-entries 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import psutil
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+warnings.filterwarnings("ignore")
+
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from teacher_assistant.session_store import (  # noqa: E402
+    HttpSessionCache,
+    estimate_session_bytes,
+)
+
+APP_NAME = "session-cache-benchmark"
+
+
+async def run(args):
+    session_service = InMemorySessionService()
+    cache = HttpSessionCache(
+        session_service,
+        APP_NAME,
+        max_entries=args.max_entries,
+        max_bytes=args.max_bytes,
+        ttl_seconds=args.ttl,
+    )
+    process = psutil.Process(os.getpid())
+    sample_every = max(1, args.sessions // 20)
+    start = time.perf_counter()
+
+    print(f"{'sessions':>10} {'cached':>8} {'rss_mb':>9} {'evictions':>10} {'elapsed_s':>10}")
+    for i in range(args.sessions):
+        session_id = f"bench-{i}"
+        user_id = f"user_{session_id}"
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+            state={"session_type": "http_chat"},
+        )
+        await cache.put(
+            session_id, {"user_id": user_id}, estimate_session_bytes(session)
+        )
+        # Touch a recent session to exercise the hit path as well
+        if i >= 10:
+            await cache.get(f"bench-{i - 10}")
+
+        if (i + 1) % sample_every == 0:
+            rss_mb = process.memory_info().rss / (1024 * 1024)
+            print(
+                f"{i + 1:>10} {len(cache):>8} {rss_mb:>9.1f} "
+                f"{cache.evictions:>10} {time.perf_counter() - start:>10.1f}"
+            )
+
+    print("cache stats:", cache.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024 * 1024)
+    parser.add_argument("--ttl", type=float, default=3600)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: session-creation latency with per-session vs shared Runner.
+
+"per-session" reproduces the old main.py behaviour (create_session followed
+by a new Runner for root_agent); "shared" only creates the session and
+reuses one process-wide Runner.
+
+    python benchmarks/session_creation.py --sessions 20000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+warnings.filterwarnings("ignore")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from teacher_assistant.agent import root_agent  # noqa: E402
+
+APP_NAME = "session-creation-benchmark"
+
+
+async def create_sessions(count: int, per_session_runner: bool):
+    session_service = InMemorySessionService()
+    shared_runner = Runner(
+        app_name=APP_NAME, agent=root_agent, session_service=session_service
+    )
+    runners = []
+    latencies = []
+
+    gc.collect()
+    tracemalloc.start()
+    for i in range(count):
+        start = time.perf_counter()
+        await session_service.create_session(
+            app_name=APP_NAME, user_id=f"user_{i}", session_id=f"session-{i}"
+        )
+        if per_session_runner:
+            runners.append(
+                Runner(
+                    app_name=APP_NAME,
+                    agent=root_agent,
+                    session_service=session_service,
+                )
+            )
+        else:
+            runners.append(shared_runner)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, peak
+
+
+def report(label: str, latencies: list, peak_bytes: int):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:>12}: mean {statistics.mean(latencies):8.1f} us  "
+        f"p50 {statistics.median(latencies):8.1f} us  p99 {p99:8.1f} us  "
+        f"peak traced {peak_bytes / (1024 * 1024):8.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"pid {os.getpid()}, {args.sessions} sessions per mode")
+    report("per-session", *asyncio.run(create_sessions(args.sessions, True)))
+    report("shared", *asyncio.run(create_sessions(args.sessions, False)))
+
+
+if __name__ == "__main__":
+    main()
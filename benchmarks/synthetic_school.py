@@ -0,0 +1,197 @@
+"""Synthetic school data for the database tool benchmarks.
+
+Generates a reproducible school (students across classes and sections, a
+teacher per subject, a parent per student, a school day of attendance per
+student, marks per subject each month, and behavior records on about a
+third of the days) and loads it through the server's sync engine with plain
+executemany inserts, so it works on every supported database. The rollups
+are then rebuilt the way check_summary_rollups repairs them.
+
+Synthetic students are numbered from FIRST_STUDENT_ID and synthetic users
+have @bench.example.com emails; drop() removes both. Point DATABASE_URL at
+the database to use, or at an SQLite file:
+
+    DATABASE_URL=sqlite:////tmp/school.db \\
+        python benchmarks/synthetic_school.py --students 500 --days 180
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+BENCH_CLASS_PREFIX = "BENCH"
+FIRST_STUDENT_ID = 9_000_000
+EMAIL_DOMAIN = "bench.example.com"
+FIRST_DAY = date(2030, 1, 1)
+SUBJECTS = ("Mathematics", "Science", "English", "History", "Geography")
+GRADES = ("A+", "A", "B+", "B", "C", "D")
+BEHAVIOUR_TYPES = ("participation", "homework", "conduct", "teamwork")
+STATUSES = ("present",) * 8 + ("absent", "late")
+SECTIONS = ("A", "B")
+STUDENTS_PER_SECTION = 40
+
+
+def school_days(days: int) -> list:
+    """The first `days` weekdays from FIRST_DAY."""
+    result, day = [], FIRST_DAY
+    while len(result) < days:
+        if day.weekday() < 5:
+            result.append(day)
+        day += timedelta(days=1)
+    return result
+
+
+def class_of(index: int) -> tuple:
+    """(class_value, section) of the index-th synthetic student."""
+    group = index // STUDENTS_PER_SECTION
+    return f"{BENCH_CLASS_PREFIX}{group // len(SECTIONS) + 1}", SECTIONS[group % len(SECTIONS)]
+
+
+def generate(students: int, days: int, seed: int = 0) -> dict:
+    """Rows per table for a synthetic school, as lists of parameter dicts."""
+    rng = random.Random(seed)
+    dates = school_days(days)
+    student_ids = [FIRST_STUDENT_ID + i for i in range(students)]
+
+    rows = {"students": [], "users": [], "attendance": [], "academic_records": [], "behavior_records": []}
+    for i, student_id in enumerate(student_ids):
+        class_value, section = class_of(i)
+        rows["students"].append({
+            "student_id": student_id,
+            "student_name": f"Bench Student {i:05d}",
+            "parent_name": f"Bench Parent {i:05d}",
+            "class_value": class_value,
+            "section": section,
+            "date_of_birth": date(2015, 1, 1) + timedelta(days=rng.randrange(1500)),
+            "gender": rng.choice(("female", "male")),
+        })
+        rows["users"].append({
+            "name": f"Bench Parent {i:05d}",
+            "email": f"parent{i}@{EMAIL_DOMAIN}",
+            "role": "parent",
+            "student_id": student_id,
+            "subject": None,
+        })
+    for subject in SUBJECTS:
+        rows["users"].append({
+            "name": f"Bench {subject} Teacher",
+            "email": f"{subject.lower()}@{EMAIL_DOMAIN}",
+            "role": "teacher",
+            "student_id": None,
+            "subject": subject,
+        })
+
+    # Marks are given on the last school day of each month
+    exam_days = [day for day, following in zip(dates, dates[1:] + [None])
+                 if following is None or following.month != day.month]
+    for student_id in student_ids:
+        for day in dates:
+            rows["attendance"].append({
+                "student_id": student_id,
+                "attendance_date": day,
+                "status": rng.choice(STATUSES),
+            })
+            if rng.random() < 0.3:
+                rows["behavior_records"].append({
+                    "student_id": student_id,
+                    "source": "benchmark",
+                    "record_date": day,
+                    "behaviour_type": rng.choice(BEHAVIOUR_TYPES),
+                    "sentiment_score": round(rng.uniform(-1, 1), 2),
+                })
+        for day in exam_days:
+            for subject in SUBJECTS:
+                rows["academic_records"].append({
+                    "student_id": student_id,
+                    "subject": subject,
+                    "grade": rng.choice(GRADES),
+                    "record_date": day,
+                })
+    return rows
+
+
+INSERTS = {
+    "students": """
+        INSERT INTO app.students
+        (student_id, student_name, parent_name, class_value, section, date_of_birth, gender)
+        VALUES (:student_id, :student_name, :parent_name, :class_value, :section, :date_of_birth, :gender)
+    """,
+    "users": """
+        INSERT INTO app.users (name, email, role, student_id, subject)
+        VALUES (:name, :email, :role, :student_id, :subject)
+    """,
+    "attendance": """
+        INSERT INTO app.attendance (student_id, attendance_date, status)
+        VALUES (:student_id, :attendance_date, :status)
+    """,
+    "academic_records": """
+        INSERT INTO app.academic_records (student_id, subject, grade, record_date, teacher_id)
+        VALUES (:student_id, :subject, :grade, :record_date, :teacher_id)
+    """,
+    "behavior_records": """
+        INSERT INTO app.behavior_records (student_id, source, record_date, behaviour_type, sentiment_score)
+        VALUES (:student_id, :source, :record_date, :behaviour_type, :sentiment_score)
+    """,
+}
+
+
+def load(server, students: int, days: int, seed: int = 0) -> dict:
+    """Loads a synthetic school and returns the row count per table."""
+    rows = generate(students, days, seed)
+    with server.engine.begin() as conn:
+        for table, query in INSERTS.items():
+            if table == "academic_records":
+                teachers = dict(conn.execute(
+                    text("SELECT subject, id FROM app.users WHERE role = 'teacher' AND email LIKE :emails"),
+                    {"emails": f"%@{EMAIL_DOMAIN}"},
+                ).fetchall())
+                for row in rows[table]:
+                    row["teacher_id"] = teachers[row["subject"]]
+            if rows[table]:
+                conn.execute(text(query), rows[table])
+    result = server.check_summary_rollups(repair=True)
+    assert result["success"], result
+    return {table: len(table_rows) for table, table_rows in rows.items()}
+
+
+def drop(server):
+    """Removes the synthetic students, their records and the synthetic users."""
+    with server.engine.begin() as conn:
+        params = {"first": FIRST_STUDENT_ID}
+        for table in ("attendance", "academic_records", "behavior_records", "attendance_monthly",
+                      "behavior_daily", "behavior_monthly", "students"):
+            conn.execute(text(f"DELETE FROM app.{table} WHERE student_id >= :first"), params)
+        conn.execute(
+            text("DELETE FROM app.users WHERE email LIKE :emails OR student_id >= :first"),
+            {**params, "emails": f"%@{EMAIL_DOMAIN}"},
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--days", type=int, default=180, help="school days of records")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drop", action="store_true", help="only remove the synthetic data")
+    args = parser.parse_args()
+
+    from teacher_assistant import server
+
+    server.run_migrations()
+    drop(server)
+    if args.drop:
+        return
+    start = time.perf_counter()
+    counts = load(server, args.students, args.days, args.seed)
+    print(", ".join(f"{count:,} {table}" for table, count in counts.items()))
+    print(f"loaded in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark: audio frames/sec per core for JSON+base64 vs binary frames.
+
+Measures one full round of server-side work per audio chunk in each
+direction: decoding a client frame and encoding an agent frame, exactly as
+main.py does for each WebSocket protocol. Runs on a single thread, so the
+numbers are per core.
+
+    python benchmarks/ws_audio_framing.py --seconds 2
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from teacher_assistant.ws_protocol import decode_frame, encode_frame  # noqa: E402
+
+# 128-sample render quantum, 40 ms at 16 kHz, 100 ms at 24 kHz (Int16)
+CHUNK_SIZES = [256, 1280, 4800]
+
+
+def legacy_round(client_text: str, agent_pcm: bytes) -> int:
+    message = json.loads(client_text)
+    pcm = base64.b64decode(message["data"])
+    reply = json.dumps(
+        {
+            "mime_type": "audio/pcm",
+            "data": base64.b64encode(agent_pcm).decode("ascii"),
+            "role": "model",
+        }
+    )
+    return len(pcm) + len(reply)
+
+
+def binary_round(client_frame: bytes, agent_pcm: bytes) -> int:
+    _, _, pcm = decode_frame(client_frame)
+    reply = encode_frame(agent_pcm, 24000)
+    return len(pcm) + len(reply)
+
+
+def measure(fn, args, seconds: float) -> float:
+    frames = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            fn(*args)
+        frames += 1000
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'chunk_bytes':>11} {'format':>7} {'wire_bytes':>10} {'frames/s':>12}")
+    for size in CHUNK_SIZES:
+        pcm = os.urandom(size)
+        legacy_client = json.dumps(
+            {"mime_type": "audio/pcm", "data": base64.b64encode(pcm).decode("ascii")}
+        )
+        binary_client = encode_frame(pcm, 16000)
+
+        legacy_rate = measure(legacy_round, (legacy_client, pcm), args.seconds)
+        binary_rate = measure(binary_round, (binary_client, pcm), args.seconds)
+        print(f"{size:>11} {'json':>7} {len(legacy_client):>10} {legacy_rate:>12,.0f}")
+        print(f"{size:>11} {'binary':>7} {len(binary_client):>10} {binary_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import asyncio
 import base64
 import json
+import logging
 import os
 import uvicorn
 import uuid
@@ -8,27 +9,113 @@ from pathlib import Path
 from typing import AsyncIterable
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, WebSocket, HTTPException
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from google.adk.agents import LiveRequestQueue
 from google.adk.agents.run_config import RunConfig
 from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from teacher_assistant.agent import root_agent, HTTP_MODEL, WEBSOCKET_MODEL
+from teacher_assistant.sub_agents.database_analytics.agent import (
+    close_database_tools,
+    start_database_tools,
+)
+from teacher_assistant.logging_config import (
+    RateLimitedLogger,
+    StreamCounters,
+    configure_logging,
+    get_logger,
+)
+from teacher_assistant.conversation_context import context_size_bytes, read_context, turn_state_delta
+from teacher_assistant.session_backend import CachedSessionService, create_session_service
+from teacher_assistant.session_store import HttpSessionCache, estimate_session_bytes
+from teacher_assistant.ws_outbound import KIND_AUDIO, OutboundQueue, OutboundQueueFull
+from teacher_assistant.ws_protocol import (
+    BINARY_SUBPROTOCOL,
+    FRAME_AUDIO_PCM,
+    decode_frame,
+    encode_frame,
+    pcm_sample_rate,
+)
 
 
 # Load environment variables
 load_dotenv()
 
+# Logging: per-category levels from LOG_LEVEL/LOG_LEVELS. Per-frame audio
+# logs are rate limited; frame/byte/latency counters are logged as periodic
+# summaries instead.
+configure_logging()
+session_log = get_logger("session")
+stream_log = get_logger("stream")
+audio_log = RateLimitedLogger(get_logger("stream.audio"))
+stream_counters = StreamCounters(
+    get_logger("stream.stats"),
+    interval=float(os.getenv("STREAM_STATS_INTERVAL_SECONDS", 30)),
+)
+
 APP_NAME = "Teacher Assistant ADK Production"
-session_service = InMemorySessionService()
 
-# Session cache for HTTP requests (stores session metadata)
-http_session_cache = {}
+# Session store. Without SESSION_DB_URL sessions live in this process only,
+# so the app must run as a single worker. With a database URL (SQLite for a
+# single host, Postgres for several) every worker shares the same sessions
+# through a local read cache and write-behind event writes; see
+# CachedSessionService for what other workers see, and when.
+SESSION_DB_URL = os.getenv("SESSION_DB_URL")
+session_service = create_session_service(
+    SESSION_DB_URL,
+    max_cached_sessions=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", 1000)),
+    batch_size=int(os.getenv("SESSION_WRITE_BATCH_SIZE", 64)),
+    flush_interval=float(os.getenv("SESSION_WRITE_FLUSH_SECONDS", 0.5)),
+    cache_ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", 5)),
+)
+shared_sessions = isinstance(session_service, CachedSessionService)
+
+# One runner shared by all HTTP and WebSocket sessions. The agent graph and
+# session service are identical for every session, so per-session runners
+# only add construction cost and memory.
+runner = Runner(
+    app_name=APP_NAME,
+    agent=root_agent,
+    session_service=session_service,
+)
+
+# Session cache for HTTP requests (stores session metadata). Bounded by entry
+# count, approximate bytes and idle time; evicted sessions are also removed
+# from the session service unless it is shared with other workers.
+http_session_cache = HttpSessionCache(
+    session_service,
+    APP_NAME,
+    max_entries=int(os.getenv("HTTP_SESSION_MAX_ENTRIES", 1000)),
+    max_bytes=int(os.getenv("HTTP_SESSION_MAX_BYTES", 256 * 1024 * 1024)),
+    ttl_seconds=float(os.getenv("HTTP_SESSION_TTL_SECONDS", 3600)),
+    delete_on_evict=not shared_sessions,
+)
+
+# Budget for the conversation context in session state; older turns beyond it
+# are compacted into a single summary entry.
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", 20))
+CONTEXT_MAX_BYTES = int(os.getenv("CONTEXT_MAX_BYTES", 16 * 1024))
+
+# Audio (in bytes) allowed to wait for a slow WebSocket client before the
+# oldest queued audio is dropped; ~2 seconds of 24 kHz 16-bit PCM by default
+WS_OUTBOUND_MAX_AUDIO_BYTES = int(os.getenv("WS_OUTBOUND_MAX_AUDIO_BYTES", 96000))
+# Everything waiting for a client (text, control, media and audio); a client
+# that falls behind by more than this is disconnected
+WS_OUTBOUND_MAX_BYTES = int(os.getenv("WS_OUTBOUND_MAX_BYTES", 8 * 1024 * 1024))
+WS_OUTBOUND_MAX_ITEMS = int(os.getenv("WS_OUTBOUND_MAX_ITEMS", 1000))
+
+# Outbound queues of the active WebSocket connections, for metrics
+ws_outbound_queues = {}
+
+# Maximum number of /api/chat agent turns running at the same time.
+# Turns beyond the limit wait for a free slot instead of piling up model calls.
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", 32))
+chat_semaphore = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
 
 app = FastAPI(title="Teacher Assistant API", version="1.0.0")
 
@@ -41,6 +128,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+
+@app.on_event("startup")
+async def start_db_tools():
+    """Spawns the shared MCP database server before the first request (DB_TOOLS_MODE=mcp)"""
+    app.state.db_tools_startup_ms = await start_database_tools()
+
+
+@app.on_event("shutdown")
+async def stop_db_tools():
+    await close_database_tools()
+
+
+@app.on_event("shutdown")
+async def flush_sessions():
+    """Writes the session events still queued for the shared session store"""
+    if shared_sessions:
+        await session_service.flush()
+
+
 STATIC_DIR = Path("static")
 if STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -48,6 +155,15 @@ if STATIC_DIR.exists():
 
 async def start_agent_session(session_id, is_audio=False, audio_input_only=False):
     """Starts an agent session"""
+    # Start from a fresh session, also when reconnecting with the same id
+    existing = await session_service.get_session(
+        app_name=APP_NAME, user_id=session_id, session_id=session_id
+    )
+    if existing is not None:
+        await session_service.delete_session(
+            app_name=APP_NAME, user_id=session_id, session_id=session_id
+        )
+
     # Create a Session
     session = await session_service.create_session(
         app_name=APP_NAME,
@@ -55,13 +171,6 @@ async def start_agent_session(session_id, is_audio=False, audio_input_only=False
         session_id=session_id,
     )
 
-    # Create a Runner
-    runner = Runner(
-        app_name=APP_NAME,
-        agent=root_agent,
-        session_service=session_service,
-    )
-
     # Set response modality based on audio_input_only flag
     if is_audio and not audio_input_only:
         modality = "AUDIO"
@@ -100,9 +209,13 @@ async def start_agent_session(session_id, is_audio=False, audio_input_only=False
 
 
 async def agent_to_client_messaging(
-    websocket: WebSocket, live_events: AsyncIterable[Event | None]
+    live_events: AsyncIterable[Event | None], outbound: OutboundQueue
 ):
-    """Agent to client communication"""
+    """Agent to client communication
+
+    Events are only queued here, so a slow client never stalls the live
+    event stream; client_sender drains the queue onto the WebSocket.
+    """
     while True:
         async for event in live_events:
             if event is None:
@@ -114,8 +227,8 @@ async def agent_to_client_messaging(
                     "turn_complete": event.turn_complete,
                     "interrupted": event.interrupted,
                 }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: {message}")
+                outbound.put_control(message)
+                stream_log.debug("[AGENT TO CLIENT]: %s", message)
                 continue
 
             # Read the Content and its first Part
@@ -134,10 +247,10 @@ async def agent_to_client_messaging(
                     "data": part.text,
                     "role": "model",
                 }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: text/plain: {part.text}")
+                outbound.put_text(message)
+                stream_log.debug("[AGENT TO CLIENT]: text/plain: %s", part.text)
 
-            # If it's audio, send Base64 encoded audio data
+            # If it's audio, queue the raw PCM; it is encoded when sent
             is_audio = (
                 part.inline_data
                 and part.inline_data.mime_type
@@ -146,13 +259,13 @@ async def agent_to_client_messaging(
             if is_audio:
                 audio_data = part.inline_data and part.inline_data.data
                 if audio_data:
-                    message = {
-                        "mime_type": "audio/pcm",
-                        "data": base64.b64encode(audio_data).decode("ascii"),
-                        "role": "model",
-                    }
-                    await websocket.send_text(json.dumps(message))
-                    print(f"[AGENT TO CLIENT]: audio/pcm: {len(audio_data)} bytes.")
+                    outbound.put_audio(audio_data, part.inline_data.mime_type)
+                    audio_log.log(
+                        logging.DEBUG,
+                        "agent_audio",
+                        "[AGENT TO CLIENT]: audio/pcm: %d bytes.",
+                        len(audio_data),
+                    )
 
             # If it's an image, send Base64 encoded image data
             is_image = (
@@ -168,8 +281,41 @@ async def agent_to_client_messaging(
                         "data": base64.b64encode(image_data).decode("ascii"),
                         "role": "model",
                     }
-                    await websocket.send_text(json.dumps(message))
-                    print(f"[AGENT TO CLIENT]: {part.inline_data.mime_type}: {len(image_data)} bytes.")
+                    outbound.put_media(message, len(image_data))
+                    stream_log.info(
+                        "[AGENT TO CLIENT]: %s: %d bytes.",
+                        part.inline_data.mime_type,
+                        len(image_data),
+                    )
+
+
+async def client_sender(
+    websocket: WebSocket, outbound: OutboundQueue, binary_audio: bool = False
+):
+    """Drains the outbound queue onto the WebSocket
+
+    With binary_audio, PCM audio is sent as raw binary frames; everything
+    else stays JSON text.
+    """
+    while True:
+        kind, message, queued_ms = await outbound.get()
+        if kind == KIND_AUDIO:
+            audio_data, mime_type = message
+            if binary_audio:
+                frame = encode_frame(audio_data, pcm_sample_rate(mime_type))
+                await websocket.send_bytes(frame)
+                outbound.mark_sent(len(frame))
+                stream_counters.record("agent_to_client", kind, len(frame), queued_ms)
+                continue
+            message = {
+                "mime_type": "audio/pcm",
+                "data": base64.b64encode(audio_data).decode("ascii"),
+                "role": "model",
+            }
+        text = json.dumps(message)
+        await websocket.send_text(text)
+        outbound.mark_sent(len(text))
+        stream_counters.record("agent_to_client", kind, len(text), queued_ms)
 
 
 async def client_to_agent_messaging(
@@ -177,9 +323,29 @@ async def client_to_agent_messaging(
 ):
     """Client to agent communication"""
     while True:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000))
+
+        # Binary frames carry raw PCM audio (binary sub-protocol)
+        if frame.get("bytes") is not None:
+            kind, _, payload = decode_frame(frame["bytes"])
+            if kind != FRAME_AUDIO_PCM:
+                raise ValueError(f"Binary frame kind not supported: {kind}")
+            live_request_queue.send_realtime(
+                types.Blob(data=payload, mime_type="audio/pcm")
+            )
+            stream_counters.record("client_to_agent", "audio/pcm", len(payload))
+            audio_log.log(
+                logging.DEBUG,
+                "client_audio",
+                "[CLIENT TO AGENT]: audio/pcm (binary): %d bytes",
+                len(payload),
+            )
+            continue
+
         # Decode JSON message
-        message_json = await websocket.receive_text()
-        message = json.loads(message_json)
+        message = json.loads(frame["text"])
         mime_type = message["mime_type"]
         data = message["data"]
         role = message.get("role", "user")
@@ -189,14 +355,20 @@ async def client_to_agent_messaging(
             # Send a text message
             content = types.Content(role=role, parts=[types.Part.from_text(text=data)])
             live_request_queue.send_content(content=content)
-            print(f"[CLIENT TO AGENT]: {data}")
+            stream_log.debug("[CLIENT TO AGENT]: %s", data)
         elif mime_type == "audio/pcm":
             # Send audio data
             decoded_data = base64.b64decode(data)
             live_request_queue.send_realtime(
                 types.Blob(data=decoded_data, mime_type=mime_type)
             )
-            print(f"[CLIENT TO AGENT]: audio/pcm: {len(decoded_data)} bytes")
+            stream_counters.record("client_to_agent", mime_type, len(decoded_data))
+            audio_log.log(
+                logging.DEBUG,
+                "client_audio",
+                "[CLIENT TO AGENT]: audio/pcm: %d bytes",
+                len(decoded_data),
+            )
         elif mime_type.startswith("image/"):
             # Handle image data (JPEG, PNG, etc.)
             decoded_data = base64.b64decode(data)
@@ -207,7 +379,7 @@ async def client_to_agent_messaging(
             )
             content = types.Content(role=role, parts=[image_part])
             live_request_queue.send_content(content=content)
-            print(f"[CLIENT TO AGENT]: {mime_type}: {len(decoded_data)} bytes")
+            stream_log.info("[CLIENT TO AGENT]: %s: %d bytes", mime_type, len(decoded_data))
         else:
             raise ValueError(f"Mime type not supported: {mime_type}")
 
@@ -226,10 +398,24 @@ async def chat_endpoint(request: dict):
             raise HTTPException(status_code=400, detail="Message or image is required")
         
         # Check if session exists in cache
-        if session_id not in http_session_cache:
+        cached_session = await http_session_cache.get(session_id)
+        if cached_session is None:
+            # Another worker may already have started this session
+            session = await session_service.get_session(
+                app_name=APP_NAME,
+                user_id=f"user_{session_id}",
+                session_id=session_id,
+            )
+        if cached_session is None and session is not None:
+            cached_session = {
+                'user_id': f"user_{session_id}",
+            }
+            await http_session_cache.put(
+                session_id, cached_session, estimate_session_bytes(session)
+            )
+        elif cached_session is None:
             # Initial state for new sessions
             initial_state = {
-                "conversation_context": [],
                 "user_preferences": "Educational content creator",
                 "session_type": "http_chat"
             }
@@ -242,25 +428,17 @@ async def chat_endpoint(request: dict):
                 state=initial_state,
             )
             
-            # Create runner for this session
-            runner = Runner(
-                agent=root_agent,
-                app_name=APP_NAME,
-                session_service=session_service,
-            )
-            
             # Cache the session components
-            http_session_cache[session_id] = {
-                'session': session,
-                'runner': runner,
+            cached_session = {
                 'user_id': f"user_{session_id}",
             }
+            await http_session_cache.put(
+                session_id, cached_session, estimate_session_bytes(session)
+            )
             
-            print(f"Created new session: {session_id}")
+            session_log.info("Created new session: %s", session_id)
         
         # Get cached session components
-        cached_session = http_session_cache[session_id]
-        runner = cached_session['runner']
         user_id = cached_session['user_id']
         
         # Prepare content parts
@@ -284,17 +462,18 @@ async def chat_endpoint(request: dict):
         # Create the user message
         new_message = types.Content(role="user", parts=parts)
         
-        # Run the agent with proper session handling
+        # Run the agent on the event loop so other requests and WebSocket
+        # streams keep flowing while this turn waits on the model and tools
         response_text = ""
-        for event in runner.run(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=new_message,
-        ):
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                    response_text = event.content.parts[0].text
-                    break
+        async with chat_semaphore:
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=new_message,
+            ):
+                if event.is_final_response():
+                    if event.content and event.content.parts:
+                        response_text = event.content.parts[0].text
         
         # Update session state with conversation context
         session = await session_service.get_session(
@@ -303,29 +482,47 @@ async def chat_endpoint(request: dict):
             session_id=session_id
         )
         
-        # Add to conversation context if session exists
-        if session and hasattr(session, 'state') and session.state:
-            if "conversation_context" not in session.state:
-                session.state["conversation_context"] = []
-            
-            session.state["conversation_context"].append({
-                "user_message": message,
-                "agent_response": response_text
-            })
+        # Add to conversation context if session exists. The session returned
+        # by get_session is a copy, so the update goes through a state delta
+        # event to be persisted by the session service; the delta holds only
+        # this turn (and the summary when it changes), not the whole context.
+        if session:
+            state_delta = turn_state_delta(
+                session.state,
+                message,
+                response_text,
+                max_turns=CONTEXT_MAX_TURNS,
+                max_bytes=CONTEXT_MAX_BYTES,
+            )
+            await session_service.append_event(
+                session,
+                Event(author="user", actions=EventActions(state_delta=state_delta)),
+            )
+            cached_session["context_bytes"] = context_size_bytes(read_context(session.state))
+
+        # Re-account the session now that this turn's events were added
+        await http_session_cache.resize(session_id, estimate_session_bytes(session))
         
         return {"response": response_text, "session_id": session_id}
         
     except Exception as e:
-        print(f"Error in chat_endpoint: {str(e)}")
+        session_log.error("Error in chat_endpoint: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # Add session management endpoints
 @app.delete("/api/session/{session_id}")
 async def clear_session(session_id: str):
-    """Clear a specific session from cache"""
-    if session_id in http_session_cache:
-        del http_session_cache[session_id]
+    """Clear a specific session from cache and the session service"""
+    if await http_session_cache.delete(session_id):
+        return {"message": f"Session {session_id} cleared"}
+    if shared_sessions and await session_service.get_session(
+        app_name=APP_NAME, user_id=f"user_{session_id}", session_id=session_id
+    ):
+        # Started on another worker
+        await session_service.delete_session(
+            app_name=APP_NAME, user_id=f"user_{session_id}", session_id=session_id
+        )
         return {"message": f"Session {session_id} cleared"}
     return {"message": f"Session {session_id} not found"}
 
@@ -333,7 +530,19 @@ async def clear_session(session_id: str):
 @app.get("/api/sessions")
 async def list_sessions():
     """List all active sessions (for debugging)"""
-    return {"active_sessions": list(http_session_cache.keys())}
+    return {
+        "active_sessions": http_session_cache.keys(),
+        "sessions": [
+            {
+                "session_id": session_id,
+                "size_bytes": entry["size_bytes"],
+                "context_bytes": entry.get("context_bytes", 0),
+            }
+            for session_id, entry in http_session_cache.items()
+        ],
+        "cache_stats": http_session_cache.stats(),
+        "store_stats": session_service.stats() if shared_sessions else None,
+    }
 
 
 # WebSocket endpoint for real-time communication
@@ -345,30 +554,77 @@ async def websocket_endpoint(
     audio_input_only: str = Query(default="false"),
 ):
     """WebSocket endpoint for real-time audio communication"""
-    await websocket.accept()
+    # Clients that request the binary sub-protocol exchange PCM audio as raw
+    # binary frames; others keep the base64-in-JSON format
+    binary_audio = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary_audio else None)
     audio_input_only_bool = audio_input_only.lower() == "true"
-    print(f"Client #{session_id} connected, audio mode: {is_audio}, audio input only: {audio_input_only_bool}")
+    session_log.info(
+        "Client #%s connected, audio mode: %s, audio input only: %s, binary audio: %s",
+        session_id,
+        is_audio,
+        audio_input_only_bool,
+        binary_audio,
+    )
     
     live_events, live_request_queue = await start_agent_session(
         session_id, is_audio == "true", audio_input_only_bool
     )
     
+    # Bounded outbound queue between the live events and the client socket
+    outbound = OutboundQueue(
+        max_audio_bytes=WS_OUTBOUND_MAX_AUDIO_BYTES,
+        max_bytes=WS_OUTBOUND_MAX_BYTES,
+        max_items=WS_OUTBOUND_MAX_ITEMS,
+    )
+    ws_outbound_queues[session_id] = outbound
+    
     agent_to_client_task = asyncio.create_task(
-        agent_to_client_messaging(websocket, live_events)
+        agent_to_client_messaging(live_events, outbound)
+    )
+    client_sender_task = asyncio.create_task(
+        client_sender(websocket, outbound, binary_audio)
     )
     client_to_agent_task = asyncio.create_task(
         client_to_agent_messaging(websocket, live_request_queue)
     )
-    await asyncio.gather(agent_to_client_task, client_to_agent_task)
-    
-    print(f"Client #{session_id} disconnected")
+    tasks = [agent_to_client_task, client_sender_task, client_to_agent_task]
+    try:
+        await asyncio.gather(*tasks)
+    except OutboundQueueFull as e:
+        session_log.warning("Client #%s is too slow, closing the connection: %s", session_id, e)
+        # 1013: try again later
+        await websocket.close(code=1013)
+    finally:
+        for task in tasks:
+            task.cancel()
+        live_request_queue.close()
+        ws_outbound_queues.pop(session_id, None)
+        session_log.info(
+            "Client #%s disconnected, outbound stats: %s", session_id, outbound.stats()
+        )
+
+
+@app.get("/api/stream-metrics")
+async def stream_metrics():
+    """Outbound queue depth and drop counters for active WebSocket connections"""
+    return {
+        "connections": {
+            session_id: outbound.stats()
+            for session_id, outbound in ws_outbound_queues.items()
+        }
+    }
 
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint for production monitoring"""
-    return {"status": "healthy", "app": APP_NAME}
+    health = {"status": "healthy", "app": APP_NAME}
+    startup_ms = getattr(app.state, "db_tools_startup_ms", None)
+    if startup_ms is not None:
+        health["mcp_server_startup_ms"] = round(startup_ms)
+    return health
 
 
 # Root endpoint
@@ -12,6 +12,15 @@ const ws_url = "ws://" + window.location.host + "/ws/" + sessionId;
 let websocket = null;
 let is_audio = false;
 let currentMessageId = null; // Track the current message ID during a conversation turn
+let useBinaryAudio = false; // True when the server accepted the binary audio sub-protocol
+
+// Binary audio sub-protocol: raw PCM in binary frames with a 4-byte header
+// (version uint8, kind uint8, sample rate uint16 big-endian)
+const BINARY_SUBPROTOCOL = "adk-pcm.v1";
+const FRAME_HEADER_SIZE = 4;
+const FRAME_VERSION = 1;
+const FRAME_AUDIO_PCM = 1;
+const RECORDER_SAMPLE_RATE = 16000;
 
 // Get DOM elements
 const messageForm = document.getElementById("messageForm");
@@ -28,12 +37,15 @@ const recordingContainer = document.getElementById("recording-container");
 function connectWebsocket() {
   // Connect websocket
   const wsUrl = ws_url + "?is_audio=" + is_audio;
-  websocket = new WebSocket(wsUrl);
+  websocket = new WebSocket(wsUrl, [BINARY_SUBPROTOCOL]);
+  websocket.binaryType = "arraybuffer";
 
   // Handle connection open
   websocket.onopen = function () {
     // Connection opened messages
     console.log("WebSocket connection opened.");
+    // Fall back to base64-in-JSON audio if the server did not pick the sub-protocol
+    useBinaryAudio = websocket.protocol === BINARY_SUBPROTOCOL;
     connectionStatus.textContent = "Connected";
     statusDot.classList.add("connected");
 
@@ -44,6 +56,12 @@ function connectWebsocket() {
 
   // Handle incoming messages
   websocket.onmessage = function (event) {
+    // Binary frames carry raw PCM audio
+    if (event.data instanceof ArrayBuffer) {
+      handleBinaryFrame(event.data);
+      return;
+    }
+
     // Parse the incoming message
     const message_from_server = JSON.parse(event.data);
     console.log("[AGENT TO CLIENT] ", message_from_server);
@@ -70,22 +88,8 @@ function connectWebsocket() {
     }
 
     // If it's audio, play it
-    if (message_from_server.mime_type === "audio/pcm" && audioPlayerNode) {
-      audioPlayerNode.port.postMessage(base64ToArray(message_from_server.data));
-
-      // If we have an existing message element for this turn, add audio icon if needed
-      if (currentMessageId) {
-        const messageElem = document.getElementById(currentMessageId);
-        if (
-          messageElem &&
-          !messageElem.querySelector(".audio-icon") &&
-          is_audio
-        ) {
-          const audioIcon = document.createElement("span");
-          audioIcon.className = "audio-icon";
-          messageElem.prepend(audioIcon);
-        }
-      }
+    if (message_from_server.mime_type === "audio/pcm") {
+      playAudioChunk(base64ToArray(message_from_server.data));
     }
 
     // Handle text messages
@@ -166,6 +170,37 @@ function connectWebsocket() {
 }
 connectWebsocket();
 
+// Handle a binary frame from the server
+function handleBinaryFrame(buffer) {
+  const view = new DataView(buffer);
+  if (
+    buffer.byteLength < FRAME_HEADER_SIZE ||
+    view.getUint8(0) !== FRAME_VERSION ||
+    view.getUint8(1) !== FRAME_AUDIO_PCM
+  ) {
+    console.log("Ignoring unsupported binary frame");
+    return;
+  }
+  typingIndicator.classList.add("visible");
+  playAudioChunk(buffer.slice(FRAME_HEADER_SIZE));
+}
+
+// Play a chunk of 16-bit PCM audio from the agent
+function playAudioChunk(pcmBuffer) {
+  if (!audioPlayerNode) return;
+  audioPlayerNode.port.postMessage(pcmBuffer);
+
+  // If we have an existing message element for this turn, add audio icon if needed
+  if (currentMessageId) {
+    const messageElem = document.getElementById(currentMessageId);
+    if (messageElem && !messageElem.querySelector(".audio-icon") && is_audio) {
+      const audioIcon = document.createElement("span");
+      audioIcon.className = "audio-icon";
+      messageElem.prepend(audioIcon);
+    }
+  }
+}
+
 // Add submit handler to the form
 function addSubmitHandler() {
   messageForm.onsubmit = function (e) {
@@ -202,6 +237,19 @@ function sendMessage(message) {
   }
 }
 
+// Send PCM audio as a binary frame
+function sendAudioFrame(pcmData, sampleRate) {
+  if (websocket && websocket.readyState == WebSocket.OPEN) {
+    const frame = new Uint8Array(FRAME_HEADER_SIZE + pcmData.byteLength);
+    const view = new DataView(frame.buffer);
+    view.setUint8(0, FRAME_VERSION);
+    view.setUint8(1, FRAME_AUDIO_PCM);
+    view.setUint16(2, sampleRate);
+    frame.set(new Uint8Array(pcmData), FRAME_HEADER_SIZE);
+    websocket.send(frame.buffer);
+  }
+}
+
 // Decode Base64 data to Array
 function base64ToArray(base64) {
   const binaryString = window.atob(base64);
@@ -312,11 +360,16 @@ function audioRecorderHandler(pcmData) {
   // Only send data if we're still recording
   if (!isRecording) return;
 
-  // Send the pcm data as base64
-  sendMessage({
-    mime_type: "audio/pcm",
-    data: arrayBufferToBase64(pcmData),
-  });
+  if (useBinaryAudio) {
+    // Send the pcm data as a raw binary frame
+    sendAudioFrame(pcmData, RECORDER_SAMPLE_RATE);
+  } else {
+    // Send the pcm data as base64
+    sendMessage({
+      mime_type: "audio/pcm",
+      data: arrayBufferToBase64(pcmData),
+    });
+  }
 
   // Log every few samples to avoid flooding the console
   if (Math.random() < 0.01) {
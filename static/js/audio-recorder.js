@@ -4,9 +4,18 @@
 
 let micStream;
 
-export async function startAudioRecorderWorklet(audioRecorderHandler) {
+// Sample rate sent to the server and duration of each PCM frame handed to the handler
+const TARGET_SAMPLE_RATE = 16000;
+const DEFAULT_FRAME_DURATION_MS = 40;
+
+export async function startAudioRecorderWorklet(
+  audioRecorderHandler,
+  frameDurationMs = DEFAULT_FRAME_DURATION_MS
+) {
   // Create an AudioContext
-  const audioRecorderContext = new AudioContext({ sampleRate: 16000 });
+  const audioRecorderContext = new AudioContext({
+    sampleRate: TARGET_SAMPLE_RATE,
+  });
   console.log("AudioContext sample rate:", audioRecorderContext.sampleRate);
 
   // Load the AudioWorklet module
@@ -19,20 +28,24 @@ export async function startAudioRecorderWorklet(audioRecorderHandler) {
   });
   const source = audioRecorderContext.createMediaStreamSource(micStream);
 
-  // Create an AudioWorkletNode that uses the PCMProcessor
+  // Create an AudioWorkletNode that uses the PCMProcessor. The worklet
+  // downsamples to 16 kHz Int16 and batches samples into frames.
   const audioRecorderNode = new AudioWorkletNode(
     audioRecorderContext,
-    "pcm-recorder-processor"
+    "pcm-recorder-processor",
+    {
+      processorOptions: {
+        targetSampleRate: TARGET_SAMPLE_RATE,
+        frameDurationMs: frameDurationMs,
+      },
+    }
   );
 
   // Connect the microphone source to the worklet.
   source.connect(audioRecorderNode);
   audioRecorderNode.port.onmessage = (event) => {
-    // Convert to 16-bit PCM
-    const pcmData = convertFloat32ToPCM(event.data);
-
-    // Send the PCM data to the handler.
-    audioRecorderHandler(pcmData);
+    // The worklet already posts 16-bit PCM frames as ArrayBuffers
+    audioRecorderHandler(event.data);
   };
   return [audioRecorderNode, audioRecorderContext, micStream];
 }
@@ -44,15 +57,3 @@ export function stopMicrophone(micStream) {
   micStream.getTracks().forEach((track) => track.stop());
   console.log("stopMicrophone(): Microphone stopped.");
 }
-
-// Convert Float32 samples to 16-bit PCM.
-function convertFloat32ToPCM(inputData) {
-  // Create an Int16Array of the same length.
-  const pcm16 = new Int16Array(inputData.length);
-  for (let i = 0; i < inputData.length; i++) {
-    // Multiply by 0x7fff (32767) to scale the float value to 16-bit PCM range.
-    pcm16[i] = inputData[i] * 0x7fff;
-  }
-  // Return the underlying ArrayBuffer.
-  return pcm16.buffer;
-}
@@ -1,15 +1,64 @@
+/**
+ * An audio worklet processor that downsamples microphone input to 16-bit PCM
+ * at the target sample rate and posts it to the main thread in fixed-duration
+ * frames, instead of one message per 128-sample render quantum.
+ */
 class PCMProcessor extends AudioWorkletProcessor {
-  constructor() {
+  constructor(options) {
     super();
+
+    const processorOptions = (options && options.processorOptions) || {};
+    this.targetSampleRate = processorOptions.targetSampleRate || 16000;
+    this.frameDurationMs = processorOptions.frameDurationMs || 40;
+
+    // `sampleRate` is the AudioContext rate, a global in the worklet scope
+    this.ratio = Math.max(1, sampleRate / this.targetSampleRate);
+    this.frameSamples = Math.round(
+      (this.targetSampleRate * this.frameDurationMs) / 1000
+    );
+
+    // Output frame being filled
+    this.frame = new Int16Array(this.frameSamples);
+    this.frameIndex = 0;
+
+    // Box-filter downsampling state, carried across render quanta
+    this.sum = 0;
+    this.count = 0;
+    this.position = 0;
+  }
+
+  // Append one output sample, posting the frame once it is full
+  _push(floatVal) {
+    const s = Math.max(-1, Math.min(1, floatVal));
+    this.frame[this.frameIndex++] = s < 0 ? s * 0x8000 : s * 0x7fff;
+    if (this.frameIndex === this.frameSamples) {
+      this._post(this.frame);
+      this.frame = new Int16Array(this.frameSamples);
+      this.frameIndex = 0;
+    }
+  }
+
+  // Transfer the buffer to the main thread instead of copying it
+  _post(int16Samples) {
+    this.port.postMessage(int16Samples.buffer, [int16Samples.buffer]);
   }
 
   process(inputs, outputs, parameters) {
     if (inputs.length > 0 && inputs[0].length > 0) {
       // Use the first channel
       const inputChannel = inputs[0][0];
-      // Copy the buffer to avoid issues with recycled memory
-      const inputCopy = new Float32Array(inputChannel);
-      this.port.postMessage(inputCopy);
+      for (let i = 0; i < inputChannel.length; i++) {
+        // Average the input samples that fall into each output sample
+        this.sum += inputChannel[i];
+        this.count++;
+        this.position++;
+        if (this.position >= this.ratio) {
+          this._push(this.sum / this.count);
+          this.position -= this.ratio;
+          this.sum = 0;
+          this.count = 0;
+        }
+      }
     }
     return true;
   }
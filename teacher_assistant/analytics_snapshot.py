@@ -0,0 +1,646 @@
+"""Columnar in-memory snapshot of the app tables for the summary and analytics tools.
+
+The snapshot keeps the columns the summary and analytics tools aggregate
+(students, attendance, behavior_records, academic_records) as NumPy arrays,
+so those tools answer from memory instead of re-querying the database and
+building a dict per row on every call. Repeated strings (subjects, grades,
+classes, sections) are stored as integer codes.
+
+A table is loaded in full on first use and then refreshed incrementally:
+rows whose watermark column (updated_at, or created_at for the tables
+without one) is at or after the last one seen are read again and merged by
+id. Changes the watermarks cannot see are handled separately:
+
+- the write tools mark the rows they change without touching a watermark
+  (attendance upserts) or the tables they delete from, which are reloaded
+  on the next read;
+- every table is reloaded in full after ``full_reload_seconds``, which
+  picks up deletes and updates made outside the tools.
+
+Between refreshes, reads may lag writes made outside the tools by up to
+``refresh_seconds``; writes made through the tools are visible to the next
+read.
+"""
+import functools
+import inspect
+import logging
+import math
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+# Rows stamped shortly before the watermark are read again, so a transaction
+# that committed after a refresh with an earlier timestamp is not missed
+WATERMARK_OVERLAP = timedelta(minutes=1)
+
+# Attendance statuses by code; any other status has code len(ATTENDANCE_STATUSES)
+ATTENDANCE_STATUSES = ("present", "absent", "late")
+
+# Columns per table: (watermark column, [(column, kind)]). Kinds: "int",
+# "float", "date", "category" (codes into a vocabulary) and "text".
+SNAPSHOT_TABLES = {
+    "students": ("updated_at", [
+        ("student_id", "int"), ("student_name", "text"),
+        ("class_value", "category"), ("section", "category"),
+    ]),
+    "attendance": ("created_at", [
+        ("student_id", "int"), ("attendance_date", "date"), ("status", "category"),
+    ]),
+    "behavior_records": ("created_at", [
+        ("student_id", "int"), ("record_date", "date"), ("sentiment_score", "float"),
+    ]),
+    "academic_records": ("updated_at", [
+        ("student_id", "int"), ("subject", "category"), ("grade", "category"),
+        ("record_date", "date"),
+    ]),
+}
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _day(value) -> np.datetime64:
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value if isinstance(value, date) else str(value)[:10], "D")
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NAT = np.iinfo(np.int64).min
+
+
+def _dates(values) -> np.ndarray:
+    """Converts date column values (date objects or ISO strings) to datetime64[D]."""
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, date):
+        # Far faster than NumPy's conversion of date objects
+        return np.array(
+            [_NAT if value is None else value.toordinal() - _EPOCH_ORDINAL for value in values],
+            dtype=np.int64,
+        ).view("datetime64[D]")
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        return np.array([None if value is None else str(value)[:10] for value in values], dtype="datetime64[D]")
+
+
+def _sort_key(value):
+    # NULLs last, as PostgreSQL sorts them
+    return (value is None, value if value is not None else "")
+
+
+class Vocabulary:
+    """Codes for the distinct values of a category column."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, values) -> np.ndarray:
+        codes = self.codes
+        encoded = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            encoded[i] = code
+        return encoded
+
+    def matching(self, predicate) -> np.ndarray:
+        """Codes of the values for which predicate is true."""
+        return np.array(
+            [code for code, value in enumerate(self.values) if predicate(value)], dtype=np.int32
+        )
+
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(value) for value in self.values) + sys.getsizeof(self.codes)
+
+
+class ColumnarTable:
+    """One app table as NumPy arrays, keyed by its id column."""
+
+    def __init__(self, name: str, watermark_column: str, columns: list):
+        self.name = name
+        self.watermark_column = watermark_column
+        self.kinds = dict(columns)
+        self.vocabularies = {
+            column: Vocabulary() for column, kind in columns if kind == "category"
+        }
+        self.ids = np.empty(0, dtype=np.int64)
+        self.columns = self._convert([[] for _ in columns])
+        self.watermark = None
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self.changed = False
+        self.stale_rows = []
+        self.full_reload = False
+        self.full_loads = 0
+        self.incremental_refreshes = 0
+        self.last_refresh_ms = None
+        self._student_index = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _convert(self, values) -> dict:
+        columns = {}
+        for (column, kind), column_values in zip(self.kinds.items(), values):
+            if kind == "int":
+                columns[column] = np.array(column_values, dtype=np.int64)
+            elif kind == "float":
+                columns[column] = np.array(
+                    [np.nan if v is None else float(v) for v in column_values], dtype=np.float64
+                )
+            elif kind == "date":
+                columns[column] = _dates(column_values)
+            elif kind == "category":
+                columns[column] = self.vocabularies[column].encode(column_values)
+            else:
+                columns[column] = np.array(column_values, dtype=object)
+        return columns
+
+    def fetch(self, conn, condition: str = "", params: dict = None, batch_size: int = 500) -> tuple:
+        """Reads matching rows as (ids, columns, max watermark)."""
+        query = (
+            f"SELECT id, {self.watermark_column}, {', '.join(self.kinds)} FROM app.{self.name}"
+            + (f" WHERE {condition}" if condition else "")
+        )
+        result = conn.execute(text(query), params or {}, execution_options={"yield_per": batch_size})
+        id_chunks, column_chunks, watermark = [], [], None
+        for rows in result.partitions(batch_size):
+            values = list(zip(*rows))
+            id_chunks.append(np.array(values[0], dtype=np.int64))
+            column_chunks.append(self._convert(values[2:]))
+            stamps = [value for value in values[1] if value is not None]
+            if stamps:
+                latest = _timestamp(max(stamps))
+                if watermark is None or latest > watermark:
+                    watermark = latest
+        if not id_chunks:
+            return np.empty(0, dtype=np.int64), self._convert([[] for _ in self.kinds]), None
+        return (
+            np.concatenate(id_chunks),
+            {column: np.concatenate([chunk[column] for chunk in column_chunks]) for column in self.kinds},
+            watermark,
+        )
+
+    def replace(self, ids, columns, watermark):
+        self.ids, self.columns, self.watermark = ids, columns, watermark
+        self._student_index = None
+
+    def remove(self, keep: np.ndarray):
+        self.ids = self.ids[keep]
+        self.columns = {column: values[keep] for column, values in self.columns.items()}
+        self._student_index = None
+
+    def merge(self, ids, columns, watermark=None):
+        """Adds rows, replacing the rows with the same ids."""
+        if len(ids):
+            self.remove(~np.isin(self.ids, ids))
+            self.ids = np.concatenate([self.ids, ids])
+            self.columns = {
+                column: np.concatenate([values, columns[column]])
+                for column, values in self.columns.items()
+            }
+            self._student_index = None
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+    def student_index(self) -> tuple:
+        """(distinct student ids, each row's index into them), kept until the rows change."""
+        if self._student_index is None:
+            self._student_index = np.unique(self.columns["student_id"], return_inverse=True)
+        return self._student_index
+
+    def value(self, column: str, value):
+        """A filter value in the representation of a column."""
+        kind = self.kinds[column]
+        if kind == "date":
+            return _day(value)
+        if kind == "category":
+            return self.vocabularies[column].codes.get(value, -1)
+        return value
+
+    def nbytes(self) -> int:
+        total = self.ids.nbytes
+        for column, values in self.columns.items():
+            total += values.nbytes
+            if values.dtype == object:
+                total += sum(sys.getsizeof(value) for value in values)
+        return total + sum(vocabulary.nbytes() for vocabulary in self.vocabularies.values())
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self),
+            "bytes": self.nbytes(),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "full_loads": self.full_loads,
+            "incremental_refreshes": self.incremental_refreshes,
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+class AnalyticsSnapshot:
+    """NumPy snapshot of the app tables, refreshed from updated_at/created_at watermarks."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        grade_points: dict = None,
+        refresh_seconds: float = 10,
+        full_reload_seconds: float = 3600,
+        batch_size: int = 500,
+        clock=time.monotonic,
+    ):
+        self.enabled = enabled
+        self.grade_points = grade_points or {}
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.batch_size = batch_size
+        self._clock = clock
+        self.tables = {
+            name: ColumnarTable(name, watermark_column, columns)
+            for name, (watermark_column, columns) in SNAPSHOT_TABLES.items()
+        }
+        # Held, never waited for, while tables refresh: tools run as greenlets
+        # on the event loop thread, where blocking on a lock held by a
+        # suspended tool would deadlock. A read that finds it held uses the
+        # snapshot as it is, or the database while a table is first loaded.
+        self._refresh_lock = threading.Lock()
+        self._students_by_id = None
+
+    # --- Refresh ---
+
+    def refresh(self, conn, tables) -> bool:
+        """Brings the given tables up to date, as far as is due.
+
+        Returns:
+            bool: Whether the snapshot can answer from the tables, False while
+            another reader loads one of them for the first time.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return all(self.tables[name].loaded for name in tables)
+        try:
+            for name in tables:
+                self._refresh_table(conn, self.tables[name])
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_table(self, conn, table: ColumnarTable):
+        now = self._clock()
+        start = time.perf_counter()
+        if not table.loaded or table.full_reload or now - table.loaded_at >= self.full_reload_seconds:
+            table.stale_rows = []
+            table.full_reload = False
+            table.replace(*table.fetch(conn, batch_size=self.batch_size))
+            table.loaded, table.loaded_at, table.refreshed_at = True, now, now
+            table.changed = False
+            table.full_loads += 1
+        elif table.stale_rows or table.changed or now - table.refreshed_at >= self.refresh_seconds:
+            stale_rows, table.stale_rows, table.changed = table.stale_rows, [], False
+            # Every fetch may suspend this greenlet, and readers that find the
+            # lock held use the table meanwhile, so all rows are fetched before
+            # the table changes, and applied with no fetch in between
+            reloaded = [
+                (column, value, table.fetch(
+                    conn, f"{column} = :value", {"value": value}, self.batch_size
+                ))
+                for column, value in dict.fromkeys(stale_rows)
+            ]
+            if table.watermark is None:
+                changes = table.fetch(conn, batch_size=self.batch_size)
+            else:
+                changes = table.fetch(
+                    conn, f"{table.watermark_column} >= :watermark",
+                    {"watermark": table.watermark - WATERMARK_OVERLAP}, self.batch_size,
+                )
+            for column, value, rows in reloaded:
+                table.remove(table.columns[column] != table.value(column, value))
+                table.merge(*rows)
+            table.merge(*changes)
+            table.refreshed_at = now
+            table.incremental_refreshes += 1
+        else:
+            return
+        table.last_refresh_ms = round((time.perf_counter() - start) * 1000, 2)
+        if table.name == "students":
+            self._students_by_id = None
+        logging.debug(f"Analytics snapshot: refreshed {table.name} in {table.last_refresh_ms} ms")
+
+    def mark_changed(self, tables) -> None:
+        """Notes writes the watermarks will find, so the next read refreshes."""
+        for name in tables:
+            if name in self.tables:
+                self.tables[name].changed = True
+
+    def mark_stale(self, name: str, column: str = None, value=None) -> None:
+        """Notes rows changed without a new watermark: those with column = value, or the whole table."""
+        table = self.tables.get(name)
+        if table is None or not table.loaded:
+            return
+        if column is None or value is None:
+            table.full_reload = True
+        else:
+            table.stale_rows.append((column, value))
+
+    def invalidating(self, func, tables, reload_rows: tuple = None):
+        """Wraps an async write tool so the snapshot sees its changes.
+
+        With ``tables`` None the generic insert/delete tools reload the
+        ``table_name`` table; ``reload_rows`` is a (table, column) pair whose
+        rows matching the call's argument of the same name are reloaded.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                bound = signature.bind(*args, **kwargs)
+                if tables is None:
+                    self.mark_stale(bound.arguments.get("table_name"))
+                else:
+                    self.mark_changed(tables)
+                    if reload_rows is not None:
+                        name, column = reload_rows
+                        self.mark_stale(name, column, bound.arguments.get(column))
+
+        return wrapper
+
+    def stats(self) -> dict:
+        tables = {name: table.stats() for name, table in self.tables.items()}
+        return {
+            "enabled": self.enabled,
+            "refresh_seconds": self.refresh_seconds,
+            "full_reload_seconds": self.full_reload_seconds,
+            "bytes": sum(table["bytes"] for table in tables.values()),
+            "tables": tables,
+        }
+
+    # --- Selections ---
+
+    def _students(self) -> tuple:
+        """Students sorted by student_id, as (order, sorted student_ids)."""
+        if self._students_by_id is None:
+            student_ids = self.tables["students"].columns["student_id"]
+            order = np.argsort(student_ids, kind="stable")
+            self._students_by_id = (order, student_ids[order])
+        return self._students_by_id
+
+    def _student_rows(self, student_ids: np.ndarray) -> np.ndarray:
+        """Row in the students table of each student id, -1 for unknown students."""
+        order, sorted_ids = self._students()
+        positions = np.searchsorted(sorted_ids, student_ids)
+        positions = np.minimum(positions, max(len(sorted_ids) - 1, 0))
+        rows = np.full(len(student_ids), -1, dtype=np.int64)
+        if len(sorted_ids):
+            found = sorted_ids[positions] == student_ids
+            rows[found] = order[positions[found]]
+        return rows
+
+    def _student_mask(self, class_value=None, section=None) -> np.ndarray:
+        """Students table rows of the given class and section."""
+        students = self.tables["students"]
+        mask = np.ones(len(students), dtype=bool)
+        if class_value is not None:
+            mask &= students.columns["class_value"] == students.value("class_value", class_value)
+        if section is not None:
+            mask &= students.columns["section"] == students.value("section", section)
+        return mask
+
+    def _date_mask(self, table: ColumnarTable, column: str, start_date=None, end_date=None) -> np.ndarray:
+        mask = np.ones(len(table), dtype=bool)
+        if start_date is not None:
+            mask &= table.columns[column] >= _day(start_date)
+        if end_date is not None:
+            mask &= table.columns[column] <= _day(end_date)
+        return mask
+
+    def _grade_mask_and_points(self, subject=None, start_date=None, end_date=None) -> tuple:
+        """Records matching the filters, and each record's grade points in whole tenths.
+
+        Sums of whole tenths are exact, so averages don't depend on the order
+        the records are summed in (PostgreSQL's decimal AVG is exact too;
+        SQLite's float AVG can round ties like 2.875 either way).
+        """
+        records = self.tables["academic_records"]
+        mask = self._date_mask(records, "record_date", start_date, end_date)
+        if subject is not None:
+            needle = subject.lower()
+            codes = records.vocabularies["subject"].matching(
+                lambda value: value is not None and needle in value.lower()
+            )
+            mask &= np.isin(records.columns["subject"], codes)
+        grade_points = np.array([
+            self.grade_points.get(str(grade).strip().upper(), np.nan) if grade is not None else np.nan
+            for grade in records.vocabularies["grade"].values
+        ], dtype=np.float64)
+        grade_points = np.rint(grade_points * 10)
+        return mask, grade_points[records.columns["grade"]] if len(grade_points) else np.empty(0)
+
+    # --- Aggregates ---
+
+    @staticmethod
+    def _per_student(table: ColumnarTable, mask: np.ndarray) -> tuple:
+        """Distinct student ids of the selected rows, and each selected row's index into them."""
+        student_ids, index = table.student_index()
+        index = index[mask]
+        selected = np.bincount(index, minlength=len(student_ids)) > 0
+        return student_ids[selected], (np.cumsum(selected) - 1)[index]
+
+    def attendance_by_student(self, student_id=None, start_date=None, end_date=None) -> dict:
+        """Attendance day counts per student, as aligned arrays."""
+        attendance = self.tables["attendance"]
+        mask = self._date_mask(attendance, "attendance_date", start_date, end_date)
+        if student_id is not None:
+            mask &= attendance.columns["student_id"] == student_id
+        student_ids, index = self._per_student(attendance, mask)
+        statuses = np.array([
+            ATTENDANCE_STATUSES.index(value) if value in ATTENDANCE_STATUSES else len(ATTENDANCE_STATUSES)
+            for value in attendance.vocabularies["status"].values
+        ], dtype=np.int64)
+        status = statuses[attendance.columns["status"][mask]] if len(statuses) else np.empty(0, np.int64)
+        kinds = len(ATTENDANCE_STATUSES) + 1
+        counts = np.bincount(index * kinds + status, minlength=len(student_ids) * kinds)
+        counts = counts.reshape(len(student_ids), kinds)
+        return {
+            "student_id": student_ids,
+            "total_days": counts.sum(axis=1),
+            "present_days": counts[:, 0],
+            "absent_days": counts[:, 1],
+            "late_days": counts[:, 2],
+        }
+
+    def behavior_by_student(self, student_id=None, start_date=None, end_date=None) -> dict:
+        """Behavior record counts and sentiment statistics per student, as aligned arrays."""
+        behavior = self.tables["behavior_records"]
+        mask = self._date_mask(behavior, "record_date", start_date, end_date)
+        if student_id is not None:
+            mask &= behavior.columns["student_id"] == student_id
+        student_ids, index = self._per_student(behavior, mask)
+        scores = behavior.columns["sentiment_score"][mask]
+        scored = ~np.isnan(scores)
+        size = len(student_ids)
+        minimum = np.full(size, np.inf)
+        maximum = np.full(size, -np.inf)
+        np.minimum.at(minimum, index[scored], scores[scored])
+        np.maximum.at(maximum, index[scored], scores[scored])
+        sentiment_count = np.bincount(index[scored], minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.bincount(index[scored], weights=scores[scored], minlength=size) / sentiment_count
+        return {
+            "student_id": student_ids,
+            "total_records": np.bincount(index, minlength=size),
+            "sentiment_count": sentiment_count,
+            "avg_sentiment_score": average,
+            "min_sentiment_score": np.where(sentiment_count > 0, minimum, np.nan),
+            "max_sentiment_score": np.where(sentiment_count > 0, maximum, np.nan),
+            "positive_records": np.bincount(index[scores > 0], minlength=size),
+            "negative_records": np.bincount(index[scores < 0], minlength=size),
+            "neutral_records": np.bincount(index[scores == 0], minlength=size),
+        }
+
+    def grades_by_student(self, subject=None, start_date=None, end_date=None) -> dict:
+        """Average grade points per student over records with known grade points."""
+        records = self.tables["academic_records"]
+        mask, points = self._grade_mask_and_points(subject, start_date, end_date)
+        mask &= ~np.isnan(points)
+        student_ids, index = self._per_student(records, mask)
+        counts = np.bincount(index, minlength=len(student_ids))
+        totals = np.bincount(index, weights=points[mask], minlength=len(student_ids))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = totals / 10 / counts
+        return {"student_id": student_ids, "average_grade_points": average, "grade_records": counts}
+
+    def student_metrics(
+        self, class_value=None, section=None, subject=None, start_date=None, end_date=None,
+        behavior: bool = True
+    ) -> dict:
+        """Attendance, grade and (optionally) behavior figures of each student of a class/section.
+
+        Figures a student has no records for are NaN.
+        """
+        students = self.tables["students"]
+        rows = np.flatnonzero(self._student_mask(class_value, section))
+        student_ids = students.columns["student_id"][rows]
+        metrics = {
+            "student_id": student_ids,
+            "student_name": students.columns["student_name"][rows],
+            "class_value": self.category_values("students", "class_value", students.columns["class_value"][rows]),
+            "section": self.category_values("students", "section", students.columns["section"][rows]),
+        }
+
+        def aligned(aggregate: dict, column: str) -> np.ndarray:
+            values = np.full(len(student_ids), np.nan)
+            positions = np.searchsorted(aggregate["student_id"], student_ids)
+            positions = np.minimum(positions, max(len(aggregate["student_id"]) - 1, 0))
+            if len(aggregate["student_id"]):
+                found = aggregate["student_id"][positions] == student_ids
+                values[found] = aggregate[column][positions[found]]
+            return values
+
+        attendance = self.attendance_by_student(None, start_date, end_date)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            attendance["attendance_percentage"] = (
+                attendance["present_days"] * 100.0 / attendance["total_days"]
+            )
+        metrics["attendance_percentage"] = aligned(attendance, "attendance_percentage")
+        grades = self.grades_by_student(subject, start_date, end_date)
+        metrics["average_grade_points"] = aligned(grades, "average_grade_points")
+        if behavior:
+            behavior = self.behavior_by_student(None, start_date, end_date)
+            metrics["avg_sentiment_score"] = aligned(behavior, "avg_sentiment_score")
+            metrics["negative_records"] = aligned(behavior, "negative_records")
+        return metrics
+
+    def category_values(self, table: str, column: str, codes) -> list:
+        values = self.tables[table].vocabularies[column].values
+        return [values[code] for code in codes]
+
+    def summary_rows(self, aggregate: dict) -> list:
+        """Per-student aggregate rows with student_name, ordered by name."""
+        students = self.tables["students"]
+        rows = self._student_rows(aggregate["student_id"])
+        names = [students.columns["student_name"][row] if row >= 0 else None for row in rows]
+        records = []
+        for i, student_id in enumerate(aggregate["student_id"]):
+            record = {"student_id": int(student_id), "student_name": names[i]}
+            for column, values in aggregate.items():
+                if column != "student_id":
+                    value = values[i].item()
+                    record[column] = None if value != value else value
+            records.append(record)
+        records.sort(key=lambda record: (_sort_key(record["student_name"]), record["student_id"]))
+        return records
+
+    def grade_distribution(
+        self, group_by: str, class_value=None, section=None, subject=None,
+        start_date=None, end_date=None
+    ) -> list:
+        """Grade counts and grade points per group, as get_grade_distribution returns them."""
+        records = self.tables["academic_records"]
+        students = self.tables["students"]
+        mask, points = self._grade_mask_and_points(subject, start_date, end_date)
+        student_rows = self._student_rows(records.columns["student_id"])
+        mask &= student_rows >= 0
+        mask[mask] &= self._student_mask(class_value, section)[student_rows[mask]]
+        student_rows, points = student_rows[mask], points[mask]
+        if not len(student_rows):
+            return []
+
+        if group_by == "subject":
+            keys = [("subject", "academic_records", records.columns["subject"][mask])]
+        else:
+            keys = [("class_value", "students", students.columns["class_value"][student_rows])]
+            if group_by == "section":
+                keys.append(("section", "students", students.columns["section"][student_rows]))
+        keys.append(("grade", "academic_records", records.columns["grade"][mask]))
+        # One code per combination of the key columns' codes, counted with bincount
+        sizes = tuple(len(self.tables[table].vocabularies[column].values) for column, table, _ in keys)
+        flat = np.ravel_multi_index(tuple(codes.astype(np.int64) for _, _, codes in keys), sizes)
+        size = math.prod(sizes)
+        graded_rows = ~np.isnan(points)
+        counts = np.bincount(flat, minlength=size)
+        present = np.flatnonzero(counts)
+        counts = counts[present]
+        graded = np.bincount(flat[graded_rows], minlength=size)[present]
+        totals = np.bincount(flat[graded_rows], weights=points[graded_rows], minlength=size)[present]
+        combined = np.unravel_index(present, sizes)
+        keys, grade_codes = keys[:-1], combined[-1]
+
+        key_values = [
+            self.category_values(table, column, combined[i]) for i, (column, table, _) in enumerate(keys)
+        ]
+        grade_values = self.category_values("academic_records", "grade", grade_codes)
+        groups = {}
+        for i in range(len(present)):
+            key = tuple(values[i] for values in key_values)
+            group = groups.setdefault(key, {"records": 0, "graded": 0, "points": 0.0, "grades": {}})
+            group["records"] += int(counts[i])
+            group["graded"] += int(graded[i])
+            group["points"] += float(totals[i])
+            group["grades"][grade_values[i]] = int(counts[i])
+
+        summary = []
+        for key in sorted(groups, key=lambda key: [_sort_key(value) for value in key]):
+            group = groups[key]
+            summary.append({
+                **{column: value for (column, _, _), value in zip(keys, key)},
+                "records": group["records"],
+                "average_grade_points": (
+                    round(group["points"] / 10 / group["graded"], 2) if group["graded"] else None
+                ),
+                "grades": dict(sorted(group["grades"].items(), key=lambda item: _sort_key(item[0]))),
+            })
+        return summary
@@ -0,0 +1,167 @@
+"""Bounded conversation context kept in ADK session state.
+
+State deltas are stored with every event, so the context is not kept under
+one key that each turn would rewrite in full. Instead each verbatim turn
+has a slot key (``conversation_turn_<n>``), the folded older turns live
+under ``conversation_summary`` and ``conversation_turns`` indexes the
+slots. A turn's delta holds the new turn and the index, plus the summary
+only on the turns that fold older turns into it.
+"""
+import json
+
+# Characters kept from each side of a turn when it is folded into the summary
+SUMMARY_SNIPPET_CHARS = 120
+
+SUMMARY_KEY = "conversation_summary"
+TURNS_KEY = "conversation_turns"
+# Single-key context of sessions created before the slot layout
+LEGACY_CONTEXT_KEY = "conversation_context"
+
+
+def context_size_bytes(context: list) -> int:
+    """Returns the serialized size of a conversation context in bytes."""
+    return len(json.dumps(context, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _snippet(text) -> str:
+    text = " ".join(str(text or "").split())
+    if len(text) > SUMMARY_SNIPPET_CHARS:
+        return text[:SUMMARY_SNIPPET_CHARS].rstrip() + "..."
+    return text
+
+
+def _fold_into_summary(summary: dict, turn: dict) -> dict:
+    lines = summary.get("summary", "").splitlines()
+    lines.append(
+        f"User: {_snippet(turn.get('user_message'))} | "
+        f"Assistant: {_snippet(turn.get('agent_response'))}"
+    )
+    return {
+        "summary": "\n".join(lines),
+        "compacted_turns": summary.get("compacted_turns", 0) + 1,
+    }
+
+
+def append_turn(
+    context: list,
+    user_message: str,
+    agent_response: str,
+    max_turns: int = 20,
+    max_bytes: int = 16 * 1024,
+) -> list:
+    """Appends a chat turn to a conversation context and compacts it to budget.
+
+    The context is a list of ``{"user_message", "agent_response"}`` turns,
+    optionally preceded by a single ``{"summary", "compacted_turns"}`` entry.
+    When the recent turns exceed ``max_turns`` or the whole context exceeds
+    ``max_bytes``, the oldest turns are folded into the summary as one short
+    line each, down to half of either budget, so the summary changes once
+    every few turns rather than on every turn. If the summary still leaves
+    the context over half the byte budget, its oldest lines are dropped.
+
+    Args:
+        context: The existing context from session state (not modified).
+        user_message: The user's message for this turn.
+        agent_response: The agent's final response for this turn.
+        max_turns: Maximum number of turns kept verbatim.
+        max_bytes: Byte budget for the serialized context.
+
+    Returns:
+        list: The new, compacted context.
+    """
+    context = list(context or [])
+    summary = {}
+    if context and "summary" in context[0]:
+        summary = context.pop(0)
+
+    turns = context + [{"user_message": user_message, "agent_response": agent_response}]
+
+    def build():
+        return ([summary] if summary else []) + turns
+
+    if len(turns) <= max_turns and context_size_bytes(build()) <= max_bytes:
+        return build()
+
+    # Always keep the latest turn verbatim so the context stays useful
+    max_turns, max_bytes = max(max_turns // 2, 1), max_bytes // 2
+    while len(turns) > 1 and (
+        len(turns) > max_turns or context_size_bytes(build()) > max_bytes
+    ):
+        summary = _fold_into_summary(summary, turns.pop(0))
+
+    while summary and context_size_bytes(build()) > max_bytes:
+        lines = summary["summary"].splitlines()
+        if len(lines) <= 1:
+            summary["summary"] = ""
+            break
+        summary["summary"] = "\n".join(lines[1:])
+
+    return build()
+
+
+def _slot_key(index: int, slots: int) -> str:
+    return f"conversation_turn_{index % slots}"
+
+
+def read_context(state) -> list:
+    """Returns the conversation context stored in session state (see turn_state_delta)."""
+    turns_index = state.get(TURNS_KEY)
+    if turns_index is None:
+        return list(state.get(LEGACY_CONTEXT_KEY) or [])
+    summary = state.get(SUMMARY_KEY) or {}
+    turns = [
+        state[_slot_key(index, turns_index["slots"])]
+        for index in range(turns_index["first"], turns_index["next"])
+    ]
+    return ([summary] if summary else []) + turns
+
+
+def turn_state_delta(
+    state,
+    user_message: str,
+    agent_response: str,
+    max_turns: int = 20,
+    max_bytes: int = 16 * 1024,
+) -> dict:
+    """Returns the state delta that appends a chat turn to the stored context.
+
+    The context is compacted as by append_turn. The delta writes the new
+    turn's slot and the slot index, the summary only when it changed, and
+    every slot once when converting a session's legacy single-key context.
+
+    Args:
+        state: The session state (not modified).
+        user_message: The user's message for this turn.
+        agent_response: The agent's final response for this turn.
+        max_turns: Maximum number of turns kept verbatim.
+        max_bytes: Byte budget for the serialized context.
+
+    Returns:
+        dict: State delta for an Event's actions.
+    """
+    context = read_context(state)
+    turns_index = state.get(TURNS_KEY)
+    # The slot count is fixed when a session's first turn is stored
+    slots = turns_index["slots"] if turns_index else max(max_turns, 1)
+    old_summary = context[0] if context and "summary" in context[0] else {}
+    old_next = turns_index["next"] if turns_index else len(context) - bool(old_summary)
+
+    context = append_turn(
+        context, user_message, agent_response, max_turns=min(max_turns, slots), max_bytes=max_bytes
+    )
+    summary = context[0] if "summary" in context[0] else {}
+    turns = context[1:] if summary else context
+    next_index = old_next + 1
+    first_index = next_index - len(turns)
+
+    delta = {TURNS_KEY: {"first": first_index, "next": next_index, "slots": slots}}
+    if turns_index is None:
+        for index, turn in zip(range(first_index, next_index), turns):
+            delta[_slot_key(index, slots)] = turn
+        if LEGACY_CONTEXT_KEY in state:
+            delta[LEGACY_CONTEXT_KEY] = None
+    else:
+        delta[_slot_key(next_index - 1, slots)] = turns[-1]
+    if summary != old_summary:
+        delta[SUMMARY_KEY] = summary
+    return delta
@@ -0,0 +1,103 @@
+import logging
+import os
+import time
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - [%(name)s] - %(message)s"
+LOGGER_PREFIX = "teacher_assistant"
+
+
+def get_logger(category: str) -> logging.Logger:
+    """Returns the logger for a category such as 'stream.audio' or 'tools'."""
+    return logging.getLogger(f"{LOGGER_PREFIX}.{category}")
+
+
+def configure_logging():
+    """Configures logging from the environment.
+
+    LOG_LEVEL sets the default level (INFO). LOG_LEVELS overrides levels per
+    category as a comma-separated list, e.g. "stream=DEBUG,tools=WARNING".
+    """
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(), format=LOG_FORMAT
+    )
+    for item in os.getenv("LOG_LEVELS", "").split(","):
+        category, _, level = item.partition("=")
+        if category.strip() and level.strip():
+            get_logger(category.strip()).setLevel(level.strip().upper())
+
+
+class RateLimitedLogger:
+    """Logs at most one message per key every `interval` seconds.
+
+    Suppressed messages are counted and reported with the next one logged.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 5.0):
+        self.logger = logger
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+
+    def log(self, level: int, key: str, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last.get(key, float("-inf")) < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            msg += f" ({suppressed} similar messages suppressed)"
+        self.logger.log(level, msg, *args)
+
+
+class StreamCounters:
+    """Aggregated frame, byte and latency counters for the streaming hot path.
+
+    Callers record every frame; a single summary line per direction and kind
+    is logged every `interval` seconds instead of one line per frame.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 30.0):
+        self.logger = logger
+        self.interval = interval
+        self._window_start = time.monotonic()
+        self._counters = {}
+
+    def record(self, direction: str, kind: str, nbytes: int, latency_ms: float = None):
+        counter = self._counters.get((direction, kind))
+        if counter is None:
+            counter = self._counters[(direction, kind)] = {
+                "frames": 0,
+                "bytes": 0,
+                "latency_ms_total": 0.0,
+                "latency_ms_max": 0.0,
+                "latency_samples": 0,
+            }
+        counter["frames"] += 1
+        counter["bytes"] += nbytes
+        if latency_ms is not None:
+            counter["latency_ms_total"] += latency_ms
+            counter["latency_ms_max"] = max(counter["latency_ms_max"], latency_ms)
+            counter["latency_samples"] += 1
+
+        if time.monotonic() - self._window_start >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Logs one summary line per (direction, kind) and starts a new window."""
+        elapsed = max(time.monotonic() - self._window_start, 1e-9)
+        if self.logger.isEnabledFor(logging.INFO):
+            for (direction, kind), c in sorted(self._counters.items()):
+                line = (
+                    f"{direction} {kind}: {c['frames']} frames "
+                    f"({c['frames'] / elapsed:.1f}/s), {c['bytes']} bytes "
+                    f"({c['bytes'] / elapsed / 1024:.1f} KiB/s)"
+                )
+                if c["latency_samples"]:
+                    avg = c["latency_ms_total"] / c["latency_samples"]
+                    line += f", latency avg {avg:.1f} ms max {c['latency_ms_max']:.1f} ms"
+                self.logger.info(line)
+        self._counters = {}
+        self._window_start = time.monotonic()
@@ -0,0 +1,394 @@
+"""Schema migrations for the app schema used by the database tools.
+
+Migrations are applied in order and recorded in app.schema_migrations, so
+running them again is a no-op. Every statement is idempotent as well, which
+lets them run against databases created before this module existed; on an
+empty database, 0000 creates the app schema itself.
+
+Statements are plain SQL, or a dict of SQL per dialect name ("postgresql",
+"sqlite") where the dialects differ; a dialect missing from the dict skips
+the statement. A dict may also carry a "log" message, logged as a warning
+with the statement's row count when it changed rows. On SQLite the
+database file is attached as schema "app".
+
+Migrations that delete data (0001) keep a copy of the deleted rows.
+"""
+import logging
+
+from sqlalchemy import text
+
+# The teacher_assistant.migrations category of logging_config.get_logger;
+# named directly because server.py also runs as a script next to this module
+logger = logging.getLogger("teacher_assistant.migrations")
+
+# Serializes concurrent MCP server processes applying migrations
+MIGRATION_LOCK_ID = 7_240_001
+
+
+def table(ddl: str) -> dict:
+    """CREATE TABLE for both dialects; SERIAL becomes an SQLite rowid alias."""
+    return {
+        "postgresql": ddl,
+        "sqlite": ddl.replace("SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    }
+
+
+def index(name: str, table_name: str, columns: str, unique: bool = False) -> dict:
+    """CREATE INDEX for both dialects; SQLite qualifies the index, not the table."""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    return {
+        "postgresql": f"CREATE {kind} IF NOT EXISTS {name} ON app.{table_name} ({columns})",
+        "sqlite": f"CREATE {kind} IF NOT EXISTS app.{name} ON {table_name} ({columns})",
+    }
+
+
+MIGRATIONS = [
+    # The tables the database tools read and write. Databases created before
+    # this migration already have them, so it only fills in what is missing.
+    (
+        "0000_app_schema",
+        "The app schema tables used by the database tools",
+        [
+            {"postgresql": "CREATE SCHEMA IF NOT EXISTS app"},
+            table("""
+            CREATE TABLE IF NOT EXISTS app.students (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER NOT NULL UNIQUE,
+                student_name VARCHAR(255) NOT NULL,
+                parent_name VARCHAR(255),
+                parent_phone VARCHAR(20),
+                class_value VARCHAR(20),
+                section VARCHAR(10),
+                date_of_birth DATE,
+                gender VARCHAR(20),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """),
+            table("""
+            CREATE TABLE IF NOT EXISTS app.users (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) UNIQUE,
+                password_hash VARCHAR(255),
+                role VARCHAR(20) NOT NULL,
+                language VARCHAR(10) DEFAULT 'en',
+                phone VARCHAR(20),
+                student_id INTEGER,
+                subject VARCHAR(100),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """),
+            table("""
+            CREATE TABLE IF NOT EXISTS app.academic_records (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                subject VARCHAR(100) NOT NULL,
+                grade VARCHAR(20) NOT NULL,
+                record_date DATE NOT NULL,
+                teacher_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """),
+            table("""
+            CREATE TABLE IF NOT EXISTS app.attendance (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                attendance_date DATE NOT NULL,
+                status VARCHAR(10) NOT NULL DEFAULT 'present',
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """),
+            table("""
+            CREATE TABLE IF NOT EXISTS app.behavior_records (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                logged_by INTEGER,
+                source VARCHAR(50) NOT NULL,
+                behaviour_type VARCHAR(50),
+                sentiment_score NUMERIC(3, 2),
+                comment TEXT,
+                record_date DATE NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """),
+        ],
+    ),
+    (
+        "0001_attendance_unique_student_date",
+        "One attendance row per student and date, for mark_attendance upserts",
+        [
+            # Keep the most recent row of any existing duplicates, copying
+            # the others to app.attendance_removed_duplicates first
+            """
+            CREATE TABLE IF NOT EXISTS app.attendance_removed_duplicates AS
+            SELECT * FROM app.attendance WHERE 1 = 0
+            """,
+            """
+            INSERT INTO app.attendance_removed_duplicates
+            SELECT a.* FROM app.attendance a
+            WHERE EXISTS (
+                SELECT 1 FROM app.attendance b
+                WHERE b.student_id = a.student_id
+                  AND b.attendance_date = a.attendance_date
+                  AND b.id > a.id
+            )
+            """,
+            {
+                "postgresql": """
+                DELETE FROM app.attendance a
+                USING app.attendance b
+                WHERE a.student_id = b.student_id
+                  AND a.attendance_date = b.attendance_date
+                  AND a.id < b.id
+                """,
+                "sqlite": """
+                DELETE FROM app.attendance
+                WHERE EXISTS (
+                    SELECT 1 FROM app.attendance b
+                    WHERE b.student_id = attendance.student_id
+                      AND b.attendance_date = attendance.attendance_date
+                      AND b.id > attendance.id
+                )
+                """,
+                "log": "Removed %d duplicate attendance rows; copies are in app.attendance_removed_duplicates",
+            },
+            index("attendance_student_date_key", "attendance", "student_id, attendance_date", unique=True),
+        ],
+    ),
+    (
+        "0002_summary_rollups",
+        "Per-student attendance and behavior rollups read by the summary tools",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS app.attendance_monthly (
+                student_id INTEGER NOT NULL,
+                month_start DATE NOT NULL,
+                total_days INTEGER NOT NULL,
+                present_days INTEGER NOT NULL,
+                absent_days INTEGER NOT NULL,
+                late_days INTEGER NOT NULL,
+                PRIMARY KEY (student_id, month_start)
+            )
+            """,
+            index("attendance_monthly_month_idx", "attendance_monthly", "month_start"),
+            # Partial months at the ends of a summary range are read from here
+            index("attendance_date_idx", "attendance", "attendance_date"),
+            """
+            CREATE TABLE IF NOT EXISTS app.behavior_daily (
+                student_id INTEGER NOT NULL,
+                record_date DATE NOT NULL,
+                total_records INTEGER NOT NULL,
+                sentiment_count INTEGER NOT NULL,
+                sentiment_sum NUMERIC,
+                min_sentiment NUMERIC,
+                max_sentiment NUMERIC,
+                positive_records INTEGER NOT NULL,
+                negative_records INTEGER NOT NULL,
+                neutral_records INTEGER NOT NULL,
+                PRIMARY KEY (student_id, record_date)
+            )
+            """,
+            index("behavior_daily_date_idx", "behavior_daily", "record_date"),
+            """
+            CREATE TABLE IF NOT EXISTS app.behavior_monthly (
+                student_id INTEGER NOT NULL,
+                month_start DATE NOT NULL,
+                total_records INTEGER NOT NULL,
+                sentiment_count INTEGER NOT NULL,
+                sentiment_sum NUMERIC,
+                min_sentiment NUMERIC,
+                max_sentiment NUMERIC,
+                positive_records INTEGER NOT NULL,
+                negative_records INTEGER NOT NULL,
+                neutral_records INTEGER NOT NULL,
+                PRIMARY KEY (student_id, month_start)
+            )
+            """,
+            index("behavior_monthly_month_idx", "behavior_monthly", "month_start"),
+            # Backfill from the existing rows
+            {
+                dialect: f"""
+                INSERT INTO app.attendance_monthly
+                SELECT student_id, {month}, COUNT(*),
+                       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END)
+                FROM app.attendance
+                WHERE student_id IS NOT NULL AND attendance_date IS NOT NULL
+                GROUP BY 1, 2
+                ON CONFLICT DO NOTHING
+                """
+                for dialect, month in (
+                    ("postgresql", "CAST(date_trunc('month', attendance_date) AS DATE)"),
+                    ("sqlite", "date(attendance_date, 'start of month')"),
+                )
+            },
+            """
+            INSERT INTO app.behavior_daily
+            SELECT student_id, record_date, COUNT(*), COUNT(sentiment_score),
+                   ROUND(SUM(sentiment_score), 2), MIN(sentiment_score), MAX(sentiment_score),
+                   SUM(CASE WHEN sentiment_score > 0 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN sentiment_score < 0 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN sentiment_score = 0 THEN 1 ELSE 0 END)
+            FROM app.behavior_records
+            WHERE student_id IS NOT NULL AND record_date IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT DO NOTHING
+            """,
+            {
+                dialect: f"""
+                INSERT INTO app.behavior_monthly
+                SELECT student_id, {month},
+                       SUM(total_records), SUM(sentiment_count), ROUND(SUM(sentiment_sum), 2),
+                       MIN(min_sentiment), MAX(max_sentiment), SUM(positive_records),
+                       SUM(negative_records), SUM(neutral_records)
+                FROM app.behavior_daily
+                WHERE true
+                GROUP BY 1, 2
+                ON CONFLICT DO NOTHING
+                """
+                for dialect, month in (
+                    ("postgresql", "CAST(date_trunc('month', record_date) AS DATE)"),
+                    ("sqlite", "date(record_date, 'start of month')"),
+                )
+            },
+        ],
+    ),
+    # Indexes for the filters and orderings of the record and lookup tools;
+    # explain_tool_queries reports the tool queries that still scan tables
+    (
+        "0003_tool_query_indexes",
+        "Composite indexes matching the database tools' filters and sort orders",
+        [
+            # Paging orders: record_date DESC, id DESC, overall and per student
+            index("academic_records_date_idx", "academic_records", "record_date DESC, id DESC"),
+            index(
+                "academic_records_student_date_idx",
+                "academic_records",
+                "student_id, record_date DESC, id DESC",
+            ),
+            index("academic_records_teacher_idx", "academic_records", "teacher_id"),
+            index("behavior_records_date_idx", "behavior_records", "record_date DESC, id DESC"),
+            index(
+                "behavior_records_student_date_idx",
+                "behavior_records",
+                "student_id, record_date DESC, id DESC",
+            ),
+            index("behavior_records_logged_by_idx", "behavior_records", "logged_by"),
+            # Class rosters, ordered by name
+            index("students_class_section_name_idx", "students", "class_value, section, student_name"),
+            index("users_role_name_idx", "users", "role, name"),
+            index("users_student_idx", "users", "student_id"),
+        ],
+    ),
+    # Substring searches (ILIKE '%x%') cannot use a btree index. Needs the
+    # pg_trgm extension; where it cannot be created the indexes are skipped
+    # with a warning (explain_tool_queries then reports the scans). To add
+    # them later, install pg_trgm, delete this version from
+    # app.schema_migrations and rerun the migrations. SQLite has no
+    # equivalent, so there the searches scan the table.
+    (
+        "0004_trigram_search_indexes",
+        "Trigram indexes for the ILIKE searches on names and subjects",
+        [
+            {
+                "postgresql": """
+                DO $$
+                BEGIN
+                    BEGIN
+                        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                    EXCEPTION WHEN OTHERS THEN
+                        RAISE WARNING USING MESSAGE =
+                            'pg_trgm is not available, trigram indexes skipped: ' || SQLERRM;
+                        RETURN;
+                    END;
+                    CREATE INDEX IF NOT EXISTS students_name_trgm_idx
+                    ON app.students USING gin (student_name gin_trgm_ops);
+                    CREATE INDEX IF NOT EXISTS users_name_trgm_idx
+                    ON app.users USING gin (name gin_trgm_ops);
+                    CREATE INDEX IF NOT EXISTS users_subject_trgm_idx
+                    ON app.users USING gin (subject gin_trgm_ops);
+                    CREATE INDEX IF NOT EXISTS academic_records_subject_trgm_idx
+                    ON app.academic_records USING gin (subject gin_trgm_ops);
+                END
+                $$
+                """,
+            },
+        ],
+    ),
+    (
+        "0005_snapshot_watermark_indexes",
+        "Indexes on the watermark columns read by the analytics snapshot refresh",
+        [
+            index("students_updated_at_idx", "students", "updated_at"),
+            index("academic_records_updated_at_idx", "academic_records", "updated_at"),
+            index("attendance_created_at_idx", "attendance", "created_at"),
+            index("behavior_records_created_at_idx", "behavior_records", "created_at"),
+        ],
+    ),
+]
+
+
+def applied_migrations(conn) -> set:
+    """Returns the versions already recorded in app.schema_migrations."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE SCHEMA IF NOT EXISTS app"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS app.schema_migrations (
+            version VARCHAR(100) PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    return set(conn.execute(text("SELECT version FROM app.schema_migrations")).scalars())
+
+
+def apply_migrations(conn) -> list:
+    """Applies pending migrations on a connection, one transaction each.
+
+    Returns:
+        list: The versions applied by this call.
+    """
+    dialect = conn.dialect.name
+    # SQLite serializes writers with its database lock instead
+    locked = dialect == "postgresql"
+    if locked:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    try:
+        applied = applied_migrations(conn)
+        conn.commit()
+        newly_applied = []
+        for version, description, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info("Applying migration %s: %s", version, description)
+            try:
+                for statement in statements:
+                    message = None
+                    if isinstance(statement, dict):
+                        statement, message = statement.get(dialect), statement.get("log")
+                    if statement:
+                        result = conn.execute(text(statement))
+                        if message and result.rowcount > 0:
+                            logger.warning(message, result.rowcount)
+                conn.execute(
+                    text(
+                        "INSERT INTO app.schema_migrations (version, description) "
+                        "VALUES (:version, :description)"
+                    ),
+                    {"version": version, "description": description},
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            newly_applied.append(version)
+        return newly_applied
+    finally:
+        if locked:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            conn.commit()
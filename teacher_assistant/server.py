@@ -1,16 +1,36 @@
 import asyncio
+import base64
+import contextvars
+import copy
+import functools
+import inspect
 import json
 import logging  # Added logging
+import logging.handlers
 import os
-from datetime import date, datetime
+import re
+import sys
+import time
+
+# Start of the MCP server's startup, before the SQLAlchemy, MCP and ADK imports
+_PROCESS_START = time.perf_counter()
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Optional
-from sqlalchemy import create_engine, MetaData, text
+import numpy as np
+from sqlalchemy import create_engine, event, make_url, MetaData, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from urllib.parse import quote
 
 import mcp.server.stdio  # For running as a stdio server
+try:
+    import orjson  # Optional: faster serialization of tool responses
+except ImportError:
+    orjson = None
 from dotenv import load_dotenv
 
 # ADK Tool Imports
@@ -22,17 +42,33 @@ from mcp import types as mcp_types  # Use alias to avoid conflict
 from mcp.server.lowlevel import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 
+if __package__:
+    from .analytics_snapshot import SNAPSHOT_TABLES, AnalyticsSnapshot
+    from .migrations import apply_migrations
+else:
+    # Launched as a script (python3 server.py) by the MCP toolset
+    from analytics_snapshot import SNAPSHOT_TABLES, AnalyticsSnapshot
+    from migrations import apply_migrations
+
 load_dotenv()
 
 # --- Logging Setup ---
+# Only when run as the MCP server; imported in-process (see
+# in_process_db_tools) the host application configures logging. The log file
+# is appended to and rotated, so a restarted or second server process does
+# not truncate the log of the previous one.
 LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), "mcp_server_activity.log")
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE_PATH, mode="w"),
-    ],
-)
+MCP_LOG_LEVEL = os.getenv("MCP_LOG_LEVEL", "INFO").upper()
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=MCP_LOG_LEVEL,
+        format="%(asctime)s - %(process)d - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
+        handlers=[
+            logging.handlers.RotatingFileHandler(
+                LOG_FILE_PATH, maxBytes=10 * 1024 * 1024, backupCount=3
+            ),
+        ],
+    )
 # --- End Logging Setup ---
 
 # Database credentials
@@ -45,11 +81,144 @@ database = "student"
 # URL encode the password to handle special characters
 password = quote(password)
 
-# Construct the database URI
-DATABASE_URI = f"postgresql://{username}:{password}@{host}:{port}/{database}"
+# Construct the database URI. DATABASE_URL overrides it, e.g. a local
+# PostgreSQL database or sqlite:///path/to/school.db for offline testing.
+DATABASE_URI = os.getenv(
+    "DATABASE_URL", f"postgresql://{username}:{password}@{host}:{port}/{database}"
+)
+DB_DIALECT = make_url(DATABASE_URI).get_backend_name()
+
+# The MCP tools run on an async engine using psycopg 3's (or aiosqlite's) async driver
+ASYNC_DATABASE_URI = DATABASE_URI.replace("postgresql://", "postgresql+psycopg://", 1)
+
+# --- Connection Pool Settings ---
+# Tool calls from several agents share one pool of connections. Pre-ping
+# replaces connections dropped by the server, and recycling keeps them
+# under Cloud SQL's idle timeout.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# Statement echo is off by default; DB_SLOW_QUERY_MS > 0 logs only the
+# statements slower than that many milliseconds.
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 0))
+# The async engine's psycopg 3 driver prepares a statement on the server once
+# it has run this many times on a connection. The tools' SQL is fixed per
+# combination of filters, so their plans are reused; "none" disables it, e.g.
+# behind PgBouncer in transaction mode. The sync engine (psycopg2) never
+# prepares statements.
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5")
+
+POOL_OPTIONS = {
+    "echo": DB_ECHO,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": True,
+}
+
+
+def _configure_sqlite(sync_engine, path: str):
+    """Attaches the SQLite database file as schema "app" on each connection.
+
+    The tools' app.* table names then work unchanged. Transactions are
+    begun by SQLAlchemy rather than the sqlite3 module, so savepoints work.
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("ATTACH DATABASE ? AS app", (path,))
+        cursor.execute("PRAGMA app.journal_mode = WAL")
+        cursor.execute(f"PRAGMA busy_timeout = {int(DB_POOL_TIMEOUT * 1000)}")
+        cursor.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+# Create the SQLAlchemy engines: a sync one for direct callers of the tool
+# functions, and an async one used by the MCP server (see async_db_tool)
+if DB_DIALECT == "sqlite":
+    SQLITE_PATH = make_url(DATABASE_URI).database
+    if not SQLITE_PATH or SQLITE_PATH == ":memory:":
+        raise ValueError("DATABASE_URL must name an SQLite database file.")
+    # The main database of each connection is an empty in-memory one; the
+    # pools are set explicitly since SQLAlchemy's defaults for in-memory
+    # SQLite keep a single connection. Pooled connections move between
+    # threads (threaded_tool), one thread at a time.
+    engine = create_engine(
+        "sqlite://", poolclass=QueuePool, connect_args={"check_same_thread": False}, **POOL_OPTIONS
+    )
+    async_engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=AsyncAdaptedQueuePool, **POOL_OPTIONS
+    )
+    _configure_sqlite(engine, SQLITE_PATH)
+    _configure_sqlite(async_engine.sync_engine, SQLITE_PATH)
+else:
+    engine = create_engine(DATABASE_URI, **POOL_OPTIONS)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URI,
+        connect_args={
+            "prepare_threshold": None
+            if DB_PREPARE_THRESHOLD.lower() == "none"
+            else int(DB_PREPARE_THRESHOLD)
+        },
+        **POOL_OPTIONS,
+    )
+
+# SQL that differs between the two backends. SQLite's LIKE is already
+# case-insensitive for ASCII. INSERTED_FLAG tells rows inserted by an upsert
+# from updated ones in its RETURNING clause: PostgreSQL's xmax is 0 only for
+# inserted rows; SQLite has no equivalent (see _marked_before).
+ILIKE = "ILIKE" if DB_DIALECT == "postgresql" else "LIKE"
+INSERTED_FLAG = "(xmax = 0)" if DB_DIALECT == "postgresql" else "NULL"
+
+# Pool counters reported by get_db_pool_stats()
+pool_counters = {
+    "connects": 0,
+    "checkouts": 0,
+    "max_checked_out": 0,
+    "slow_queries": 0,
+}
+
+
+def _instrument_engine(sync_engine):
+    """Attaches the pool counters and slow-query logging to an engine."""
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_counters["connects"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_counters["checkouts"] += 1
+        pool_counters["max_checked_out"] = max(
+            pool_counters["max_checked_out"], sync_engine.pool.checkedout()
+        )
 
-# Create the SQLAlchemy engine
-engine = create_engine(DATABASE_URI, echo=True)
+    if DB_SLOW_QUERY_MS > 0:
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+            if elapsed_ms >= DB_SLOW_QUERY_MS:
+                pool_counters["slow_queries"] += 1
+                logging.warning(
+                    f"Slow query ({elapsed_ms:.1f} ms): {statement} params={parameters}"
+                )
+
+
+_instrument_engine(engine)
+_instrument_engine(async_engine.sync_engine)
 
 # Create a declarative base class for your ORM models
 Base = declarative_base()
@@ -72,11 +241,525 @@ def json_serializer(obj):
         return float(obj)
     raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
+
+# Tool response formats. "json" is the indented JSON the server has always
+# returned. "compact" turns every list of row dicts into
+# {"columns": [...], "rows": [[...], ...]} so column names appear once, and
+# skips indentation. Clients pick one per call with the response_format
+# argument; MCP_RESPONSE_FORMAT sets the default.
+RESPONSE_FORMATS = ("json", "compact")
+MCP_RESPONSE_FORMAT = os.getenv("MCP_RESPONSE_FORMAT", "json")
+
+
+def to_columnar(result):
+    """Converts lists of row dicts in a tool result to column/row arrays."""
+    if isinstance(result, dict):
+        return {key: to_columnar(value) for key, value in result.items()}
+    if isinstance(result, list) and result and all(isinstance(row, dict) for row in result):
+        columns = list(result[0])
+        if all(len(row) == len(columns) for row in result):
+            try:
+                return {"columns": columns, "rows": [[row[c] for c in columns] for row in result]}
+            except KeyError:
+                pass
+    return result
+
+
+def to_json_compatible(result):
+    """Converts dates and Decimals in a tool result the way json_serializer does."""
+    if isinstance(result, dict):
+        return {key: to_json_compatible(value) for key, value in result.items()}
+    if isinstance(result, (list, tuple)):
+        return [to_json_compatible(value) for value in result]
+    if isinstance(result, (datetime, date, Decimal)):
+        return json_serializer(result)
+    return result
+
+
+def encode_tool_response(result, response_format: str = "json") -> str:
+    """Serializes a tool result in the requested response format."""
+    if response_format != "compact":
+        return json.dumps(result, indent=2, default=json_serializer)
+    result = to_columnar(result)
+    if orjson is not None:
+        return orjson.dumps(result, default=json_serializer).decode("utf-8")
+    return json.dumps(result, separators=(",", ":"), default=json_serializer)
+
+# --- Pagination Helpers ---
+# Record tools return one page at a time: limit/offset, or keyset pagination
+# through the opaque next_cursor of the previous page. Rows are streamed from
+# a server-side cursor in batches of DB_FETCH_BATCH_SIZE.
+DB_DEFAULT_PAGE_SIZE = int(os.getenv("DB_DEFAULT_PAGE_SIZE", 100))
+DB_MAX_PAGE_SIZE = int(os.getenv("DB_MAX_PAGE_SIZE", 1000))
+DB_FETCH_BATCH_SIZE = int(os.getenv("DB_FETCH_BATCH_SIZE", 500))
+
+
+def page_limit(limit: Optional[int]) -> int:
+    """Clamps a requested page size to 1..DB_MAX_PAGE_SIZE."""
+    if limit is None:
+        return min(DB_DEFAULT_PAGE_SIZE, DB_MAX_PAGE_SIZE)
+    return max(1, min(int(limit), DB_MAX_PAGE_SIZE))
+
+
+def encode_cursor(values: list) -> str:
+    payload = json.dumps(values, default=json_serializer).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor.")
+    return values
+
+
+def order_by_clause(order: list) -> str:
+    return " ORDER BY " + ", ".join(f"{column} {direction}" for column, direction, _ in order)
+
+
+def keyset_condition(order: list, cursor: str, params: dict) -> str:
+    """Builds the WHERE condition selecting the rows after a cursor.
+
+    Args:
+        order: (column expression, "ASC"/"DESC", record key) tuples, the
+               last of which must make the ordering unique.
+        cursor: next_cursor from the previous page.
+        params: Query parameters, extended with the cursor values.
+    """
+    values = decode_cursor(cursor, len(order))
+    clauses = []
+    for i, (column, direction, _) in enumerate(order):
+        parts = [f"{order[j][0]} = :cursor_{j}" for j in range(i)]
+        parts.append(f"{column} {'<' if direction == 'DESC' else '>'} :cursor_{i}")
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params[f"cursor_{i}"] = values[i]
+    return "(" + " OR ".join(clauses) + ")"
+
+
+def fetch_page(conn, query: str, params: dict, limit: int, offset: int = 0) -> tuple:
+    """Runs a query for one page of rows through a server-side cursor.
+
+    Returns:
+        tuple: (records, has_more), where records is at most `limit` dicts.
+    """
+    query += " LIMIT :page_limit"
+    params = {**params, "page_limit": limit + 1}
+    if offset:
+        query += " OFFSET :page_offset"
+        params["page_offset"] = offset
+    result = conn.execute(
+        text(query), params,
+        execution_options={"yield_per": DB_FETCH_BATCH_SIZE},
+    )
+    columns = list(result.keys())
+    records = [dict(zip(columns, row)) for row in result]
+    return records[:limit], len(records) > limit
+
+
+def page_info(records: list, total: int, limit: int, offset: Optional[int],
+              has_more: bool, order: Optional[list] = None) -> dict:
+    """Builds the pagination fields returned alongside a page of records.
+
+    offset is None for pages fetched by cursor.
+    """
+    info = {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "has_more": has_more,
+        "next_offset": offset + len(records) if has_more and offset is not None else None,
+        "next_cursor": None,
+    }
+    if has_more and order:
+        info["next_cursor"] = encode_cursor([records[-1][key] for _, _, key in order])
+    return info
+
+
+# --- Tool Result Cache ---
+# Read tool results are cached per process, keyed on tool name and arguments.
+# Write tools invalidate every cached result that read the tables they
+# change, but only in their own process: with several workers (each with
+# its own MCP server), or the CLI next to the web server, a write leaves
+# the other processes' cached results stale until the TTL. The short
+# default keeps that within a few seconds while still serving the repeated
+# identical calls of an agent turn.
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", 5))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 512))
+
+
+class ToolResultCache:
+    """TTL/LRU read-through cache of tool results with per-table invalidation."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._keys_by_table = {}
+        # Bumped on every invalidation, so a read that overlapped a write
+        # does not store a result from before the write
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.tool_stats = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(name: str, signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+        """Normalizes a call so omitted and explicitly passed defaults match."""
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = {k: v for k, v in bound.arguments.items() if v is not None}
+        return name + ":" + json.dumps(
+            arguments, sort_keys=True, default=json_serializer
+        )
+
+    def get(self, key: str):
+        """Returns a copy of the cached result, or None if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self.expirations += 1
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(entry[2])
+
+    def put(self, key: str, tables: tuple, result, generations: tuple):
+        """Stores a copy of a result, unless the tables were written since generations."""
+        if generations != self._snapshot(tables):
+            return
+        if key in self._entries:
+            self._remove(key)
+        # Copied in and out, so callers may modify the results they get
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, tables, copy.deepcopy(result))
+        for table in tables:
+            self._keys_by_table.setdefault(table, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.evictions += 1
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tables):
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in list(self._keys_by_table.get(table, ())):
+                self.invalidations += 1
+                self._remove(key)
+
+    def clear(self):
+        self.invalidate(list(self._keys_by_table))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "tools": self.tool_stats,
+        }
+
+    def cached(self, func, tables: tuple):
+        """Wraps an async read tool so identical calls are served from the cache."""
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return await func(*args, **kwargs)
+            key = self.make_key(func.__name__, signature, args, kwargs)
+            counts = self.tool_stats.setdefault(func.__name__, {"hits": 0, "misses": 0})
+            result = self.get(key)
+            if result is not None:
+                self.hits += 1
+                counts["hits"] += 1
+                return result
+
+            self.misses += 1
+            counts["misses"] += 1
+            generations = self._snapshot(tables)
+            result = await func(*args, **kwargs)
+            if isinstance(result, dict) and result.get("success"):
+                self.put(key, tables, result, generations)
+            return result
+
+        return wrapper
+
+    def invalidating(self, func, tables: Optional[tuple] = None):
+        """Wraps an async write tool so it invalidates the tables it changes.
+
+        With ``tables`` left as None the table comes from the call's
+        ``table_name`` argument, for the generic insert/delete tools.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if tables is None:
+                bound = signature.bind(*args, **kwargs)
+                changed = (bound.arguments.get("table_name"),)
+            else:
+                changed = tables
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.invalidate(changed)
+
+        return wrapper
+
+    def _snapshot(self, tables: tuple) -> tuple:
+        return tuple(self._generations.get(table, 0) for table in tables)
+
+    def _remove(self, key: str):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+
+tool_cache = ToolResultCache(
+    max_entries=TOOL_CACHE_MAX_ENTRIES, ttl_seconds=TOOL_CACHE_TTL_SECONDS
+)
+
+# --- Summary Rollups ---
+# get_attendance_summary and get_behavior_summary read per-student rollups
+# (migration 0002) instead of aggregating the raw tables on every call:
+# app.attendance_monthly, app.behavior_daily and app.behavior_monthly. The
+# write tools recompute the rollup rows for the students and dates they
+# touch in the same transaction; check_summary_rollups finds and repairs
+# drift from writes made outside the tools.
+ROLLUP_BATCH_SIZE = 500
+
+# Rollup columns, and the aggregate over the raw rows that each must match.
+# Scores have two decimals; rounding their sums keeps SQLite's floating-point
+# sums equal whether added up from raw rows or from daily rollups.
+ROLLUP_COLUMNS = {
+    "attendance_monthly": "total_days, present_days, absent_days, late_days",
+    "behavior_daily": (
+        "total_records, sentiment_count, sentiment_sum, min_sentiment, max_sentiment, "
+        "positive_records, negative_records, neutral_records"
+    ),
+}
+ROLLUP_COLUMNS["behavior_monthly"] = ROLLUP_COLUMNS["behavior_daily"]
+
+ATTENDANCE_AGGREGATES = """
+    COUNT(*),
+    SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN a.status = 'late' THEN 1 ELSE 0 END)
+"""
+BEHAVIOR_AGGREGATES = """
+    COUNT(*), COUNT(b.sentiment_score), ROUND(SUM(b.sentiment_score), 2),
+    MIN(b.sentiment_score), MAX(b.sentiment_score),
+    SUM(CASE WHEN b.sentiment_score > 0 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN b.sentiment_score < 0 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN b.sentiment_score = 0 THEN 1 ELSE 0 END)
+"""
+
+
+# app.attendance in the layout of app.attendance_monthly, one row per student and day
+ATTENDANCE_DAILY = """(SELECT student_id, attendance_date, 1 AS total_days,
+                       CASE WHEN status = 'present' THEN 1 ELSE 0 END AS present_days,
+                       CASE WHEN status = 'absent' THEN 1 ELSE 0 END AS absent_days,
+                       CASE WHEN status = 'late' THEN 1 ELSE 0 END AS late_days
+                FROM app.attendance) AS a"""
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_start_sql(column: str) -> str:
+    """SQL for the first day of the month of a date column."""
+    if DB_DIALECT == "sqlite":
+        return f"date({column}, 'start of month')"
+    return f"CAST(date_trunc('month', {column}) AS DATE)"
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _refresh_rollup(conn, table: str, key_columns: tuple, keys: list, select: str):
+    """Recomputes the rows of a rollup table for the given keys.
+
+    Each key is a tuple for key_columns, whose first two columns identify a
+    rollup row. select is an aggregate query over a CTE named k holding the
+    keys; rows it no longer produces (everything deleted) are removed.
+    """
+    for start in range(0, len(keys), ROLLUP_BATCH_SIZE):
+        values, params = [], {}
+        for i, key in enumerate(keys[start:start + ROLLUP_BATCH_SIZE]):
+            names = [f"{column}_{i}" for column in key_columns]
+            values.append("(" + ", ".join(f":{name}" for name in names) + ")")
+            params.update(zip(names, key))
+        cte = f"WITH k ({', '.join(key_columns)}) AS (VALUES {', '.join(values)}) "
+        row_key = f"{key_columns[0]}, {key_columns[1]}"
+        conn.execute(
+            text(cte + f"DELETE FROM app.{table} WHERE ({row_key}) IN (SELECT {row_key} FROM k)"),
+            params,
+        )
+        conn.execute(
+            text(cte + f"INSERT INTO app.{table} ({row_key}, {ROLLUP_COLUMNS[table]}) {select}"),
+            params,
+        )
+
+
+def refresh_attendance_rollups(conn, keys) -> None:
+    """Recomputes the attendance rollups for (student_id, attendance_date) keys."""
+    months = sorted({
+        (int(student_id), month_start(day), next_month(day))
+        for student_id, day in ((sid, _as_date(d)) for sid, d in keys)
+    })
+    _refresh_rollup(conn, "attendance_monthly", ("student_id", "month_start", "month_end"), months, f"""
+        SELECT k.student_id, k.month_start, {ATTENDANCE_AGGREGATES}
+        FROM k JOIN app.attendance a
+          ON a.student_id = k.student_id
+         AND a.attendance_date >= k.month_start AND a.attendance_date < k.month_end
+        GROUP BY k.student_id, k.month_start
+    """)
+
+
+def refresh_behavior_rollups(conn, keys) -> None:
+    """Recomputes the behavior rollups for (student_id, record_date) keys."""
+    days = sorted({(int(student_id), _as_date(day)) for student_id, day in keys})
+    _refresh_rollup(conn, "behavior_daily", ("student_id", "record_date"), days, f"""
+        SELECT k.student_id, k.record_date, {BEHAVIOR_AGGREGATES}
+        FROM k JOIN app.behavior_records b
+          ON b.student_id = k.student_id AND b.record_date = k.record_date
+        GROUP BY k.student_id, k.record_date
+    """)
+    months = sorted({(student_id, month_start(day), next_month(day)) for student_id, day in days})
+    _refresh_rollup(conn, "behavior_monthly", ("student_id", "month_start", "month_end"), months, """
+        SELECT k.student_id, k.month_start,
+               SUM(d.total_records), SUM(d.sentiment_count), ROUND(SUM(d.sentiment_sum), 2),
+               MIN(d.min_sentiment), MAX(d.max_sentiment), SUM(d.positive_records),
+               SUM(d.negative_records), SUM(d.neutral_records)
+        FROM k JOIN app.behavior_daily d
+          ON d.student_id = k.student_id
+         AND d.record_date >= k.month_start AND d.record_date < k.month_end
+        GROUP BY k.student_id, k.month_start
+    """)
+
+
+# Source table, its date column and the refresh for each table with rollups
+ROLLUP_SOURCES = {
+    "attendance": ("attendance_date", refresh_attendance_rollups),
+    "behavior_records": ("record_date", refresh_behavior_rollups),
+}
+
+
+def expected_rollup_query(table: str) -> str:
+    """Aggregates the raw rows the way the rollup table stores them."""
+    if table == "attendance_monthly":
+        source, alias, day, aggregates = "attendance", "a", "attendance_date", ATTENDANCE_AGGREGATES
+    else:
+        source, alias, day, aggregates = "behavior_records", "b", "record_date", BEHAVIOR_AGGREGATES
+    period = month_start_sql(f"{alias}.{day}") if table.endswith("_monthly") else f"{alias}.{day}"
+    return f"""
+        SELECT {alias}.student_id, {period}, {aggregates}
+        FROM app.{source} {alias}
+        WHERE {alias}.student_id IS NOT NULL AND {alias}.{day} IS NOT NULL
+        GROUP BY {alias}.student_id, {period}
+    """
+
+
+def rollup_date_ranges(start: Optional[date], end: Optional[date]) -> tuple:
+    """Splits an inclusive date range into whole months and partial edges.
+
+    Returns:
+        tuple: (months, edges). months is a (first, end) pair of month starts,
+        either of which may be None for an open range, or None when no whole
+        month falls in the range; edges is a list of [first, end) date ranges
+        to read at day level. Ends are exclusive.
+    """
+    end_exclusive = end + timedelta(days=1) if end is not None else None
+    first_month = start if start is None or start.day == 1 else next_month(start)
+    end_month = month_start(end_exclusive) if end_exclusive is not None else None
+    if first_month is not None and end_month is not None and first_month >= end_month:
+        return None, [(start, end_exclusive)]
+    edges = []
+    if start is not None and start < first_month:
+        edges.append((start, first_month))
+    if end_exclusive is not None and end_month < end_exclusive:
+        edges.append((end_month, end_exclusive))
+    return (first_month, end_month), edges
+
+
+def rollup_union(
+    monthly: str, daily: str, daily_column: str, columns: str,
+    student_id: Optional[int], start_date: Optional[str], end_date: Optional[str], params: dict
+) -> str:
+    """Builds a UNION ALL reading whole months from monthly and the rest from daily.
+
+    daily is a table or subquery with one row per student and day, whose date
+    is in daily_column.
+    """
+    start = _iso_date(start_date) if start_date is not None else None
+    end = _iso_date(end_date) if end_date is not None else None
+    student_condition = []
+    if student_id is not None:
+        student_condition.append("student_id = :student_id")
+        params["student_id"] = student_id
+
+    parts = []
+    months, edges = rollup_date_ranges(start, end)
+    if months is not None:
+        conditions = list(student_condition)
+        if months[0] is not None:
+            conditions.append("month_start >= :month_first")
+            params["month_first"] = months[0]
+        if months[1] is not None:
+            conditions.append("month_start < :month_end")
+            params["month_end"] = months[1]
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        parts.append(f"SELECT student_id, {columns} FROM app.{monthly}{where}")
+    for i, (first, end_exclusive) in enumerate(edges):
+        conditions = student_condition + [
+            f"{daily_column} >= :edge_first_{i}", f"{daily_column} < :edge_end_{i}"
+        ]
+        params[f"edge_first_{i}"] = first
+        params[f"edge_end_{i}"] = end_exclusive
+        parts.append(f"SELECT student_id, {columns} FROM {daily} WHERE {' AND '.join(conditions)}")
+    return " UNION ALL ".join(parts)
+
+
 # --- Database Utility Functions ---
 
 
+# Connection lent to a tool function by its async wrapper, see async_db_tool()
+_tool_connection = contextvars.ContextVar("tool_connection", default=None)
+
+
 def get_db_connection():
     """Get a connection to Google Cloud SQL PostgreSQL database using SQLAlchemy."""
+    conn = _tool_connection.get()
+    if conn is not None:
+        return conn
     try:
         connection = engine.connect()
         return connection
@@ -85,8 +768,120 @@ def get_db_connection():
         raise
 
 
+def _call_with_connection(conn, func, args, kwargs):
+    token = _tool_connection.set(conn)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _tool_connection.reset(token)
+
+
+def async_db_tool(func):
+    """Returns an async version of a database tool function.
+
+    The tool body runs unchanged on a connection from the async engine
+    through ``AsyncConnection.run_sync``: its queries await the database
+    instead of blocking the event loop, so independent tool calls handled
+    by the MCP server run concurrently. Signature and docstring are kept,
+    so the generated tool schema is the same as for the sync function.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            conn = await async_engine.connect()
+        except Exception as e:
+            logging.error(f"Error connecting to Google Cloud SQL PostgreSQL: {e}")
+            raise
+        try:
+            return await conn.run_sync(_call_with_connection, func, args, kwargs)
+        finally:
+            await conn.close()
+
+    return wrapper
+
+
+def threaded_tool(func):
+    """Returns an async version of a blocking tool function run in a worker thread.
+
+    For tools that make many sync-engine calls of their own, such as
+    explain_tool_queries, and so cannot run on a single lent connection.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return wrapper
+
+
+def _pool_stats(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def get_db_pool_stats(dummy_param: str) -> dict:
+    """Reports connection pool utilization for the database tools.
+
+    Args:
+        dummy_param (str): This parameter is not used by the function
+                           but helps ensure schema generation. A non-empty string is expected.
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str),
+              'pool' (dict) for the async pool used by the MCP tools,
+              'sync_pool' (dict) for direct sync callers and 'counters' (dict).
+    """
+    return {
+        "success": True,
+        "message": "Pool statistics retrieved successfully.",
+        "pool": _pool_stats(async_engine.sync_engine.pool),
+        "sync_pool": _pool_stats(engine.pool),
+        "counters": dict(pool_counters),
+    }
+
+
+def get_tool_cache_stats(dummy_param: str) -> dict:
+    """Reports hit rate and size of the read tool result cache.
+
+    Args:
+        dummy_param (str): This parameter is not used by the function
+                           but helps ensure schema generation. A non-empty string is expected.
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str) and
+              'cache' (dict) with overall and per-tool hit/miss counters.
+    """
+    return {
+        "success": True,
+        "message": "Cache statistics retrieved successfully.",
+        "cache": tool_cache.stats(),
+    }
+
+
+def get_analytics_snapshot_stats(dummy_param: str) -> dict:
+    """Reports the size, memory footprint and freshness of the analytics snapshot.
+
+    Args:
+        dummy_param (str): This parameter is not used by the function
+                           but helps ensure schema generation. A non-empty string is expected.
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str) and
+              'snapshot' (dict) with the total bytes held and, per table, the
+              rows, bytes, watermark and refresh counters.
+    """
+    return {
+        "success": True,
+        "message": "Analytics snapshot statistics retrieved successfully.",
+        "snapshot": analytics_snapshot.stats(),
+    }
+
+
 def list_db_tables(dummy_param: str) -> dict:
-    """Lists all tables in the PostgreSQL database.
+    """Lists all tables in the database.
 
     Args:
         dummy_param (str): This parameter is not used by the function
@@ -96,13 +891,19 @@ def list_db_tables(dummy_param: str) -> dict:
               and 'tables' (list[str]) containing the table names if successful.
     """
     try:
-        conn = get_db_connection()
-        result = conn.execute(text(
-            "SELECT table_name FROM information_schema.tables "
-            "WHERE table_schema = 'app';"
-        ))
-        tables = [row[0] for row in result.fetchall()]
-        conn.close()
+        # Return the connection to the pool even if the query fails
+        with get_db_connection() as conn:
+            if DB_DIALECT == "sqlite":
+                result = conn.execute(text(
+                    "SELECT name FROM app.sqlite_master "
+                    "WHERE type = 'table' AND name NOT LIKE 'sqlite_%';"
+                ))
+            else:
+                result = conn.execute(text(
+                    "SELECT table_name FROM information_schema.tables "
+                    "WHERE table_schema = 'app';"
+                ))
+            tables = [row[0] for row in result.fetchall()]
         return {
             "success": True,
             "message": "Tables listed successfully.",
@@ -116,12 +917,16 @@ def get_table_schema(table_name: str) -> dict:
     """Gets the schema (column names and types) of a specific table."""
     conn = get_db_connection()
     try:
-        result = conn.execute(text("""
-            SELECT column_name, data_type 
-            FROM information_schema.columns 
-            WHERE table_name = :table_name AND table_schema = 'app'
-            ORDER BY ordinal_position;
-        """), {"table_name": table_name})
+        if DB_DIALECT == "sqlite":
+            query = "SELECT name, type FROM pragma_table_info(:table_name, 'app') ORDER BY cid;"
+        else:
+            query = """
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name = :table_name AND table_schema = 'app'
+                ORDER BY ordinal_position;
+            """
+        result = conn.execute(text(query), {"table_name": table_name})
         schema_info = result.fetchall()
         
         if not schema_info:
@@ -133,15 +938,24 @@ def get_table_schema(table_name: str) -> dict:
         conn.close()
 
 
-def query_db_table(table_name: str, columns: str, condition: str) -> list[dict]:
-    """Queries a table with an optional condition.
+def query_db_table(
+    table_name: str,
+    columns: str,
+    condition: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None
+) -> dict:
+    """Queries a table with an optional condition, one page at a time.
 
     Args:
         table_name: The name of the table to query.
         columns: Comma-separated list of columns to retrieve (e.g., "id, name"). Defaults to "*".
         condition: Optional SQL WHERE clause condition (e.g., "id = 1" or "completed = 0").
+        limit: Maximum rows to return (default 100, max 1000).
+        offset: Number of rows to skip.
     Returns:
-        A list of dictionaries, where each dictionary represents a row.
+        A dictionary with 'rows' (list[dict], one dictionary per row), 'total' (int),
+        'has_more' (bool) and 'next_offset' (int) for the following page.
     """
     conn = get_db_connection()
     try:
@@ -149,11 +963,11 @@ def query_db_table(table_name: str, columns: str, condition: str) -> list[dict]:
         if condition:
             query += f" WHERE {condition}"
         
-        result = conn.execute(text(query))
-        # Convert result to list of dictionaries
-        columns_list = result.keys()
-        results = [dict(zip(columns_list, row)) for row in result.fetchall()]
-        return results
+        total = conn.execute(text(f"SELECT COUNT(*) FROM ({query}) AS q")).scalar()
+        limit = page_limit(limit)
+        offset = max(0, offset or 0)
+        rows, has_more = fetch_page(conn, query, {}, limit, offset)
+        return {"rows": rows, **page_info(rows, total, limit, offset, has_more)}
     except Exception as e:
         raise ValueError(f"Error querying table '{table_name}': {e}")
     finally:
@@ -181,9 +995,15 @@ def insert_data(table_name: str, data: dict) -> dict:
         placeholders = ", ".join([f":{key}" for key in data.keys()])
         
         query = f"INSERT INTO app.{table_name} ({columns}) VALUES ({placeholders}) RETURNING id"
+        rollup = ROLLUP_SOURCES.get(table_name)
+        if rollup:
+            query += f", student_id, {rollup[0]}"
         
         result = conn.execute(text(query), data)
-        last_row_id = result.fetchone()[0] if result.rowcount > 0 else None
+        row = result.fetchone()
+        last_row_id = row[0] if row else None
+        if rollup and row and row[1] is not None and row[2] is not None:
+            rollup[1](conn, [row[1:]])
         conn.commit()
         
         return {
@@ -222,8 +1042,16 @@ def delete_data(table_name: str, condition: str) -> dict:
     conn = get_db_connection()
     try:
         query = f"DELETE FROM app.{table_name} WHERE {condition}"
-        result = conn.execute(text(query))
-        rows_deleted = result.rowcount
+        rollup = ROLLUP_SOURCES.get(table_name)
+        if rollup:
+            # Recompute the rollups of the deleted rows' students and dates
+            query += f" RETURNING student_id, {rollup[0]}"
+            keys = conn.execute(text(query)).fetchall()
+            rows_deleted = len(keys)
+            rollup[1](conn, [key for key in keys if None not in key])
+        else:
+            result = conn.execute(text(query))
+            rows_deleted = result.rowcount
         conn.commit()
         
         return {
@@ -241,17 +1069,28 @@ def delete_data(table_name: str, condition: str) -> dict:
         conn.close()
 
 
-def get_academic_records(student_id: Optional[int] = None, subject: Optional[str] = None, teacher_id: Optional[int] = None) -> dict:
+def get_academic_records(
+    student_id: Optional[int] = None,
+    subject: Optional[str] = None,
+    teacher_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> dict:
     """Gets academic records with optional filtering by student_id, subject, or teacher_id.
 
     Args:
         student_id (int, optional): Filter by student ID.
         subject (str, optional): Filter by subject name.
         teacher_id (int, optional): Filter by teacher ID.
+        limit (int, optional): Maximum records to return (default 100, max 1000).
+        offset (int, optional): Number of records to skip.
+        cursor (str, optional): 'next_cursor' from the previous page; takes precedence over offset.
 
     Returns:
         dict: A dictionary with keys 'success' (bool), 'message' (str),
-              and 'records' (list[dict]) containing the academic records if successful.
+              'records' (list[dict]) containing one page of academic records,
+              'total' (int), 'has_more' (bool), 'next_offset' and 'next_cursor'.
     """
     conn = get_db_connection()
     try:
@@ -263,6 +1102,8 @@ def get_academic_records(student_id: Optional[int] = None, subject: Optional[str
             LEFT JOIN app.students s ON ar.student_id = s.student_id
             LEFT JOIN app.users u ON ar.teacher_id = u.id
         """
+        count_query = "SELECT COUNT(*) FROM app.academic_records ar"
+        order = [("ar.record_date", "DESC", "record_date"), ("ar.id", "DESC", "id")]
         
         conditions = []
         params = {}
@@ -272,26 +1113,33 @@ def get_academic_records(student_id: Optional[int] = None, subject: Optional[str
             params["student_id"] = student_id
         
         if subject is not None:
-            conditions.append("ar.subject ILIKE :subject")
+            conditions.append(f"ar.subject {ILIKE} :subject")
             params["subject"] = f"%{subject}%"
         
         if teacher_id is not None:
             conditions.append("ar.teacher_id = :teacher_id")
             params["teacher_id"] = teacher_id
         
+        if conditions:
+            count_query += " WHERE " + " AND ".join(conditions)
+        total = conn.execute(text(count_query), params).scalar()
+
+        limit = page_limit(limit)
+        offset = None if cursor else max(0, offset or 0)
+        if cursor:
+            conditions.append(keyset_condition(order, cursor, params))
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         
-        query += " ORDER BY ar.record_date DESC"
+        query += order_by_clause(order)
         
-        result = conn.execute(text(query), params)
-        columns = result.keys()
-        records = [dict(zip(columns, row)) for row in result.fetchall()]
+        records, has_more = fetch_page(conn, query, params, limit, offset)
         
         return {
             "success": True,
-            "message": f"Retrieved {len(records)} academic records.",
+            "message": f"Retrieved {len(records)} of {total} academic records.",
             "records": records,
+            **page_info(records, total, limit, offset, has_more, order),
         }
     except Exception as e:
         return {
@@ -355,7 +1203,10 @@ def add_academic_record(student_id: int, subject: str, grade: str, record_date:
 def get_attendance_records(
     student_id: Optional[int] = None, 
     attendance_date: Optional[str] = None, 
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None
 ) -> dict:
     """Gets attendance records with optional filtering by student_id, date, or status.
 
@@ -363,19 +1214,30 @@ def get_attendance_records(
         student_id (int, optional): Filter by student ID.
         attendance_date (str, optional): Filter by attendance date (YYYY-MM-DD format).
         status (str, optional): Filter by attendance status ('present', 'absent', 'late').
+        limit (int, optional): Maximum records to return (default 100, max 1000).
+        offset (int, optional): Number of records to skip.
+        cursor (str, optional): 'next_cursor' from the previous page; takes precedence over offset.
 
     Returns:
         dict: A dictionary with keys 'success' (bool), 'message' (str),
-              and 'records' (list[dict]) containing the attendance records if successful.
+              'records' (list[dict]) containing one page of attendance records,
+              'total' (int), 'has_more' (bool), 'next_offset' and 'next_cursor'.
     """
     conn = get_db_connection()
     try:
         query = """
             SELECT a.id, a.student_id, s.student_name, a.attendance_date, 
-                   a.status, a.notes, a.created_at
+                   a.status, a.notes, a.created_at,
+                   COALESCE(s.student_name, '') as sort_name
             FROM app.attendance a
             LEFT JOIN app.students s ON a.student_id = s.student_id
         """
+        count_query = "SELECT COUNT(*) FROM app.attendance a"
+        order = [
+            ("a.attendance_date", "DESC", "attendance_date"),
+            ("COALESCE(s.student_name, '')", "ASC", "sort_name"),
+            ("a.id", "ASC", "id"),
+        ]
         
         conditions = []
         params = {}
@@ -392,19 +1254,29 @@ def get_attendance_records(
             conditions.append("a.status = :status")
             params["status"] = status
         
+        if conditions:
+            count_query += " WHERE " + " AND ".join(conditions)
+        total = conn.execute(text(count_query), params).scalar()
+
+        limit = page_limit(limit)
+        offset = None if cursor else max(0, offset or 0)
+        if cursor:
+            conditions.append(keyset_condition(order, cursor, params))
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         
-        query += " ORDER BY a.attendance_date DESC, s.student_name"
+        query += order_by_clause(order)
         
-        result = conn.execute(text(query), params)
-        columns = result.keys()
-        records = [dict(zip(columns, row)) for row in result.fetchall()]
+        records, has_more = fetch_page(conn, query, params, limit, offset)
+        info = page_info(records, total, limit, offset, has_more, order)
+        for record in records:
+            del record["sort_name"]
         
         return {
             "success": True,
-            "message": f"Retrieved {len(records)} attendance records.",
+            "message": f"Retrieved {len(records)} of {total} attendance records.",
             "records": records,
+            **info,
         }
     except Exception as e:
         return {
@@ -436,67 +1308,184 @@ def mark_attendance(
     """
     conn = get_db_connection()
     try:
-        # Check if attendance already exists for this student and date
-        check_query = """
-            SELECT id FROM app.attendance 
-            WHERE student_id = :student_id AND attendance_date = :attendance_date
+        # One round trip: insert, or update the existing row for this student
+        # and date (unique index from migration 0001)
+        marked_before = _marked_before(conn, [student_id], attendance_date)
+        upsert_query = f"""
+            INSERT INTO app.attendance (student_id, attendance_date, status, notes)
+            VALUES (:student_id, :attendance_date, :status, :notes)
+            ON CONFLICT (student_id, attendance_date)
+            DO UPDATE SET status = EXCLUDED.status, notes = EXCLUDED.notes
+            RETURNING id, {INSERTED_FLAG} AS inserted
         """
-        check_result = conn.execute(text(check_query), {
+        params = {
             "student_id": student_id,
-            "attendance_date": attendance_date
-        })
-        existing_record = check_result.fetchone()
-        
-        if existing_record:
-            # Update existing record
-            update_query = """
-                UPDATE app.attendance 
-                SET status = :status, notes = :notes
-                WHERE student_id = :student_id AND attendance_date = :attendance_date
-                RETURNING id
-            """
-            params = {
-                "student_id": student_id,
-                "attendance_date": attendance_date,
-                "status": status,
-                "notes": notes
-            }
-            result = conn.execute(text(update_query), params)
-            attendance_id = result.fetchone()[0]
-            conn.commit()
-            
+            "attendance_date": attendance_date,
+            "status": status,
+            "notes": notes
+        }
+        attendance_id, inserted = conn.execute(text(upsert_query), params).fetchone()
+        if marked_before is not None:
+            inserted = student_id not in marked_before
+        refresh_attendance_rollups(conn, [(student_id, attendance_date)])
+        conn.commit()
+        
+        action = "marked" if inserted else "updated"
+        return {
+            "success": True,
+            "message": f"Attendance {action} successfully for student {student_id} on {attendance_date}.",
+            "attendance_id": attendance_id,
+        }
+    except Exception as e:
+        conn.rollback()
+        return {
+            "success": False,
+            "message": f"Error marking attendance: {e}",
+        }
+    finally:
+        conn.close()
+
+
+ATTENDANCE_STATUSES = ("present", "absent", "late")
+
+
+def _marked_before(conn, student_ids: list, attendance_date: str) -> Optional[set]:
+    """Returns the students already marked on a date, where upserts cannot tell.
+
+    None on PostgreSQL, whose upserts report inserted rows themselves
+    (INSERTED_FLAG).
+    """
+    if DB_DIALECT == "postgresql":
+        return None
+    params = {f"student_id_{i}": sid for i, sid in enumerate(student_ids)}
+    placeholders = ", ".join(f":{name}" for name in params)
+    query = f"""
+        SELECT student_id FROM app.attendance
+        WHERE attendance_date = :attendance_date AND student_id IN ({placeholders})
+    """
+    params["attendance_date"] = attendance_date
+    return set(conn.execute(text(query), params).scalars())
+
+
+def mark_attendance_bulk(
+    class_value: str,
+    attendance_date: str,
+    statuses: Optional[dict] = None,
+    section: Optional[str] = None,
+    default_status: str = "present"
+) -> dict:
+    """Marks attendance for a whole class on one date in a single transaction.
+
+    Every student on the class roster is marked with default_status unless
+    listed in statuses, e.g. mark everyone present except two absentees.
+
+    Args:
+        class_value (str): The class to mark.
+        attendance_date (str): The date of attendance (YYYY-MM-DD format).
+        statuses (dict, optional): Status per student ID for students not given
+                                   default_status, e.g. {"12": "absent", "15": "late"}.
+        section (str, optional): The section within the class.
+        default_status (str): Status for students not in statuses. Defaults to 'present'.
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str),
+              'results' (list[dict]) with the student_id, student_name, status,
+              attendance_id and action ('marked' or 'updated') of each student,
+              and 'errors' (list[dict]) for statuses that were not applied.
+    """
+    if default_status not in ATTENDANCE_STATUSES:
+        return {
+            "success": False,
+            "message": f"Invalid default_status '{default_status}'.",
+            "results": [],
+            "errors": [],
+        }
+
+    conn = get_db_connection()
+    try:
+        roster_query = """
+            SELECT student_id, student_name FROM app.students
+            WHERE class_value = :class_value
+        """
+        params = {"class_value": class_value}
+        if section is not None:
+            roster_query += " AND section = :section"
+            params["section"] = section
+        roster = dict(conn.execute(text(roster_query + " ORDER BY student_name"), params).fetchall())
+
+        class_section = f"{class_value}-{section}" if section else class_value
+        if not roster:
             return {
-                "success": True,
-                "message": f"Attendance updated successfully for student {student_id} on {attendance_date}.",
-                "attendance_id": attendance_id,
+                "success": False,
+                "message": f"No students found in {class_section}.",
+                "results": [],
+                "errors": [],
             }
-        else:
-            # Insert new record
-            insert_query = """
-                INSERT INTO app.attendance (student_id, attendance_date, status, notes)
-                VALUES (:student_id, :attendance_date, :status, :notes)
-                RETURNING id
-            """
-            params = {
+
+        errors = []
+        marks = {student_id: default_status for student_id in roster}
+        for key, status in (statuses or {}).items():
+            try:
+                student_id = int(key)
+            except (TypeError, ValueError):
+                errors.append({"student_id": key, "error": "Invalid student ID."})
+                continue
+            if student_id not in roster:
+                errors.append({"student_id": student_id, "error": f"Student is not in {class_section}."})
+            elif status not in ATTENDANCE_STATUSES:
+                errors.append({"student_id": student_id, "error": f"Invalid status '{status}'."})
+            else:
+                marks[student_id] = status
+
+        # One multi-row upsert for the whole roster
+        values = []
+        upsert_params = {"attendance_date": attendance_date}
+        for i, (student_id, status) in enumerate(marks.items()):
+            values.append(f"(:student_id_{i}, :attendance_date, :status_{i})")
+            upsert_params[f"student_id_{i}"] = student_id
+            upsert_params[f"status_{i}"] = status
+        upsert_query = f"""
+            INSERT INTO app.attendance (student_id, attendance_date, status)
+            VALUES {', '.join(values)}
+            ON CONFLICT (student_id, attendance_date)
+            DO UPDATE SET status = EXCLUDED.status
+            RETURNING student_id, id, {INSERTED_FLAG} AS inserted
+        """
+        marked_before = _marked_before(conn, list(marks), attendance_date)
+        rows = conn.execute(text(upsert_query), upsert_params).fetchall()
+        if marked_before is not None:
+            rows = [(sid, attendance_id, sid not in marked_before) for sid, attendance_id, _ in rows]
+        refresh_attendance_rollups(conn, [(student_id, attendance_date) for student_id in marks])
+        conn.commit()
+
+        results = [
+            {
                 "student_id": student_id,
-                "attendance_date": attendance_date,
-                "status": status,
-                "notes": notes
-            }
-            result = conn.execute(text(insert_query), params)
-            attendance_id = result.fetchone()[0]
-            conn.commit()
-            
-            return {
-                "success": True,
-                "message": f"Attendance marked successfully for student {student_id} on {attendance_date}.",
+                "student_name": roster[student_id],
+                "status": marks[student_id],
                 "attendance_id": attendance_id,
+                "action": "marked" if inserted else "updated",
             }
+            for student_id, attendance_id, inserted in rows
+        ]
+        # Older databases may lack the NOT NULL on student_name (see migration 0000)
+        results.sort(key=lambda r: (r["student_name"] or "", r["student_id"]))
+        return {
+            "success": True,
+            "message": (
+                f"Attendance recorded for {len(results)} students in {class_section} "
+                f"on {attendance_date}" + (f"; {len(errors)} entries not applied." if errors else ".")
+            ),
+            "results": results,
+            "errors": errors,
+        }
     except Exception as e:
         conn.rollback()
         return {
             "success": False,
-            "message": f"Error marking attendance: {e}",
+            "message": f"Error marking attendance for class: {e}",
+            "results": [],
+            "errors": [],
         }
     finally:
         conn.close()
@@ -520,44 +1509,42 @@ def get_attendance_summary(
     """
     conn = get_db_connection()
     try:
-        query = """
-            SELECT 
-                a.student_id, 
-                s.student_name,
-                COUNT(*) as total_days,
-                COUNT(CASE WHEN a.status = 'present' THEN 1 END) as present_days,
-                COUNT(CASE WHEN a.status = 'absent' THEN 1 END) as absent_days,
-                COUNT(CASE WHEN a.status = 'late' THEN 1 END) as late_days,
-                ROUND(
-                    (COUNT(CASE WHEN a.status = 'present' THEN 1 END) * 100.0 / COUNT(*)), 2
-                ) as attendance_percentage
-            FROM app.attendance a
-            LEFT JOIN app.students s ON a.student_id = s.student_id
-        """
-        
-        conditions = []
-        params = {}
-        
-        if student_id is not None:
-            conditions.append("a.student_id = :student_id")
-            params["student_id"] = student_id
-        
-        if start_date is not None:
-            conditions.append("a.attendance_date >= :start_date")
-            params["start_date"] = start_date
-        
-        if end_date is not None:
-            conditions.append("a.attendance_date <= :end_date")
-            params["end_date"] = end_date
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " GROUP BY a.student_id, s.student_name ORDER BY s.student_name"
+        if analytics_snapshot.enabled and analytics_snapshot.refresh(conn, ("attendance", "students")):
+            summary = analytics_snapshot.summary_rows(
+                analytics_snapshot.attendance_by_student(student_id, start_date, end_date)
+            )
+            for row in summary:
+                row["attendance_percentage"] = round(row["present_days"] * 100.0 / row["total_days"], 2)
+        else:
+            # Whole months come from app.attendance_monthly; partial months at
+            # either end of the range are counted from app.attendance itself,
+            # which has one row per student and day.
+            params = {}
+            rows = rollup_union(
+                "attendance_monthly",
+                ATTENDANCE_DAILY,
+                "attendance_date",
+                ROLLUP_COLUMNS["attendance_monthly"],
+                student_id, start_date, end_date, params,
+            )
+            query = f"""
+                SELECT 
+                    r.student_id, 
+                    s.student_name,
+                    SUM(r.total_days) as total_days,
+                    SUM(r.present_days) as present_days,
+                    SUM(r.absent_days) as absent_days,
+                    SUM(r.late_days) as late_days,
+                    ROUND(SUM(r.present_days) * 100.0 / SUM(r.total_days), 2) as attendance_percentage
+                FROM ({rows}) AS r
+                LEFT JOIN app.students s ON r.student_id = s.student_id
+                GROUP BY r.student_id, s.student_name
+                ORDER BY s.student_name
+            """
         
-        result = conn.execute(text(query), params)
-        columns = result.keys()
-        summary = [dict(zip(columns, row)) for row in result.fetchall()]
+            result = conn.execute(text(query), params)
+            columns = result.keys()
+            summary = [dict(zip(columns, row)) for row in result.fetchall()]
         
         return {
             "success": True,
@@ -579,7 +1566,10 @@ def get_behavior_records(
     logged_by: Optional[int] = None,
     source: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None
 ) -> dict:
     """Gets behavior records with optional filtering.
 
@@ -589,10 +1579,14 @@ def get_behavior_records(
         source (str, optional): Filter by behavior source.
         start_date (str, optional): Start date filter (YYYY-MM-DD format).
         end_date (str, optional): End date filter (YYYY-MM-DD format).
+        limit (int, optional): Maximum records to return (default 100, max 1000).
+        offset (int, optional): Number of records to skip.
+        cursor (str, optional): 'next_cursor' from the previous page; takes precedence over offset.
 
     Returns:
         dict: A dictionary with keys 'success' (bool), 'message' (str),
-              and 'records' (list[dict]) containing behavior records.
+              'records' (list[dict]) containing one page of behavior records,
+              'total' (int), 'has_more' (bool), 'next_offset' and 'next_cursor'.
     """
     conn = get_db_connection()
     try:
@@ -604,6 +1598,10 @@ def get_behavior_records(
             LEFT JOIN app.students s ON br.student_id = s.student_id
             LEFT JOIN app.users u ON br.logged_by = u.id
         """
+        count_query = "SELECT COUNT(*) FROM app.behavior_records br"
+        # Records of the same day come newest first by id, which follows
+        # insertion order like created_at but is unique for paging
+        order = [("br.record_date", "DESC", "record_date"), ("br.id", "DESC", "id")]
         
         conditions = []
         params = {}
@@ -628,19 +1626,26 @@ def get_behavior_records(
             conditions.append("br.record_date <= :end_date")
             params["end_date"] = end_date
         
+        if conditions:
+            count_query += " WHERE " + " AND ".join(conditions)
+        total = conn.execute(text(count_query), params).scalar()
+
+        limit = page_limit(limit)
+        offset = None if cursor else max(0, offset or 0)
+        if cursor:
+            conditions.append(keyset_condition(order, cursor, params))
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         
-        query += " ORDER BY br.record_date DESC, br.created_at DESC"
+        query += order_by_clause(order)
         
-        result = conn.execute(text(query), params)
-        columns = result.keys()
-        records = [dict(zip(columns, row)) for row in result.fetchall()]
+        records, has_more = fetch_page(conn, query, params, limit, offset)
         
         return {
             "success": True,
-            "message": f"Retrieved {len(records)} behavior records.",
+            "message": f"Retrieved {len(records)} of {total} behavior records.",
             "records": records,
+            **page_info(records, total, limit, offset, has_more, order),
         }
     except Exception as e:
         return {
@@ -699,6 +1704,7 @@ def add_behavior_record(
         
         result = conn.execute(text(query), params)
         record_id = result.fetchone()[0]
+        refresh_behavior_rollups(conn, [(student_id, record_date)])
         conn.commit()
         
         return {
@@ -710,79 +1716,372 @@ def add_behavior_record(
         conn.rollback()
         return {
             "success": False,
-            "message": f"Error adding behavior record: {e}",
+            "message": f"Error adding behavior record: {e}",
+        }
+    finally:
+        conn.close()
+
+
+def get_behavior_summary(
+    student_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> dict:
+    """Gets behavior summary statistics for students within a date range.
+
+    Args:
+        student_id (int, optional): Filter by student ID.
+        start_date (str, optional): Start date (YYYY-MM-DD format).
+        end_date (str, optional): End date (YYYY-MM-DD format).
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str),
+              and 'summary' (list[dict]) containing behavior statistics.
+    """
+    conn = get_db_connection()
+    try:
+        if analytics_snapshot.enabled and analytics_snapshot.refresh(conn, ("behavior_records", "students")):
+            summary = analytics_snapshot.summary_rows(
+                analytics_snapshot.behavior_by_student(student_id, start_date, end_date)
+            )
+            for row in summary:
+                del row["sentiment_count"]
+        else:
+            # Whole months come from app.behavior_monthly and partial months at
+            # either end of the range from app.behavior_daily
+            params = {}
+            rows = rollup_union(
+                "behavior_monthly",
+                "app.behavior_daily",
+                "record_date",
+                ROLLUP_COLUMNS["behavior_daily"],
+                student_id, start_date, end_date, params,
+            )
+            query = f"""
+                SELECT 
+                    r.student_id,
+                    s.student_name,
+                    SUM(r.total_records) as total_records,
+                    -- * 1.0: SQLite stores whole sentiment sums as integers
+                    SUM(r.sentiment_sum) * 1.0 / NULLIF(SUM(r.sentiment_count), 0) as avg_sentiment_score,
+                    MIN(r.min_sentiment) as min_sentiment_score,
+                    MAX(r.max_sentiment) as max_sentiment_score,
+                    SUM(r.positive_records) as positive_records,
+                    SUM(r.negative_records) as negative_records,
+                    SUM(r.neutral_records) as neutral_records
+                FROM ({rows}) AS r
+                LEFT JOIN app.students s ON r.student_id = s.student_id
+                GROUP BY r.student_id, s.student_name
+                ORDER BY s.student_name
+            """
+        
+            result = conn.execute(text(query), params)
+            columns = result.keys()
+            summary = [dict(zip(columns, row)) for row in result.fetchall()]
+        
+        return {
+            "success": True,
+            "message": f"Retrieved behavior summary for {len(summary)} students.",
+            "summary": summary,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error retrieving behavior summary: {e}",
+            "summary": [],
+        }
+    finally:
+        conn.close()
+
+
+def check_summary_rollups(repair: bool = False) -> dict:
+    """Checks the summary rollups against the attendance and behavior records.
+
+    The write tools keep the rollups read by get_attendance_summary and
+    get_behavior_summary up to date; rows changed directly in the database
+    are not reflected until the rollups are repaired.
+
+    Args:
+        repair (bool): Rebuild the rollup tables that do not match. Defaults to False.
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str), and
+              'tables' (list[dict]) giving, per rollup table, its 'rows',
+              'missing' (rows the records imply that are absent or differ),
+              'stale' (stored rows the records do not imply) and 'repaired' (bool).
+    """
+    conn = get_db_connection()
+    try:
+        tables = []
+        for table, columns in ROLLUP_COLUMNS.items():
+            key = "record_date" if table == "behavior_daily" else "month_start"
+            expected = expected_rollup_query(table)
+            stored = f"SELECT student_id, {key}, {columns} FROM app.{table}"
+            missing = conn.execute(text(f"SELECT COUNT(*) FROM ({expected} EXCEPT {stored}) AS d")).scalar()
+            stale = conn.execute(text(f"SELECT COUNT(*) FROM ({stored} EXCEPT {expected}) AS d")).scalar()
+            repaired = bool(repair and (missing or stale))
+            if repaired:
+                conn.execute(text(f"DELETE FROM app.{table}"))
+                conn.execute(text(f"INSERT INTO app.{table} (student_id, {key}, {columns}) {expected}"))
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM app.{table}")).scalar()
+            tables.append({
+                "table": table,
+                "rows": rows,
+                "missing": missing,
+                "stale": stale,
+                "repaired": repaired,
+            })
+        conn.commit()
+
+        out_of_date = [t["table"] for t in tables if t["missing"] or t["stale"]]
+        if not out_of_date:
+            message = "Summary rollups match the records."
+        elif repair:
+            message = f"Rebuilt {', '.join(out_of_date)}."
+        else:
+            message = f"Out of date: {', '.join(out_of_date)}. Run again with repair=true to rebuild."
+        return {"success": True, "message": message, "tables": tables}
+    except Exception as e:
+        conn.rollback()
+        return {
+            "success": False,
+            "message": f"Error checking summary rollups: {e}",
+            "tables": [],
+        }
+    finally:
+        conn.close()
+
+
+def _bulk_insert(conn, query: str, rows: list) -> list:
+    """Inserts validated rows in one transaction and returns per-row errors.
+
+    The rows go to the database as a single executemany batch. If the batch
+    fails, it is retried one row per savepoint, so that only the rows the
+    database rejects are left out and reported.
+    """
+    if not rows:
+        return []
+    try:
+        conn.execute(text(query), [params for _, params in rows])
+        return []
+    except Exception:
+        conn.rollback()
+
+    errors = []
+    for index, params in rows:
+        savepoint = conn.begin_nested()
+        try:
+            conn.execute(text(query), params)
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            errors.append({"index": index, "error": str(getattr(e, "orig", e))})
+    return errors
+
+
+def _existing_student_ids(conn, student_ids) -> set:
+    if not student_ids:
+        return set()
+    params = {f"student_id_{i}": sid for i, sid in enumerate(student_ids)}
+    placeholders = ", ".join(f":{name}" for name in params)
+    query = f"SELECT student_id FROM app.students WHERE student_id IN ({placeholders})"
+    return set(conn.execute(text(query), params).scalars())
+
+
+def _validate_rows(records: list, defaults: dict, fields: dict) -> tuple:
+    """Applies defaults and converts each record's fields.
+
+    Args:
+        records: Row dicts supplied by the caller.
+        defaults: Values used for fields missing from a row.
+        fields: Field name -> (converter, required).
+
+    Returns:
+        tuple: (rows, errors), where rows is a list of (index, params).
+    """
+    rows, errors = [], []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({"index": index, "error": "Record must be an object."})
+            continue
+        params = {}
+        try:
+            for name, (convert, required) in fields.items():
+                value = record.get(name, defaults.get(name))
+                if value is None or value == "":
+                    if required:
+                        raise ValueError(f"Missing required field '{name}'.")
+                    params[name] = None
+                else:
+                    params[name] = convert(value)
+        except (TypeError, ValueError) as e:
+            errors.append({"index": index, "error": str(e)})
+            continue
+        rows.append((index, params))
+    return rows, errors
+
+
+def _iso_date(value) -> date:
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+def _sentiment(value) -> float:
+    score = float(value)
+    if not -1.0 <= score <= 1.0:
+        raise ValueError(f"sentiment_score {score} is outside -1.0 to 1.0.")
+    return score
+
+
+def _bulk_add(
+    conn, records: list, defaults: dict, fields: dict, query: str, label: str, after_insert=None
+) -> dict:
+    """Validates, checks student IDs and inserts a batch of records.
+
+    after_insert, if given, is called with the connection and the params of
+    the inserted rows before the transaction commits.
+    """
+    rows, errors = _validate_rows(records, defaults, fields)
+    known = _existing_student_ids(conn, sorted({p["student_id"] for _, p in rows}))
+    valid = []
+    for index, params in rows:
+        if params["student_id"] in known:
+            valid.append((index, params))
+        else:
+            errors.append({"index": index, "error": f"No student found with ID {params['student_id']}."})
+
+    insert_errors = _bulk_insert(conn, query, valid)
+    if after_insert is not None:
+        failed = {e["index"] for e in insert_errors}
+        after_insert(conn, [params for index, params in valid if index not in failed])
+    conn.commit()
+    errors = sorted(errors + insert_errors, key=lambda e: e["index"])
+    inserted = len(valid) - len(insert_errors)
+    return {
+        "success": inserted > 0,
+        "message": (
+            f"Added {inserted} of {len(records)} {label}"
+            + (f"; {len(errors)} rejected." if errors else ".")
+        ),
+        "inserted": inserted,
+        "errors": errors,
+    }
+
+
+def add_academic_records_bulk(
+    records: list[dict],
+    subject: Optional[str] = None,
+    record_date: Optional[str] = None,
+    teacher_id: Optional[int] = None
+) -> dict:
+    """Adds many academic records in one transaction, e.g. marks for a whole exam.
+
+    Args:
+        records (list[dict]): One object per record with 'student_id' and 'grade',
+                              and optionally 'subject', 'record_date' and 'teacher_id'.
+        subject (str, optional): Subject for records that do not give one.
+        record_date (str, optional): Date (YYYY-MM-DD) for records that do not give one.
+        teacher_id (int, optional): Teacher for records that do not give one.
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str),
+              'inserted' (int) and 'errors' (list[dict]) giving the index and
+              error of each record that was not added.
+    """
+    if not records:
+        return {"success": False, "message": "No records provided.", "inserted": 0, "errors": []}
+
+    conn = get_db_connection()
+    try:
+        return _bulk_add(
+            conn,
+            records,
+            {"subject": subject, "record_date": record_date, "teacher_id": teacher_id},
+            {
+                "student_id": (int, True),
+                "subject": (str, True),
+                "grade": (str, True),
+                "record_date": (_iso_date, True),
+                "teacher_id": (int, False),
+            },
+            """
+                INSERT INTO app.academic_records (student_id, subject, grade, record_date, teacher_id)
+                VALUES (:student_id, :subject, :grade, :record_date, :teacher_id)
+            """,
+            "academic records",
+        )
+    except Exception as e:
+        conn.rollback()
+        return {
+            "success": False,
+            "message": f"Error adding academic records: {e}",
+            "inserted": 0,
+            "errors": [],
         }
     finally:
         conn.close()
 
 
-def get_behavior_summary(
-    student_id: Optional[int] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+def add_behavior_records_bulk(
+    records: list[dict],
+    source: Optional[str] = None,
+    record_date: Optional[str] = None,
+    logged_by: Optional[int] = None
 ) -> dict:
-    """Gets behavior summary statistics for students within a date range.
+    """Adds many behavior records in one transaction, e.g. observations after a class.
 
     Args:
-        student_id (int, optional): Filter by student ID.
-        start_date (str, optional): Start date (YYYY-MM-DD format).
-        end_date (str, optional): End date (YYYY-MM-DD format).
+        records (list[dict]): One object per record with 'student_id', and optionally
+                              'behaviour_type', 'sentiment_score' (-1.0 to 1.0), 'comment',
+                              'source', 'record_date' and 'logged_by'.
+        source (str, optional): Source for records that do not give one.
+        record_date (str, optional): Date (YYYY-MM-DD) for records that do not give one.
+        logged_by (int, optional): Logging user for records that do not give one.
 
     Returns:
         dict: A dictionary with keys 'success' (bool), 'message' (str),
-              and 'summary' (list[dict]) containing behavior statistics.
+              'inserted' (int) and 'errors' (list[dict]) giving the index and
+              error of each record that was not added.
     """
+    if not records:
+        return {"success": False, "message": "No records provided.", "inserted": 0, "errors": []}
+
     conn = get_db_connection()
     try:
-        query = """
-            SELECT 
-                br.student_id,
-                s.student_name,
-                COUNT(*) as total_records,
-                AVG(br.sentiment_score) as avg_sentiment_score,
-                MIN(br.sentiment_score) as min_sentiment_score,
-                MAX(br.sentiment_score) as max_sentiment_score,
-                COUNT(CASE WHEN br.sentiment_score > 0 THEN 1 END) as positive_records,
-                COUNT(CASE WHEN br.sentiment_score < 0 THEN 1 END) as negative_records,
-                COUNT(CASE WHEN br.sentiment_score = 0 THEN 1 END) as neutral_records
-            FROM app.behavior_records br
-            LEFT JOIN app.students s ON br.student_id = s.student_id
-        """
-        
-        conditions = []
-        params = {}
-        
-        if student_id is not None:
-            conditions.append("br.student_id = :student_id")
-            params["student_id"] = student_id
-        
-        if start_date is not None:
-            conditions.append("br.record_date >= :start_date")
-            params["start_date"] = start_date
-        
-        if end_date is not None:
-            conditions.append("br.record_date <= :end_date")
-            params["end_date"] = end_date
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " GROUP BY br.student_id, s.student_name ORDER BY s.student_name"
-        
-        result = conn.execute(text(query), params)
-        columns = result.keys()
-        summary = [dict(zip(columns, row)) for row in result.fetchall()]
-        
-        return {
-            "success": True,
-            "message": f"Retrieved behavior summary for {len(summary)} students.",
-            "summary": summary,
-        }
+        return _bulk_add(
+            conn,
+            records,
+            {"source": source, "record_date": record_date, "logged_by": logged_by},
+            {
+                "student_id": (int, True),
+                "source": (str, True),
+                "record_date": (_iso_date, True),
+                "behaviour_type": (str, False),
+                "sentiment_score": (_sentiment, False),
+                "comment": (str, False),
+                "logged_by": (int, False),
+            },
+            """
+                INSERT INTO app.behavior_records
+                (student_id, source, record_date, behaviour_type,
+                 sentiment_score, comment, logged_by)
+                VALUES (:student_id, :source, :record_date, :behaviour_type,
+                        :sentiment_score, :comment, :logged_by)
+            """,
+            "behavior records",
+            after_insert=lambda conn, rows: refresh_behavior_rollups(
+                conn, [(row["student_id"], row["record_date"]) for row in rows]
+            ),
+        )
     except Exception as e:
+        conn.rollback()
         return {
             "success": False,
-            "message": f"Error retrieving behavior summary: {e}",
-            "summary": [],
+            "message": f"Error adding behavior records: {e}",
+            "inserted": 0,
+            "errors": [],
         }
     finally:
         conn.close()
@@ -825,7 +2124,7 @@ def get_students(
             params["student_id"] = student_id
         
         if student_name is not None:
-            conditions.append("student_name ILIKE :student_name")
+            conditions.append(f"student_name {ILIKE} :student_name")
             params["student_name"] = f"%{student_name}%"
         
         if class_value is not None:
@@ -1117,7 +2416,7 @@ def get_users(
             params["user_id"] = user_id
         
         if name is not None:
-            conditions.append("u.name ILIKE :name")
+            conditions.append(f"u.name {ILIKE} :name")
             params["name"] = f"%{name}%"
         
         if email is not None:
@@ -1133,7 +2432,7 @@ def get_users(
             params["student_id"] = student_id
         
         if subject is not None:
-            conditions.append("u.subject ILIKE :subject")
+            conditions.append(f"u.subject {ILIKE} :subject")
             params["subject"] = f"%{subject}%"
         
         if conditions:
@@ -1382,11 +2681,11 @@ def get_teachers_by_subject(subject: str) -> dict:
     """
     conn = get_db_connection()
     try:
-        query = """
+        query = f"""
             SELECT u.id, u.name, u.email, u.phone, u.subject, u.language,
                    u.created_at, u.updated_at
             FROM app.users u
-            WHERE u.role = 'teacher' AND u.subject ILIKE :subject
+            WHERE u.role = 'teacher' AND u.subject {ILIKE} :subject
             ORDER BY u.name
         """
         
@@ -1411,56 +2710,782 @@ def get_teachers_by_subject(subject: str) -> dict:
         conn.close()
 
 
+# --- Analytics ---
+# Server-side answers to typical analytics questions (grade distributions,
+# attendance against grades, students at risk), each from a single aggregate
+# query, so the agent does not page raw records into its context.
+
+# Grade points of letter grades; other grades count in distributions only
+GRADE_POINTS = {
+    "A+": 4.0, "A": 4.0, "A-": 3.7,
+    "B+": 3.3, "B": 3.0, "B-": 2.7,
+    "C+": 2.3, "C": 2.0, "C-": 1.7,
+    "D+": 1.3, "D": 1.0, "D-": 0.7,
+    "F": 0.0,
+}
+GRADE_POINTS_SQL = (
+    "CASE UPPER(TRIM(ar.grade)) "
+    + " ".join(f"WHEN '{grade}' THEN {points:.1f}" for grade, points in GRADE_POINTS.items())
+    + " END"
+)
+
+# Group columns of get_grade_distribution
+GRADE_GROUPS = {
+    "class": ("s.class_value",),
+    "section": ("s.class_value", "s.section"),
+    "subject": ("ar.subject",),
+}
+
+# Attendance percentage bands of get_attendance_grade_correlation
+ATTENDANCE_BANDS = (75.0, 90.0)
+
+# Optional columnar snapshot of the app tables (see analytics_snapshot.py).
+# When enabled, the summary and analytics tools answer from NumPy arrays
+# kept current from the tables' updated_at/created_at watermarks instead of
+# querying the database on every call.
+ANALYTICS_SNAPSHOT = os.getenv("ANALYTICS_SNAPSHOT", "false").lower() in ("1", "true", "yes")
+analytics_snapshot = AnalyticsSnapshot(
+    enabled=ANALYTICS_SNAPSHOT,
+    grade_points=GRADE_POINTS,
+    refresh_seconds=float(os.getenv("ANALYTICS_SNAPSHOT_REFRESH_SECONDS", 10)),
+    full_reload_seconds=float(os.getenv("ANALYTICS_SNAPSHOT_FULL_RELOAD_SECONDS", 3600)),
+    batch_size=DB_FETCH_BATCH_SIZE,
+)
+
+# Write tools whose changes the snapshot's watermarks cannot see: the table
+# and the column whose rows matching the call's argument are reloaded
+SNAPSHOT_RELOADED_ROWS = {
+    "mark_attendance": ("attendance", "attendance_date"),
+    "mark_attendance_bulk": ("attendance", "attendance_date"),
+}
+
+
+def _analytics_filters(
+    class_value: Optional[str], section: Optional[str], subject: Optional[str],
+    start_date: Optional[str], end_date: Optional[str], params: dict
+) -> tuple:
+    """Conditions on app.students s and on app.academic_records ar."""
+    student_conditions = []
+    if class_value is not None:
+        student_conditions.append("s.class_value = :class_value")
+        params["class_value"] = class_value
+    if section is not None:
+        student_conditions.append("s.section = :section")
+        params["section"] = section
+    record_conditions = []
+    if subject is not None:
+        record_conditions.append(f"ar.subject {ILIKE} :subject")
+        params["subject"] = f"%{subject}%"
+    if start_date is not None:
+        record_conditions.append("ar.record_date >= :start_date")
+        params["start_date"] = _iso_date(start_date)
+    if end_date is not None:
+        record_conditions.append("ar.record_date <= :end_date")
+        params["end_date"] = _iso_date(end_date)
+    return student_conditions, record_conditions
+
+
+def _student_aggregates(
+    start_date: Optional[str], end_date: Optional[str], record_conditions: list,
+    params: dict, behavior: bool = False
+) -> str:
+    """WITH clause of per-student attendance, grade and optionally behavior aggregates.
+
+    att holds attendance_percentage, gr average_grade_points and
+    grade_records, beh avg_sentiment_score and negative_records, each keyed
+    by student_id. The rollup unions of att and beh share the date
+    parameters, which have the same values for both.
+    """
+    attendance_rows = rollup_union(
+        "attendance_monthly", ATTENDANCE_DAILY, "attendance_date",
+        ROLLUP_COLUMNS["attendance_monthly"], None, start_date, end_date, params,
+    )
+    grade_where = " AND ".join(record_conditions + [f"({GRADE_POINTS_SQL}) IS NOT NULL"])
+    ctes = [
+        f"""att AS (
+            SELECT r.student_id,
+                   SUM(r.present_days) * 100.0 / NULLIF(SUM(r.total_days), 0) AS attendance_percentage
+            FROM ({attendance_rows}) AS r
+            GROUP BY r.student_id
+        )""",
+        f"""gr AS (
+            SELECT ar.student_id, AVG({GRADE_POINTS_SQL}) AS average_grade_points,
+                   COUNT(*) AS grade_records
+            FROM app.academic_records ar
+            WHERE {grade_where}
+            GROUP BY ar.student_id
+        )""",
+    ]
+    if behavior:
+        behavior_rows = rollup_union(
+            "behavior_monthly", "app.behavior_daily", "record_date",
+            ROLLUP_COLUMNS["behavior_daily"], None, start_date, end_date, params,
+        )
+        # * 1.0: SQLite stores whole sentiment sums as integers, and would
+        # divide them as integers
+        ctes.append(f"""beh AS (
+            SELECT r.student_id,
+                   SUM(r.sentiment_sum) * 1.0 / NULLIF(SUM(r.sentiment_count), 0) AS avg_sentiment_score,
+                   SUM(r.negative_records) AS negative_records
+            FROM ({behavior_rows}) AS r
+            GROUP BY r.student_id
+        )""")
+    return "WITH " + ", ".join(ctes)
+
+
+def _round(value, digits: int = 2) -> Optional[float]:
+    return None if value is None else round(float(value), digits)
+
+
+def _snapshot_at_risk(
+    class_value, section, start_date, end_date,
+    min_attendance_percentage, min_grade_points, min_sentiment_score, limit
+) -> list:
+    """get_at_risk_students rows from the analytics snapshot, before risk factors."""
+    metrics = analytics_snapshot.student_metrics(class_value, section, None, start_date, end_date)
+    attendance = metrics["attendance_percentage"]
+    risks = (
+        (attendance < min_attendance_percentage).astype(int)
+        + (metrics["average_grade_points"] < min_grade_points)
+        + (metrics["avg_sentiment_score"] < min_sentiment_score)
+    )
+    at_risk = sorted(
+        np.flatnonzero(risks),
+        key=lambda i: (
+            -risks[i], np.isnan(attendance[i]), attendance[i], metrics["student_name"][i] or "",
+            metrics["student_id"][i],
+        ),
+    )[:limit]
+    rows = []
+    for i in at_risk:
+        row = {}
+        for column, values in metrics.items():
+            value = values[i]
+            if isinstance(value, np.generic):
+                value = value.item()
+            row[column] = None if isinstance(value, float) and np.isnan(value) else value
+        if row["negative_records"] is not None:
+            row["negative_records"] = int(row["negative_records"])
+        rows.append(row)
+    return rows
+
+
+def get_grade_distribution(
+    group_by: str = "class",
+    class_value: Optional[str] = None,
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> dict:
+    """Gets grade counts and average grade points per class, section or subject.
+
+    Use this instead of fetching academic records to compare the performance
+    of classes, sections or subjects. Letter grades count as grade points
+    from 4.0 (A+, A) down to 0.0 (F).
+
+    Args:
+        group_by (str, optional): 'class' (default), 'section' (class and section) or 'subject'.
+        class_value (str, optional): Only students of this class.
+        section (str, optional): Only students of this section.
+        subject (str, optional): Only records of this subject.
+        start_date (str, optional): First record date (YYYY-MM-DD format).
+        end_date (str, optional): Last record date (YYYY-MM-DD format).
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str), and
+              'groups' (list[dict]), one per group with its group columns,
+              'records', 'average_grade_points' and 'grades' (grade -> count).
+    """
+    if group_by not in GRADE_GROUPS:
+        return {
+            "success": False,
+            "message": f"Invalid group_by '{group_by}'. Use one of: {', '.join(GRADE_GROUPS)}.",
+            "groups": [],
+        }
+    conn = get_db_connection()
+    try:
+        if analytics_snapshot.enabled and analytics_snapshot.refresh(conn, ("academic_records", "students")):
+            summary = analytics_snapshot.grade_distribution(
+                group_by, class_value, section, subject, start_date, end_date
+            )
+        else:
+            params = {}
+            student_conditions, record_conditions = _analytics_filters(
+                class_value, section, subject, start_date, end_date, params
+            )
+            keys = GRADE_GROUPS[group_by]
+            conditions = student_conditions + record_conditions
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            query = f"""
+                SELECT {', '.join(keys)}, ar.grade, COUNT(*) AS records,
+                       COUNT({GRADE_POINTS_SQL}) AS graded, SUM({GRADE_POINTS_SQL}) AS points
+                FROM app.academic_records ar
+                JOIN app.students s ON ar.student_id = s.student_id{where}
+                GROUP BY {', '.join(keys)}, ar.grade
+                ORDER BY {', '.join(keys)}, ar.grade
+            """
+
+            groups = {}
+            for row in conn.execute(text(query), params):
+                key = tuple(row[:len(keys)])
+                grade, records, graded, points = row[len(keys):]
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = {
+                        **{column.split(".")[1]: value for column, value in zip(keys, key)},
+                        "records": 0, "graded": 0, "points": 0.0, "grades": {},
+                    }
+                group["records"] += records
+                group["graded"] += graded
+                group["points"] += float(points or 0)
+                group["grades"][grade] = records
+
+            summary = []
+            for group in groups.values():
+                graded, points = group.pop("graded"), group.pop("points")
+                grades = group.pop("grades")
+                group["average_grade_points"] = _round(points / graded) if graded else None
+                group["grades"] = grades
+                summary.append(group)
+
+        return {
+            "success": True,
+            "message": f"Retrieved grade distribution for {len(summary)} groups by {group_by}.",
+            "groups": summary,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error retrieving grade distribution: {e}",
+            "groups": [],
+        }
+    finally:
+        conn.close()
+
+
+def get_attendance_grade_correlation(
+    class_value: Optional[str] = None,
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> dict:
+    """Measures how attendance relates to grades across students.
+
+    Compares each student's attendance percentage with their average grade
+    points over the same period.
+
+    Args:
+        class_value (str, optional): Only students of this class.
+        section (str, optional): Only students of this section.
+        subject (str, optional): Only grades of this subject.
+        start_date (str, optional): Start of the period (YYYY-MM-DD format).
+        end_date (str, optional): End of the period (YYYY-MM-DD format).
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str),
+              'students' (int), 'correlation' (Pearson coefficient between
+              attendance percentage and average grade points, or None for
+              fewer than two students or no variation), and 'bands'
+              (list[dict]) with the students and average grade points per
+              attendance percentage band.
+    """
+    conn = get_db_connection()
+    try:
+        if analytics_snapshot.enabled and analytics_snapshot.refresh(
+            conn, ("attendance", "academic_records", "students")
+        ):
+            metrics = analytics_snapshot.student_metrics(
+                class_value, section, subject, start_date, end_date, behavior=False
+            )
+            pairs = np.column_stack([metrics["attendance_percentage"], metrics["average_grade_points"]])
+            pairs = pairs[~np.isnan(pairs).any(axis=1)]
+        else:
+            params = {}
+            student_conditions, record_conditions = _analytics_filters(
+                class_value, section, subject, start_date, end_date, params
+            )
+            where = f" WHERE {' AND '.join(student_conditions)}" if student_conditions else ""
+            query = f"""
+                {_student_aggregates(start_date, end_date, record_conditions, params)}
+                SELECT att.attendance_percentage, gr.average_grade_points
+                FROM app.students s
+                JOIN att ON att.student_id = s.student_id
+                JOIN gr ON gr.student_id = s.student_id{where}
+            """
+
+            rows = conn.execute(text(query), params).fetchall()
+            pairs = np.array(
+                [(float(attendance), float(points)) for attendance, points in rows if attendance is not None],
+                dtype=float,
+            ).reshape(-1, 2)
+
+        attendance, points = pairs[:, 0], pairs[:, 1]
+
+        correlation = None
+        if len(pairs) >= 2 and attendance.std() > 0 and points.std() > 0:
+            correlation = _round(np.corrcoef(attendance, points)[0, 1], 3)
+
+        band = np.digitize(attendance, ATTENDANCE_BANDS)
+        edges = (None,) + ATTENDANCE_BANDS + (None,)
+        bands = []
+        for i in range(len(ATTENDANCE_BANDS) + 1):
+            in_band = points[band == i]
+            bands.append({
+                "min_attendance_percentage": edges[i],
+                "max_attendance_percentage": edges[i + 1],
+                "students": int(in_band.size),
+                "average_grade_points": _round(in_band.mean()) if in_band.size else None,
+            })
+
+        return {
+            "success": True,
+            "message": f"Compared attendance and grades of {len(pairs)} students.",
+            "students": len(pairs),
+            "correlation": correlation,
+            "bands": bands,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error correlating attendance and grades: {e}",
+            "students": 0,
+            "correlation": None,
+            "bands": [],
+        }
+    finally:
+        conn.close()
+
+
+def get_at_risk_students(
+    class_value: Optional[str] = None,
+    section: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_attendance_percentage: float = 75.0,
+    min_grade_points: float = 2.0,
+    min_sentiment_score: float = -0.2,
+    limit: int = 50
+) -> dict:
+    """Lists students at risk by attendance, grades or behavior.
+
+    A student is at risk when their attendance percentage, average grade
+    points or average behavior sentiment score in the period is below the
+    given minimum. Students with the most risk factors come first, then those
+    with the lowest attendance; students without attendance records come last
+    among equals.
+
+    Args:
+        class_value (str, optional): Only students of this class.
+        section (str, optional): Only students of this section.
+        start_date (str, optional): Start of the period (YYYY-MM-DD format).
+        end_date (str, optional): End of the period (YYYY-MM-DD format).
+        min_attendance_percentage (float, optional): Attendance below this is a risk (default 75).
+        min_grade_points (float, optional): Average grade points below this is a risk (default 2.0, a C).
+        min_sentiment_score (float, optional): Average sentiment below this is a risk (default -0.2).
+        limit (int, optional): Maximum students to return (default 50, max 1000).
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str), and
+              'students' (list[dict]) with each student's attendance
+              percentage, average grade points, average sentiment score,
+              negative behavior records and 'risk_factors' (list[str]).
+    """
+    conn = get_db_connection()
+    try:
+        if analytics_snapshot.enabled and analytics_snapshot.refresh(conn, tuple(SNAPSHOT_TABLES)):
+            rows = _snapshot_at_risk(
+                class_value, section, start_date, end_date,
+                min_attendance_percentage, min_grade_points, min_sentiment_score, page_limit(limit),
+            )
+        else:
+            params = {
+                "min_attendance": min_attendance_percentage,
+                "min_grade_points": min_grade_points,
+                "min_sentiment": min_sentiment_score,
+                "limit": page_limit(limit),
+            }
+            student_conditions, record_conditions = _analytics_filters(
+                class_value, section, None, start_date, end_date, params
+            )
+            low_attendance = "COALESCE(att.attendance_percentage < :min_attendance, FALSE)"
+            low_grades = "COALESCE(gr.average_grade_points < :min_grade_points, FALSE)"
+            low_sentiment = "COALESCE(beh.avg_sentiment_score < :min_sentiment, FALSE)"
+            conditions = student_conditions + [f"({low_attendance} OR {low_grades} OR {low_sentiment})"]
+            risk_count = " + ".join(
+                f"CASE WHEN {condition} THEN 1 ELSE 0 END"
+                for condition in (low_attendance, low_grades, low_sentiment)
+            )
+            query = f"""
+                {_student_aggregates(start_date, end_date, record_conditions, params, behavior=True)}
+                SELECT s.student_id, s.student_name, s.class_value, s.section,
+                       att.attendance_percentage, gr.average_grade_points,
+                       beh.avg_sentiment_score, beh.negative_records
+                FROM app.students s
+                LEFT JOIN att ON att.student_id = s.student_id
+                LEFT JOIN gr ON gr.student_id = s.student_id
+                LEFT JOIN beh ON beh.student_id = s.student_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {risk_count} DESC,
+                         CASE WHEN att.attendance_percentage IS NULL THEN 1 ELSE 0 END,
+                         att.attendance_percentage, COALESCE(s.student_name, ''), s.student_id
+                LIMIT :limit
+            """
+            result = conn.execute(text(query), params)
+            columns = result.keys()
+            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+
+        minimums = {
+            "attendance_percentage": ("attendance", min_attendance_percentage),
+            "average_grade_points": ("grades", min_grade_points),
+            "avg_sentiment_score": ("behavior", min_sentiment_score),
+        }
+        students = []
+        for student in rows:
+            risk_factors = []
+            for column, (factor, minimum) in minimums.items():
+                value = student[column]
+                if value is not None and value < minimum:
+                    risk_factors.append(factor)
+                student[column] = _round(value)
+            student["risk_factors"] = risk_factors
+            students.append(student)
+
+        return {
+            "success": True,
+            "message": f"Found {len(students)} students at risk.",
+            "students": students,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error retrieving at-risk students: {e}",
+            "students": [],
+        }
+    finally:
+        conn.close()
+
+
+# --- Query Plan Advisor ---
+# explain_tool_queries runs the read tools with sample arguments from the
+# database, captures the statements they execute on the sync engine and
+# reports the sequential scans in their EXPLAIN plans.
+_captured_statements = contextvars.ContextVar("captured_statements", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _capture_statement(conn, cursor, statement, parameters, context, executemany):
+    captured = _captured_statements.get()
+    if captured is not None and not executemany:
+        captured.append((statement, parameters))
+
+
+# One call per filter combination of each read tool; string values name a
+# sample from _advisor_samples. Paginated tools are also run with a cursor.
+ADVISOR_QUERY_SHAPES = [
+    (get_academic_records, {"student_id": "student_id"}),
+    (get_academic_records, {"subject": "subject"}),
+    (get_academic_records, {"teacher_id": "teacher_id"}),
+    (get_attendance_records, {"student_id": "student_id"}),
+    (get_attendance_records, {"attendance_date": "day"}),
+    (get_attendance_summary, {"start_date": "range_start", "end_date": "day"}),
+    (get_attendance_summary, {"student_id": "student_id", "start_date": "range_start", "end_date": "day"}),
+    (get_behavior_records, {"student_id": "student_id"}),
+    (get_behavior_records, {"logged_by": "teacher_id"}),
+    (get_behavior_records, {"start_date": "range_start", "end_date": "day"}),
+    (get_behavior_summary, {"start_date": "range_start", "end_date": "day"}),
+    (get_behavior_summary, {"student_id": "student_id", "start_date": "range_start", "end_date": "day"}),
+    (get_students, {"student_id": "student_id"}),
+    (get_students, {"student_name": "student_name"}),
+    (get_students, {"class_value": "class_value", "section": "section"}),
+    (get_students_by_class, {"class_value": "class_value", "section": "section"}),
+    (get_users, {"name": "teacher_name"}),
+    (get_users, {"student_id": "student_id"}),
+    (get_users_by_role, {"role": "role"}),
+    (get_teachers_by_subject, {"subject": "subject"}),
+]
+
+
+def _advisor_samples(conn) -> dict:
+    """Argument values for ADVISOR_QUERY_SHAPES, taken from existing rows."""
+    samples = {
+        "student_id": 0,
+        "student_name": "student",
+        "class_value": "",
+        "section": "",
+        "teacher_id": 0,
+        "teacher_name": "teacher",
+        "subject": "subject",
+        "role": "teacher",
+    }
+    student = conn.execute(text("""
+        SELECT student_id, student_name, class_value, section
+        FROM app.students ORDER BY student_id LIMIT 1
+    """)).mappings().first()
+    teacher = conn.execute(text("""
+        SELECT id AS teacher_id, name AS teacher_name, subject
+        FROM app.users WHERE role = 'teacher' ORDER BY id LIMIT 1
+    """)).mappings().first()
+    for row in (student, teacher):
+        samples.update({key: value for key, value in (row or {}).items() if value is not None})
+    day = _as_date(conn.execute(text("SELECT MAX(attendance_date) FROM app.attendance")).scalar() or date.today())
+    samples["day"] = day.isoformat()
+    samples["range_start"] = (day - timedelta(days=90)).isoformat()
+    return samples
+
+
+def _seq_scans(plan: dict):
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def _table_scans(conn, statement: str, params):
+    """Yields (table, filter) for each full table scan in a statement's plan."""
+    if DB_DIALECT == "postgresql":
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", params).scalar()
+        for scan in _seq_scans(plan[0]["Plan"]):
+            yield scan["Relation Name"], scan.get("Filter")
+        return
+    # SQLite names scanned tables by alias, and a "SCAN t USING INDEX" walks
+    # an index rather than the table
+    names = {}
+    for table, alias in re.findall(r"\bapp\.(\w+)(?:\s+(?:AS\s+)?(\w+))?", statement, re.IGNORECASE):
+        names[table] = names[f"app.{table}"] = names[alias or table] = table
+    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params):
+        detail = row[-1]
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            name = detail.split()[1]
+            if name in names:
+                yield names[name], None
+
+
+def explain_tool_queries(min_table_rows: int = 1000) -> dict:
+    """Reports sequential scans in the query plans of the read tools.
+
+    Each read tool is run with sample arguments from the database and every
+    statement it executes is EXPLAINed. Postgres prefers sequential scans of
+    small tables even when an index exists, so scans of tables with fewer
+    than min_table_rows rows are left out.
+
+    Args:
+        min_table_rows (int): Smallest table, in rows, whose sequential scans are reported.
+                              Defaults to 1000.
+
+    Returns:
+        dict: A dictionary with keys 'success' (bool), 'message' (str),
+              'queries' (int) explained, and 'seq_scans' (list[dict]) giving the
+              tool, arguments, table, table_rows, filter and statement of each scan.
+    """
+    try:
+        with engine.connect() as conn:
+            samples = _advisor_samples(conn)
+            if DB_DIALECT == "postgresql":
+                table_rows = dict(conn.execute(text(
+                    "SELECT relname, n_live_tup FROM pg_stat_user_tables WHERE schemaname = 'app'"
+                )).fetchall())
+            else:
+                tables = conn.execute(text(
+                    "SELECT name FROM app.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+                )).scalars().all()
+                table_rows = {
+                    table: conn.execute(text(f"SELECT COUNT(*) FROM app.{table}")).scalar()
+                    for table in tables
+                }
+
+        calls = []
+        for func, shape in ADVISOR_QUERY_SHAPES:
+            args = {name: samples[value] if isinstance(value, str) else value for name, value in shape.items()}
+            calls.append((func, args))
+            if "cursor" in inspect.signature(func).parameters:
+                next_cursor = func(**args, limit=1).get("next_cursor")
+                if next_cursor:
+                    calls.append((func, {**args, "cursor": next_cursor}))
+
+        statements = []
+        for func, args in calls:
+            captured = []
+            token = _captured_statements.set(captured)
+            try:
+                func(**args)
+            finally:
+                _captured_statements.reset(token)
+            statements.extend((func.__name__, args, statement, params) for statement, params in captured)
+
+        seq_scans, seen = [], set()
+        with engine.connect() as conn:
+            for tool, args, statement, params in statements:
+                for table, scan_filter in _table_scans(conn, statement, params):
+                    rows = table_rows.get(table, 0)
+                    key = (tool, table, statement)
+                    if rows < min_table_rows or key in seen:
+                        continue
+                    seen.add(key)
+                    seq_scans.append({
+                        "tool": tool,
+                        "arguments": args,
+                        "table": table,
+                        "table_rows": rows,
+                        "filter": scan_filter,
+                        "statement": " ".join(statement.split()),
+                    })
+
+        return {
+            "success": True,
+            "message": (
+                f"Explained {len(statements)} queries from {len(calls)} tool calls; "
+                f"{len(seq_scans)} sequential scans of tables with at least {min_table_rows} rows."
+            ),
+            "queries": len(statements),
+            "seq_scans": seq_scans,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error explaining tool queries: {e}",
+            "queries": 0,
+            "seq_scans": [],
+        }
+
+
 # --- MCP Server Setup ---
 logging.info(
     "Creating MCP Server instance for PostgreSQL DB..."
 )  
 app = Server("postgresql-db-mcp-server")
 
+# Tables read by the cached read tools
+CACHED_TOOL_TABLES = {
+    "get_academic_records": ("academic_records", "students", "users"),
+    "get_attendance_records": ("attendance", "students"),
+    "get_attendance_summary": ("attendance", "attendance_monthly", "students"),
+    "get_behavior_records": ("behavior_records", "students", "users"),
+    "get_behavior_summary": ("behavior_records", "behavior_daily", "behavior_monthly", "students"),
+    "get_students": ("students",),
+    "get_students_by_class": ("students",),
+    "get_users": ("users", "students"),
+    "get_users_by_role": ("users", "students"),
+    "get_teachers_by_subject": ("users",),
+    "get_grade_distribution": ("academic_records", "students"),
+    "get_attendance_grade_correlation": ("academic_records", "attendance", "attendance_monthly", "students"),
+    "get_at_risk_students": (
+        "academic_records", "attendance", "attendance_monthly", "behavior_records",
+        "behavior_daily", "behavior_monthly", "students",
+    ),
+}
+
+# Tables changed by the write tools; None takes the table_name argument
+WRITE_TOOL_TABLES = {
+    "insert_data": None,
+    "delete_data": None,
+    "add_academic_record": ("academic_records",),
+    "mark_attendance": ("attendance",),
+    "mark_attendance_bulk": ("attendance",),
+    "add_behavior_record": ("behavior_records",),
+    "add_academic_records_bulk": ("academic_records",),
+    "add_behavior_records_bulk": ("behavior_records",),
+    "check_summary_rollups": ("attendance_monthly", "behavior_daily", "behavior_monthly"),
+    "add_student": ("students",),
+    "update_student": ("students",),
+    "add_user": ("users",),
+    "update_user": ("users",),
+}
+
+
+def db_tool(func) -> FunctionTool:
+    """Wraps a database tool function for the MCP server.
+
+    Every database tool runs on the async engine so concurrent calls do not
+    block the stdio loop; read tools are served through the result cache and
+    write tools invalidate it and update the analytics snapshot.
+    """
+    name = func.__name__
+    tool_func = async_db_tool(func)
+    if name in CACHED_TOOL_TABLES:
+        tool_func = tool_cache.cached(tool_func, CACHED_TOOL_TABLES[name])
+    elif name in WRITE_TOOL_TABLES:
+        tool_func = tool_cache.invalidating(tool_func, WRITE_TOOL_TABLES[name])
+        tool_func = analytics_snapshot.invalidating(
+            tool_func, WRITE_TOOL_TABLES[name], SNAPSHOT_RELOADED_ROWS.get(name)
+        )
+    return FunctionTool(func=tool_func)
+
+
 # Wrap database utility functions as ADK FunctionTools
 ADK_DB_TOOLS = {
-    "list_db_tables": FunctionTool(func=list_db_tables),
-    "get_table_schema": FunctionTool(func=get_table_schema),
-    "query_db_table": FunctionTool(func=query_db_table),
-    "insert_data": FunctionTool(func=insert_data),
-    "delete_data": FunctionTool(func=delete_data),
-    "get_academic_records": FunctionTool(func=get_academic_records),
-    "add_academic_record": FunctionTool(func=add_academic_record),
-    "get_attendance_records": FunctionTool(func=get_attendance_records),
-    "mark_attendance": FunctionTool(func=mark_attendance),
-    "get_attendance_summary": FunctionTool(func=get_attendance_summary),
-    "get_behavior_records": FunctionTool(func=get_behavior_records),
-    "add_behavior_record": FunctionTool(func=add_behavior_record),
-    "get_behavior_summary": FunctionTool(func=get_behavior_summary),
-    "get_students": FunctionTool(func=get_students),
-    "add_student": FunctionTool(func=add_student),
-    "update_student": FunctionTool(func=update_student),
-    "get_students_by_class": FunctionTool(func=get_students_by_class),
-    "get_users": FunctionTool(func=get_users),
-    "add_user": FunctionTool(func=add_user),
-    "update_user": FunctionTool(func=update_user),
-    "get_users_by_role": FunctionTool(func=get_users_by_role),
-    "get_teachers_by_subject": FunctionTool(func=get_teachers_by_subject),
+    "list_db_tables": db_tool(list_db_tables),
+    "get_table_schema": db_tool(get_table_schema),
+    "query_db_table": db_tool(query_db_table),
+    "insert_data": db_tool(insert_data),
+    "delete_data": db_tool(delete_data),
+    "get_academic_records": db_tool(get_academic_records),
+    "add_academic_record": db_tool(add_academic_record),
+    "get_attendance_records": db_tool(get_attendance_records),
+    "mark_attendance": db_tool(mark_attendance),
+    "mark_attendance_bulk": db_tool(mark_attendance_bulk),
+    "get_attendance_summary": db_tool(get_attendance_summary),
+    "get_behavior_records": db_tool(get_behavior_records),
+    "add_behavior_record": db_tool(add_behavior_record),
+    "get_behavior_summary": db_tool(get_behavior_summary),
+    "check_summary_rollups": db_tool(check_summary_rollups),
+    "add_academic_records_bulk": db_tool(add_academic_records_bulk),
+    "add_behavior_records_bulk": db_tool(add_behavior_records_bulk),
+    "get_students": db_tool(get_students),
+    "add_student": db_tool(add_student),
+    "update_student": db_tool(update_student),
+    "get_students_by_class": db_tool(get_students_by_class),
+    "get_users": db_tool(get_users),
+    "add_user": db_tool(add_user),
+    "update_user": db_tool(update_user),
+    "get_users_by_role": db_tool(get_users_by_role),
+    "get_teachers_by_subject": db_tool(get_teachers_by_subject),
+    "get_grade_distribution": db_tool(get_grade_distribution),
+    "get_attendance_grade_correlation": db_tool(get_attendance_grade_correlation),
+    "get_at_risk_students": db_tool(get_at_risk_students),
+    "get_db_pool_stats": FunctionTool(func=get_db_pool_stats),
+    "get_tool_cache_stats": FunctionTool(func=get_tool_cache_stats),
+    "get_analytics_snapshot_stats": FunctionTool(func=get_analytics_snapshot_stats),
+    "explain_tool_queries": FunctionTool(func=threaded_tool(explain_tool_queries)),
 }
 
 
+_mcp_tool_schemas = None
+
+
+def mcp_tool_schemas() -> list[mcp_types.Tool]:
+    """MCP schemas of the ADK_DB_TOOLS, built on first use and then reused."""
+    global _mcp_tool_schemas
+    if _mcp_tool_schemas is None:
+        schemas = []
+        for tool_name, adk_tool_instance in ADK_DB_TOOLS.items():
+            if not adk_tool_instance.name:
+                adk_tool_instance.name = tool_name
+
+            mcp_tool_schema = adk_to_mcp_tool_type(adk_tool_instance)
+            mcp_tool_schema.inputSchema.setdefault("properties", {})["response_format"] = {
+                "type": "string",
+                "enum": list(RESPONSE_FORMATS),
+                "description": (
+                    "Optional. 'compact' returns record lists as a column list plus "
+                    "row arrays, which is smaller for large results."
+                ),
+            }
+            logging.debug(
+                f"MCP Server: Advertising tool: {mcp_tool_schema.name}, InputSchema: {mcp_tool_schema.inputSchema}"
+            )
+            schemas.append(mcp_tool_schema)
+        _mcp_tool_schemas = schemas
+    return _mcp_tool_schemas
+
+
 @app.list_tools()
 async def list_mcp_tools() -> list[mcp_types.Tool]:
     """MCP handler to list tools this server exposes."""
-    logging.info(
-        "MCP Server: Received list_tools request."
-    )  # Changed print to logging.info
-    mcp_tools_list = []
-    for tool_name, adk_tool_instance in ADK_DB_TOOLS.items():
-        if not adk_tool_instance.name:
-            adk_tool_instance.name = tool_name
-
-        mcp_tool_schema = adk_to_mcp_tool_type(adk_tool_instance)
-        logging.info(  # Changed print to logging.info
-            f"MCP Server: Advertising tool: {mcp_tool_schema.name}, InputSchema: {mcp_tool_schema.inputSchema}"
-        )
-        mcp_tools_list.append(mcp_tool_schema)
-    return mcp_tools_list
+    schemas = mcp_tool_schemas()
+    logging.info(f"MCP Server: Received list_tools request; advertising {len(schemas)} tools.")
+    return schemas
 
 
 @app.call_tool()
@@ -1472,6 +3497,8 @@ async def call_mcp_tool(name: str, arguments: dict) -> list[mcp_types.TextConten
 
     if name in ADK_DB_TOOLS:
         adk_tool_instance = ADK_DB_TOOLS[name]
+        arguments = dict(arguments or {})
+        response_format = arguments.pop("response_format", None) or MCP_RESPONSE_FORMAT
         try:
             adk_tool_response = await adk_tool_instance.run_async(
                 args=arguments,
@@ -1480,7 +3507,7 @@ async def call_mcp_tool(name: str, arguments: dict) -> list[mcp_types.TextConten
             logging.info(  # Changed print to logging.info
                 f"MCP Server: ADK tool '{name}' executed. Response: {adk_tool_response}"
             )
-            response_text = json.dumps(adk_tool_response, indent=2, default=json_serializer)
+            response_text = encode_tool_response(adk_tool_response, response_format)
             return [mcp_types.TextContent(type="text", text=response_text)]
 
         except Exception as e:
@@ -1505,31 +3532,132 @@ async def call_mcp_tool(name: str, arguments: dict) -> list[mcp_types.TextConten
         return [mcp_types.TextContent(type="text", text=error_text)]
 
 
+# --- Schema Migrations ---
+# `python3 server.py --migrate` applies pending migrations (see migrations.py)
+# and exits. With DB_AUTO_MIGRATE=true they are also applied when the MCP
+# server starts; it is off by default because migrations can rewrite data
+# (0001 removes duplicate rows). In-process tools never apply them.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+
+def run_migrations() -> list:
+    """Applies pending schema migrations and returns their versions."""
+    with engine.connect() as conn:
+        applied = apply_migrations(conn)
+    if applied:
+        tool_cache.clear()
+        logging.info(f"Applied migrations: {', '.join(applied)}")
+    return applied
+
+
+_startup_migrations_done = False
+_startup_migrations_lock = asyncio.Lock()
+
+
+async def run_startup_migrations():
+    """Applies pending migrations once per process if DB_AUTO_MIGRATE is on.
+
+    A failure is logged rather than raised, so the tools stay available on a
+    database the server cannot migrate.
+    """
+    global _startup_migrations_done
+    if _startup_migrations_done:
+        return
+    async with _startup_migrations_lock:
+        if _startup_migrations_done:
+            return
+        _startup_migrations_done = True
+        if DB_AUTO_MIGRATE:
+            try:
+                await asyncio.to_thread(run_migrations)
+            except Exception as e:
+                logging.error(f"Error applying schema migrations: {e}", exc_info=True)
+
+
+# --- In-Process Tools ---
+# Agents running in this process can use the database tools directly instead
+# of through the stdio MCP server: no subprocess, no JSON-RPC round trip and
+# the connection pools, statement cache and result cache are shared.
+def in_process_tool(tool: FunctionTool) -> FunctionTool:
+    """Wraps an ADK_DB_TOOLS entry for an agent in this process.
+
+    Results (or the error payload call_mcp_tool would send) are returned as
+    JSON-compatible values in the MCP_RESPONSE_FORMAT layout. Unlike the MCP
+    server, the in-process tools do not apply migrations: the web app leaves
+    schema changes to `server.py --migrate`.
+    """
+    func = tool.func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            logging.error(f"Error executing tool '{func.__name__}': {e}", exc_info=True)
+            return {
+                "success": False,
+                "message": f"Failed to execute tool '{func.__name__}': {str(e)}",
+            }
+        if MCP_RESPONSE_FORMAT == "compact":
+            result = to_columnar(result)
+        return to_json_compatible(result)
+
+    return FunctionTool(func=wrapper)
+
+
+def in_process_db_tools() -> list:
+    """The database tools as FunctionTools for an agent in this process."""
+    return [in_process_tool(tool) for tool in ADK_DB_TOOLS.values()]
+
+
 # --- MCP Server Runner ---
 async def run_mcp_stdio_server():
     """Runs the MCP server, listening for connections over standard input/output."""
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        logging.info(
-            "MCP Stdio Server: Starting handshake with client..."
-        )  # Changed print to logging.info
-        await app.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name=app.name,
-                server_version="0.1.0",
-                capabilities=app.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    imported_ms = (time.perf_counter() - _PROCESS_START) * 1000
+    await run_startup_migrations()
+    migrated_ms = (time.perf_counter() - _PROCESS_START) * 1000
+    # Built before the handshake so the client's first list_tools is not delayed
+    mcp_tool_schemas()
+    ready_ms = (time.perf_counter() - _PROCESS_START) * 1000
+    logging.info(
+        f"MCP Server: startup {ready_ms:.0f} ms (imports {imported_ms:.0f} ms, "
+        f"migrations {migrated_ms - imported_ms:.0f} ms, "
+        f"tool schemas {ready_ms - migrated_ms:.0f} ms)"
+    )
+
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            logging.info(
+                "MCP Stdio Server: Starting handshake with client..."
+            )  # Changed print to logging.info
+            await app.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name=app.name,
+                    server_version="0.1.0",
+                    capabilities=app.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
-        logging.info(
-            "MCP Stdio Server: Run loop finished or client disconnected."
-        )  # Changed print to logging.info
+            )
+            logging.info(
+                "MCP Stdio Server: Run loop finished or client disconnected."
+            )  # Changed print to logging.info
+    finally:
+        # Close pooled connections while the loop runs; aiosqlite's connection
+        # threads would otherwise keep the process alive
+        await async_engine.dispose()
 
 
 if __name__ == "__main__":
+    if "--migrate" in sys.argv:
+        print(f"Applied migrations: {run_migrations() or 'none pending'}")
+        sys.exit(0)
+
     logging.info(
         "Launching PostgreSQL DB MCP Server via stdio..."
     )
@@ -0,0 +1,303 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions import BaseSessionService, DatabaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("session")
+
+
+class StaleSessionError(ValueError):
+    """Queued events were based on a session another worker has since updated."""
+
+
+def create_session_service(db_url: Optional[str] = None, **options) -> BaseSessionService:
+    """Builds the session service for this process.
+
+    Without a database URL sessions live in process memory, which limits the
+    app to a single worker. With one (e.g. "sqlite:///sessions.db" or a
+    "postgresql://..." URL) sessions are shared by every worker and replica
+    through a database, fronted by a local read cache and write-behind event
+    writes.
+    """
+    if not db_url:
+        return InMemorySessionService()
+    return CachedSessionService(DatabaseSessionService(db_url), **options)
+
+
+class CachedSessionService(BaseSessionService):
+    """Database-backed session service with a local read cache and deferred writes.
+
+    - Reads: sessions are cached per process. A cached copy is reused without
+      a database round trip for ``cache_ttl_seconds`` after it was last read
+      from or written to the database, and while it has queued events.
+    - Writes: appended events are applied to the in-memory session right away
+      and queued. Queued events are written through the wrapped service's
+      append_event when ``batch_size`` events are waiting, ``flush_interval``
+      seconds after the first queued event, or when flush() is called. If a
+      write fails, the events not yet written stay queued for the next flush.
+
+    Consistency: a worker does not see another worker's turn on a session
+    until its cached copy expires, and other workers do not see a turn until
+    its events are flushed. A worker that appends to such a stale copy never
+    overwrites the newer session: the wrapped service rejects the write,
+    flush() raises StaleSessionError and the local copy is dropped, so the
+    next read reloads it. With several workers, route a session's requests to
+    one worker, or set ``cache_ttl_seconds`` to 0 to read every session from
+    the database. Events still queued when a process dies are lost; main.py
+    flushes on shutdown.
+
+    Note that SQLite timestamps have one-second resolution, so two workers
+    updating the same session within the same second can be missed by the
+    stale-session check; use Postgres for multi-node deployments.
+    """
+
+    def __init__(
+        self,
+        backend: DatabaseSessionService,
+        max_cached_sessions: int = 1000,
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+        cache_ttl_seconds: float = 5,
+        clock=time.monotonic,
+    ):
+        self.backend = backend
+        self.max_cached_sessions = max_cached_sessions
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._clock = clock
+        self._cache = OrderedDict()
+        # When each cached copy last matched the database
+        self._synced_at = {}
+        self._pending = {}
+        # last_update_time of the database row each session's queued events build on
+        self._pending_since = {}
+        self._pending_count = 0
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.flushes = 0
+        self.flushed_events = 0
+
+    @staticmethod
+    def _key(app_name: str, user_id: str, session_id: str) -> tuple:
+        return (app_name, user_id, session_id)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self.backend.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._cache_put(self._key(app_name, user_id, session.id), session, synced=True)
+        return copy.deepcopy(session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = self._key(app_name, user_id, session_id)
+        if config is None:
+            cached = self._cache.get(key)
+            if cached is not None and (
+                key in self._pending
+                or self._clock() - self._synced_at[key] <= self.cache_ttl_seconds
+            ):
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return copy.deepcopy(cached)
+
+        self.cache_misses += 1
+        await self.flush()
+        session = await self.backend.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None and config is None:
+            self._cache_put(key, session, synced=True)
+            return copy.deepcopy(session)
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        await self.flush()
+        return await self.backend.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = self._key(app_name, user_id, session_id)
+        self._cache_pop(key)
+        self._pending_count -= len(self._pending.pop(key, []))
+        self._pending_since.pop(key, None)
+        await self.backend.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    def evict_local(self, *, app_name: str, user_id: str, session_id: str):
+        """Drops a session from this process's cache without touching the database."""
+        key = self._key(app_name, user_id, session_id)
+        if key not in self._pending:
+            self._cache_pop(key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+
+        key = self._key(session.app_name, session.user_id, session.id)
+        if key not in self._pending:
+            self._pending_since[key] = session.last_update_time
+        self._pending.setdefault(key, []).append(event)
+        self._pending_count += 1
+        self._cache_put(key, session)
+
+        if self._pending_count >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+        return event
+
+    async def flush(self):
+        """Writes all queued events to the database.
+
+        Raises the database error, with the events not yet written still
+        queued, if a write fails, and StaleSessionError after dropping the
+        events of sessions another worker updated in the meantime.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, since = self._pending, self._pending_since
+            self._pending, self._pending_since, self._pending_count = {}, {}, 0
+            progress, stale = {}, []
+            try:
+                # DatabaseSessionService does blocking I/O in its coroutines,
+                # so they run on their own event loop in a worker thread
+                await asyncio.to_thread(asyncio.run, self._write_batch(batch, since, progress, stale))
+            except Exception:
+                written = {
+                    key: progress.get(key, (0, since[key])) for key in batch if key not in stale
+                }
+                self._requeue(
+                    {key: batch[key][count:] for key, (count, _) in written.items()},
+                    {key: update_time for key, (_, update_time) in written.items()},
+                )
+                raise
+            finally:
+                self._apply_progress(progress, stale)
+            self.flushes += 1
+
+        if stale:
+            dropped = sum(len(batch[key]) for key in stale)
+            raise StaleSessionError(
+                f"Dropped {dropped} events of {len(stale)} sessions updated by another worker: "
+                + ", ".join(session_id for _, _, session_id in stale)
+            )
+
+    def _apply_progress(self, progress: dict, stale: list):
+        # Cached sessions now match the database rows their events were
+        # written to; events queued during the write build on the new rows
+        now = self._clock()
+        for key, (written, update_time) in progress.items():
+            self.flushed_events += written
+            cached = self._cache.get(key)
+            if cached is not None:
+                cached.last_update_time = update_time
+                self._synced_at[key] = now
+            if key in self._pending_since:
+                self._pending_since[key] = update_time
+        for key in stale:
+            self._cache_pop(key)
+            self._pending_count -= len(self._pending.pop(key, []))
+            self._pending_since.pop(key, None)
+
+    def _requeue(self, batch: dict, since: dict):
+        """Puts unwritten events back ahead of the events queued while they were written."""
+        batch = {key: events for key, events in batch.items() if events}
+        pending = {key: events + self._pending.pop(key, []) for key, events in batch.items()}
+        pending.update(self._pending)
+        self._pending = pending
+        self._pending_since = {
+            **self._pending_since, **{key: since[key] for key in batch}
+        }
+        self._pending_count = sum(len(events) for events in pending.values())
+
+    def stats(self) -> dict:
+        return {
+            "cached_sessions": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "pending_events": self._pending_count,
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+        }
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+        except Exception as e:
+            logger.error("Error flushing session events: %s", e)
+        finally:
+            self._flush_task = None
+
+    def _cache_put(self, key: tuple, session: Session, synced: bool = False):
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        if synced or key not in self._synced_at:
+            self._synced_at[key] = self._clock()
+        while len(self._cache) > self.max_cached_sessions:
+            oldest = next((k for k in self._cache if k not in self._pending), None)
+            if oldest is None:
+                break
+            self._cache_pop(oldest)
+
+    def _cache_pop(self, key: tuple):
+        self._cache.pop(key, None)
+        self._synced_at.pop(key, None)
+
+    async def _write_batch(self, batch: dict, since: dict, progress: dict, stale: list):
+        """Appends queued events through the wrapped service, in order per session.
+
+        Records in ``progress`` the number of events written per session and
+        the row's update time after them, and in ``stale`` the sessions
+        whose row is newer than the copy the events were queued on, or gone.
+        """
+        for key, events in batch.items():
+            app_name, user_id, session_id = key
+            # Carries the update time the wrapped service checks the row
+            # against, and advances it as each event is written
+            session = Session(
+                app_name=app_name, user_id=user_id, id=session_id, last_update_time=since[key]
+            )
+            for event in events:
+                try:
+                    await self.backend.append_event(session=session, event=event)
+                except ValueError:
+                    # DatabaseSessionService's stale-session check
+                    stale.append(key)
+                    break
+                except Exception:
+                    if await self.backend.get_session(
+                        app_name=app_name, user_id=user_id, session_id=session_id
+                    ) is not None:
+                        raise
+                    # Deleted by another worker
+                    stale.append(key)
+                    break
+                progress[key] = (progress.get(key, (0,))[0] + 1, session.last_update_time)
@@ -0,0 +1,201 @@
+import time
+from collections import OrderedDict
+
+from google.adk import __version__ as adk_version
+from google.adk.sessions import InMemorySessionService
+
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("session")
+
+# google-adk versions whose InMemorySessionService keeps an empty per-user
+# dict in its (private) ``sessions`` mapping after the user's last session is
+# deleted. Only these are pruned, and HttpSessionCache logs a warning on any
+# other version; check the layout before adding one.
+PRUNE_EMPTY_USERS_ADK_VERSIONS = {"1.0.0"}
+
+
+def estimate_session_bytes(session) -> int:
+    """Approximate the memory held by an ADK session from its serialized size."""
+    if session is None:
+        return 0
+    try:
+        return len(session.model_dump_json())
+    except Exception:
+        return 0
+
+
+class HttpSessionCache:
+    """LRU/TTL cache of HTTP chat sessions.
+
+    Entries are bounded by count, by approximate byte size and by idle time.
+    Evicting an entry also deletes the underlying session from the ADK session
+    service, so the process footprint stays flat under a steady stream of new
+    session ids. With a shared session store (``delete_on_evict=False``) the
+    session may still be in use by another worker, so eviction only drops it
+    from this process.
+    """
+
+    def __init__(
+        self,
+        session_service,
+        app_name: str,
+        max_entries: int = 1000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        delete_on_evict: bool = True,
+        clock=time.monotonic,
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.delete_on_evict = delete_on_evict
+        self._clock = clock
+        self._prune_empty_users = (
+            type(session_service) is InMemorySessionService
+            and adk_version in PRUNE_EMPTY_USERS_ADK_VERSIONS
+        )
+        if type(session_service) is InMemorySessionService and not self._prune_empty_users:
+            logger.warning(
+                "google-adk %s is not in PRUNE_EMPTY_USERS_ADK_VERSIONS: sessions are "
+                "deleted on eviction, but InMemorySessionService's empty per-user dicts "
+                "are not pruned and will accumulate",
+                adk_version,
+            )
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> list:
+        return list(self._entries.keys())
+
+    def items(self) -> list:
+        return list(self._entries.items())
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    async def get(self, session_id: str):
+        """Returns the cached entry for a session, or None if absent or expired."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = self._clock()
+        if now - entry["last_access"] > self.ttl_seconds:
+            self.misses += 1
+            self.expirations += 1
+            await self._remove(session_id, delete=self.delete_on_evict)
+            return None
+
+        entry["last_access"] = now
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry
+
+    async def put(self, session_id: str, entry: dict, size_bytes: int = 0):
+        """Adds or replaces a session entry, evicting others to stay in budget."""
+        if session_id in self._entries:
+            self._total_bytes -= self._entries.pop(session_id)["size_bytes"]
+
+        entry["size_bytes"] = size_bytes
+        entry["last_access"] = self._clock()
+        self._entries[session_id] = entry
+        self._total_bytes += size_bytes
+
+        await self._expire_idle()
+        await self._enforce_budget(keep=session_id)
+
+    async def resize(self, session_id: str, size_bytes: int):
+        """Updates the accounted size of a session after it has grown."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        self._total_bytes += size_bytes - entry["size_bytes"]
+        entry["size_bytes"] = size_bytes
+        await self._enforce_budget(keep=session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        """Removes a session from the cache and from the session service."""
+        if session_id not in self._entries:
+            return False
+        await self._remove(session_id)
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    async def _expire_idle(self):
+        # Entries are kept in access order, so idle ones sit at the front
+        now = self._clock()
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if now - entry["last_access"] <= self.ttl_seconds:
+                break
+            self.expirations += 1
+            await self._remove(session_id, delete=self.delete_on_evict)
+
+    async def _enforce_budget(self, keep: str = None):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._total_bytes > self.max_bytes
+        ):
+            session_id = next((s for s in self._entries if s != keep), None)
+            if session_id is None:
+                break
+            self.evictions += 1
+            await self._remove(session_id, delete=self.delete_on_evict)
+
+    async def _remove(self, session_id: str, delete: bool = True):
+        entry = self._entries.pop(session_id)
+        self._total_bytes -= entry["size_bytes"]
+        if not delete:
+            evict_local = getattr(self.session_service, "evict_local", None)
+            if evict_local is not None:
+                evict_local(
+                    app_name=self.app_name,
+                    user_id=entry["user_id"],
+                    session_id=session_id,
+                )
+            return
+        try:
+            await self.session_service.delete_session(
+                app_name=self.app_name,
+                user_id=entry["user_id"],
+                session_id=session_id,
+            )
+        except Exception as e:
+            logger.error("Error deleting session %s: %s", session_id, e)
+            return
+
+        # Each chat session has its own user id, so the empty per-user dicts
+        # InMemorySessionService leaves behind would accumulate
+        if self._prune_empty_users:
+            user_sessions = self.session_service.sessions.get(self.app_name, {})
+            if not user_sessions.get(entry["user_id"], True):
+                del user_sessions[entry["user_id"]]
@@ -1,10 +1,13 @@
 from datetime import datetime
 from typing import List, Dict, Optional
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("tools")
 
 
 def mark_attendance(student_id: str, class_id: str, status: str = "present") -> dict:
     """Mark attendance for a student in a specific class."""
-    print(f"--- Tool: mark_attendance called for student {student_id} ---")
+    logger.debug("--- Tool: mark_attendance called for student %s ---", student_id)
     
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -37,7 +40,7 @@ def mark_attendance(student_id: str, class_id: str, status: str = "present") ->
 
 def get_attendance_report(class_id: str, date: Optional[str] = None) -> dict:
     """Get attendance report for a specific class and date."""
-    print(f"--- Tool: get_attendance_report called for class {class_id} ---")
+    logger.debug("--- Tool: get_attendance_report called for class %s ---", class_id)
     
     try:
         report_date = date if date else datetime.now().strftime("%Y-%m-%d")
@@ -71,7 +74,7 @@ def get_attendance_report(class_id: str, date: Optional[str] = None) -> dict:
 
 def check_student_attendance(student_id: str, date_range: Optional[str] = None) -> dict:
     """Check attendance history for a specific student."""
-    print(f"--- Tool: check_student_attendance called for student {student_id} ---")
+    logger.debug("--- Tool: check_student_attendance called for student %s ---", student_id)
     
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -111,7 +114,7 @@ def check_student_attendance(student_id: str, date_range: Optional[str] = None)
 
 def bulk_attendance_upload(attendance_data: List[Dict]) -> dict:
     """Upload attendance data for multiple students at once."""
-    print(f"--- Tool: bulk_attendance_upload called for {len(attendance_data)} records ---")
+    logger.debug("--- Tool: bulk_attendance_upload called for %s records ---", len(attendance_data))
     
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -3,6 +3,9 @@ from datetime import datetime
 from typing import List, Optional, Dict
 import google.generativeai as genai
 import json
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("tools")
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -28,7 +31,7 @@ def provide_reading_passage(grade_level: str, passage_type: Optional[str] = None
         provide_reading_passage("3", "story", "animals", "English")
         provide_reading_passage("5", "informational", "science", "Hindi")
     """
-    print(f"--- Tool: provide_reading_passage called for grade {grade_level} in {language or 'English'} ---")
+    logger.debug("--- Tool: provide_reading_passage called for grade %s in %s ---", grade_level, language or 'English')
     
     try:
         # Set defaults if parameters not provided
@@ -116,7 +119,7 @@ def assess_live_reading_fluency(transcribed_audio: str, grade_level: str, passag
         assess_live_reading_fluency("The cat sat on the mat...", "3", "Original passage text", "English")
         assess_live_reading_fluency("Student live reading...", "5", None, "Hindi")
     """
-    print(f"--- Tool: assess_live_reading_fluency called for grade {grade_level} in {language or 'English'} ---")
+    logger.debug("--- Tool: assess_live_reading_fluency called for grade %s in %s ---", grade_level, language or 'English')
     
     try:
         # Set default language if not provided
@@ -229,7 +232,7 @@ def assess_reading_fluency(audio_text: str, grade_level: str, passage_text: Opti
         assess_reading_fluency("The cat sat on the mat...", "3", None, "English")
         assess_reading_fluency("Student reading text...", "5", "Original passage text...", "Hindi")
     """
-    print(f"--- Tool: assess_reading_fluency called for grade {grade_level} in {language or 'English'} ---")
+    logger.debug("--- Tool: assess_reading_fluency called for grade %s in %s ---", grade_level, language or 'English')
     
     try:
         # Set default language if not provided
@@ -342,7 +345,7 @@ def analyze_pronunciation_accuracy(audio_text: str, target_words: List[str], gra
         analyze_pronunciation_accuracy("cat bat mat", ["cat", "bat", "mat"], "1", "English")
         analyze_pronunciation_accuracy("photograph elephant", ["photograph", "elephant"], "4", "Hindi")
     """
-    print(f"--- Tool: analyze_pronunciation_accuracy called for {len(target_words)} words in {language or 'English'} ---")
+    logger.debug("--- Tool: analyze_pronunciation_accuracy called for %s words in %s ---", len(target_words), language or 'English')
     
     try:
         # Set default language if not provided
@@ -433,7 +436,7 @@ def evaluate_reading_comprehension(audio_text: str, comprehension_questions: Lis
         evaluate_reading_comprehension("The story was about...", ["What was the main idea?"], "3", "English")
         evaluate_reading_comprehension("I think the character felt...", ["How did the character feel?"], "5", "Hindi")
     """
-    print(f"--- Tool: evaluate_reading_comprehension called for {len(comprehension_questions)} questions in {language or 'English'} ---")
+    logger.debug("--- Tool: evaluate_reading_comprehension called for %s questions in %s ---", len(comprehension_questions), language or 'English')
     
     try:
         # Set default language if not provided
@@ -529,7 +532,7 @@ def generate_reading_level_report(audio_text: str, grade_level: str, assessment_
         generate_reading_level_report("Student reading sample...", "4", "complete", "English")
         generate_reading_level_report("Fluency test reading...", "2", "fluency", "Hindi")
     """
-    print(f"--- Tool: generate_reading_level_report called for {assessment_type} assessment in {language or 'English'} ---")
+    logger.debug("--- Tool: generate_reading_level_report called for %s assessment in %s ---", assessment_type, language or 'English')
     
     try:
         # Set default language if not provided
@@ -630,7 +633,7 @@ def create_personalized_reading_plan(student_assessment: str, grade_level: str,
         create_personalized_reading_plan("Assessment results...", "3", ["fluency", "phonics"], "English")
         create_personalized_reading_plan("Reading evaluation...", "5", ["comprehension", "vocabulary"], "Hindi")
     """
-    print(f"--- Tool: create_personalized_reading_plan called for focus areas: {focus_areas} in {language or 'English'} ---")
+    logger.debug("--- Tool: create_personalized_reading_plan called for focus areas: %s in %s ---", focus_areas, language or 'English')
     
     try:
         # Set default language if not provided
@@ -735,7 +738,7 @@ def track_reading_progress(previous_assessments: List[str], current_assessment:
         track_reading_progress(["Assessment 1...", "Assessment 2..."], "Current assessment...", "4", "English")
         track_reading_progress(["Previous evaluation..."], "Latest assessment...", "3", "Hindi")
     """
-    print(f"--- Tool: track_reading_progress called with {len(previous_assessments)} historical assessments in {language or 'English'} ---")
+    logger.debug("--- Tool: track_reading_progress called with %s historical assessments in %s ---", len(previous_assessments), language or 'English')
     
     try:
         # Set default language if not provided
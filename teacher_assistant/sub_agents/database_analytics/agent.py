@@ -1,24 +1,70 @@
+import os
+import time
 from pathlib import Path
+from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.agents import LlmAgent
 
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("agents")
+
+load_dotenv()
+
+# "mcp" (default) runs server.py as a stdio MCP subprocess, as external MCP
+# clients do; "inprocess" registers its database tools as FunctionTools in
+# this process instead, which imports server.py and so connects to the
+# database when this module is imported.
+DB_TOOLS_MODES = ("mcp", "inprocess")
+DB_TOOLS_MODE = os.getenv("DB_TOOLS_MODE", "mcp").lower()
+if DB_TOOLS_MODE not in DB_TOOLS_MODES:
+    raise ValueError(
+        f"DB_TOOLS_MODE must be one of {', '.join(DB_TOOLS_MODES)}, not '{DB_TOOLS_MODE}'."
+    )
+
 # IMPORTANT: Dynamically compute the absolute path to the MCP server script
 PATH_TO_MCP_SERVER_SCRIPT = str((Path(__file__).parent.parent.parent / "server.py").resolve())
 
+if DB_TOOLS_MODE == "mcp":
+    logger.debug("MCP server script: %s", PATH_TO_MCP_SERVER_SCRIPT)
+    # One toolset, and so one server process, shared by every session of the
+    # process-wide runner
+    database_tools = [
+        MCPToolset(
+            connection_params=StdioServerParameters(
+                command="python3",
+                args=[PATH_TO_MCP_SERVER_SCRIPT],
+            )
+        )
+    ]
+elif DB_TOOLS_MODE == "inprocess":
+    from teacher_assistant.server import in_process_db_tools
 
-print("================================================")
-print(PATH_TO_MCP_SERVER_SCRIPT)
-print("================================================")
+    database_tools = in_process_db_tools()
 
 
-mcp_toolset = MCPToolset(
-    connection_params=StdioServerParameters(
-        command="python3",
-        args=[PATH_TO_MCP_SERVER_SCRIPT],
-    )
-)
-# mcp_tools = mcp_toolset.get_tools()
+async def start_database_tools():
+    """Spawns the shared MCP server ahead of the first session (mcp mode only).
+
+    Returns the time in milliseconds until the server listed its tools.
+    """
+    if DB_TOOLS_MODE != "mcp":
+        return None
+    start = time.perf_counter()
+    for toolset in database_tools:
+        tools = await toolset.get_tools()
+    startup_ms = (time.perf_counter() - start) * 1000
+    logger.info("MCP server started with %d tools in %.0f ms", len(tools), startup_ms)
+    return startup_ms
+
+
+async def close_database_tools():
+    """Stops the shared MCP server, if one was started."""
+    if DB_TOOLS_MODE == "mcp":
+        for toolset in database_tools:
+            await toolset.close()
+
 
 # Create the database analytics agent
 database_analytics = Agent(
@@ -39,32 +85,45 @@ database_analytics = Agent(
     ATTENDANCE MANAGEMENT:
     - get_attendance_records() - Retrieve attendance records with filtering options
     - mark_attendance() - Mark or update student attendance for specific dates
+    - mark_attendance_bulk() - Mark a whole class/section for one date in a single call (everyone gets default_status unless listed in statuses)
     - get_attendance_summary() - Get attendance statistics and percentages
     
     ACADEMIC RECORDS:
     - get_academic_records() - Retrieve academic records with filtering by student, subject, or teacher
     - add_academic_record() - Add new academic records (grades, scores, assessments)
+    - add_academic_records_bulk() - Add many academic records at once, e.g. marks for a whole exam (shared subject/date/teacher can be given once)
     
     BEHAVIOR TRACKING:
     - get_behavior_records() - Retrieve behavior records with comprehensive filtering
     - add_behavior_record() - Log new behavior observations with sentiment analysis
+    - add_behavior_records_bulk() - Log observations for many students at once; rejected rows are reported by index
     - get_behavior_summary() - Get behavior statistics and sentiment trends
     
+    ANALYTICS (one call each, computed in the database):
+    - get_grade_distribution() - Grade counts and average grade points per class, section or subject (group_by), e.g. to compare class performance in a subject
+    - get_attendance_grade_correlation() - How attendance relates to grades, with average grade points per attendance band
+    - get_at_risk_students() - Students with low attendance, low grades or negative behavior, with their risk factors
+    
     GENERAL DATABASE TOOLS:
     - list_db_tables() - List all available tables
     - get_table_schema() - Get structure of specific tables
     - query_db_table() - Custom queries for complex analysis
+    - explain_tool_queries() - Report read-tool queries that scan whole tables (missing indexes); for diagnosing slow tools
+    - check_summary_rollups() - Check (and with repair=true rebuild) the tables behind the summary tools, e.g. after rows were changed directly in the database
     - insert_data() - Direct data insertion when specialized functions don't suffice
     
     WORKFLOW GUIDELINES:
     
     FOR DATA ANALYSIS:
     1. Use specialized functions first (e.g., get_attendance_summary() for attendance rates)
+       - For comparisons across classes, sections or subjects, correlations and at-risk lists, use the ANALYTICS tools instead of fetching and combining records
     2. Only use general query functions for complex multi-table analysis
     3. Provide clear, actionable insights from the data
     
     FOR DATA ENTRY:
     1. Use specialized add/mark functions (e.g., add_student(), mark_attendance(), add_behavior_record())
+       - For attendance of a whole class, use one mark_attendance_bulk() call instead of one mark_attendance() per student
+       - For marks or observations of several students, use add_academic_records_bulk() / add_behavior_records_bulk() in one call
     2. These functions handle validation and proper data formatting automatically
     3. Confirm successful entries and provide relevant follow-up analysis
     
@@ -93,6 +152,7 @@ database_analytics = Agent(
     - NEVER ask for dates of birth, phone numbers, or other personal details to identify students - use class/section info instead
     - FETCH ONLY REQUIRED DATA: Use specific filters to retrieve only the data needed to answer the question (e.g., specific student_id, subject, date range)
     - Be precise with queries - don't fetch all records when you only need specific information
+    - Record tools (get_academic_records, get_attendance_records, get_behavior_records, query_db_table) return one page of results with 'total' and 'has_more'; pass 'next_cursor' as cursor (or 'next_offset' as offset for query_db_table) only when you need the following page, and prefer summary tools over paging through everything
     
     PRIORITY: Always use the most appropriate specialized function for the task rather than generic database queries.
     
@@ -112,5 +172,5 @@ database_analytics = Agent(
     3. Use get_behavior_records(student_id=john_id, start_date="2025-01-01", end_date="2025-01-31") to get ONLY John's behavior records for this month
     4. Analyze and provide insights about John's behavior trends
     """,
-    tools=[mcp_toolset]
+    tools=database_tools
 )
\ No newline at end of file
@@ -1,6 +1,9 @@
 import os
 from typing import Optional
 import google.generativeai as genai
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("tools")
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -19,7 +22,7 @@ def create_quiz_game(topic: str, grade_level: str, questions_count: int, languag
     Returns:
         str: Complete HTML game code
     """
-    print(f"--- Tool: create_quiz_game called for {topic} ---")
+    logger.debug("--- Tool: create_quiz_game called for %s ---", topic)
     
     try:
         if not language:
@@ -66,7 +69,7 @@ def create_math_game(operation: str, grade_level: str, difficulty: str, language
     Returns:
         str: Complete HTML math game code
     """
-    print(f"--- Tool: create_math_game called for {operation} ---")
+    logger.debug("--- Tool: create_math_game called for %s ---", operation)
     
     try:
         if not language:
@@ -114,7 +117,7 @@ def create_memory_game(topic: str, grade_level: str, pairs_count: int, language:
     Returns:
         str: Complete HTML memory game code
     """
-    print(f"--- Tool: create_memory_game called for {topic} ---")
+    logger.debug("--- Tool: create_memory_game called for %s ---", topic)
     
     try:
         if not language:
@@ -161,7 +164,7 @@ def create_drag_drop_game(topic: str, grade_level: str, items_count: int, langua
     Returns:
         str: Complete HTML drag-drop game code
     """
-    print(f"--- Tool: create_drag_drop_game called for {topic} ---")
+    logger.debug("--- Tool: create_drag_drop_game called for %s ---", topic)
     
     try:
         if not language:
@@ -208,7 +211,7 @@ def create_word_puzzle(topic: str, grade_level: str, puzzle_type: str, language:
     Returns:
         str: Complete HTML word puzzle game code
     """
-    print(f"--- Tool: create_word_puzzle called for {puzzle_type} ---")
+    logger.debug("--- Tool: create_word_puzzle called for %s ---", puzzle_type)
     
     try:
         if not language:
@@ -253,7 +256,7 @@ def generate_game_ui(game_type: str, config: str) -> str:
     Returns:
         str: Complete HTML game code
     """
-    print(f"--- Tool: generate_game_ui called for {game_type} ---")
+    logger.debug("--- Tool: generate_game_ui called for %s ---", game_type)
     
     try:
         model = genai.GenerativeModel('gemini-2.0-flash')
@@ -10,6 +10,9 @@ import requests
 from pathlib import Path
 from google.cloud import storage
 import uuid
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("tools")
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -35,7 +38,7 @@ def generate_hyper_local_content(topic: str, local_language: Optional[str] = Non
         generate_hyper_local_content("water cycle", "Hindi", "Rajasthani", "story")
         generate_hyper_local_content("photosynthesis", None, None, "explanation")
     """
-    print(f"--- Tool: generate_hyper_local_content called for {topic} ---")
+    logger.debug("--- Tool: generate_hyper_local_content called for %s ---", topic)
     
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -102,7 +105,7 @@ def provide_knowledge_base_answer(question: str, language: Optional[str] = None,
         provide_knowledge_base_answer("Why is the sky blue?", "Hindi", "3")
         provide_knowledge_base_answer("Explain photosynthesis", None, "8")
     """
-    print(f"--- Tool: provide_knowledge_base_answer called for question: {question} ---")
+    logger.debug("--- Tool: provide_knowledge_base_answer called for question: %s ---", question)
     
     try:
         # Set intelligent defaults if parameters are not provided
@@ -192,7 +195,7 @@ def create_multi_grade_content(topic: str, grade_levels: List[str], language: Op
         create_multi_grade_content("photosynthesis", ["3", "5", "7"], "English", "Science")
         create_multi_grade_content("water cycle", ["2", "4"], None, None)
     """
-    print(f"--- Tool: create_multi_grade_content called for grades: {grade_levels} ---")
+    logger.debug("--- Tool: create_multi_grade_content called for grades: %s ---", grade_levels)
     
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -304,7 +307,7 @@ def translate_and_localize(content: str, target_language: str, cultural_adaptati
         translate_and_localize("Spring season story", "Hindi", ["festivals", "food"])
         translate_and_localize("Math explanation", "Telugu", None)
     """
-    print(f"--- Tool: translate_and_localize called for {target_language} ---")
+    logger.debug("--- Tool: translate_and_localize called for %s ---", target_language)
     
     try:
         # Create Gemini model
@@ -358,7 +361,7 @@ def handle_minimal_request(user_request: str) -> str:
         handle_minimal_request("Tell me about animals")
         handle_minimal_request("Something for grade 3 math")
     """
-    print(f"--- Tool: handle_minimal_request called for: {user_request} ---")
+    logger.debug("--- Tool: handle_minimal_request called for: %s ---", user_request)
     
     try:
         # Create Gemini model
@@ -408,7 +411,7 @@ def create_educational_image(request: str) -> dict:
         create_educational_image("water cycle diagram")
         create_educational_image("photosynthesis flowchart")
     """
-    print(f"--- Tool: create_educational_image called for: {request} ---")
+    logger.debug("--- Tool: create_educational_image called for: %s ---", request)
     
     try:
         # Create Google GenAI client
@@ -450,7 +453,7 @@ def create_educational_image(request: str) -> dict:
                 public_url = upload_to_gcp_bucket(img_byte_arr.getvalue(), filename)
                 
                 if public_url:
-                    print(f"✅ Image uploaded successfully: {public_url}")
+                    logger.info("✅ Image uploaded successfully: %s", public_url)
                     return {
                         "image_url": public_url
                     }
@@ -465,7 +468,7 @@ def create_educational_image(request: str) -> dict:
         }
             
     except Exception as e:
-        print(f"❌ Error in create_educational_image: {str(e)}")
+        logger.error("❌ Error in create_educational_image: %s", e)
         return {
             "error": f"Error creating educational image: {str(e)}"
         }
@@ -508,9 +511,9 @@ def upload_to_gcp_bucket(image_data: bytes, filename: str) -> str:
         # Return the public URL
         public_url = f"https://storage.googleapis.com/{bucket_name}/{filename}"
         
-        print(f"✅ Successfully uploaded to GCP: {public_url}")
+        logger.info("✅ Successfully uploaded to GCP: %s", public_url)
         return public_url
         
     except Exception as e:
-        print(f"❌ Error uploading to GCP bucket: {str(e)}")
+        logger.error("❌ Error uploading to GCP bucket: %s", e)
         return None
@@ -2,6 +2,9 @@
 from typing import List, Optional
 import google.generativeai as genai
 import os
+from teacher_assistant.logging_config import get_logger
+
+logger = get_logger("tools")
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -20,7 +23,7 @@ def analyze_uploaded_textbook_page(additional_context: Optional[str] = None) ->
     Returns:
         str: Signal for the agent to process the image using its vision capabilities
     """
-    print("--- Tool: analyze_uploaded_textbook_page called ---")
+    logger.debug("--- Tool: analyze_uploaded_textbook_page called ---")
     
     # Return a signal that indicates the agent should use its vision capabilities
     # to analyze any images present in the conversation
@@ -81,7 +84,7 @@ def generate_differentiated_worksheets(content_analysis: str, grade_levels: List
         generate_differentiated_worksheets(analysis_result, ["2", "3", "4"])
         generate_differentiated_worksheets(analysis_result, ["5", "6"], "Science")
     """
-    print(f"--- Tool: generate_differentiated_worksheets called for grades: {grade_levels} ---")
+    logger.debug("--- Tool: generate_differentiated_worksheets called for grades: %s ---", grade_levels)
     
     try:
         # Create Gemini model
@@ -189,7 +192,7 @@ def create_lesson_plan(content_analysis: str, duration: Optional[str] = None, gr
         create_lesson_plan(analysis_result, "60 minutes", ["3", "4", "5"])
         create_lesson_plan(analysis_result)
     """
-    print(f"--- Tool: create_lesson_plan called ---")
+    logger.debug("--- Tool: create_lesson_plan called ---")
     
     try:
         # Set defaults for optional parameters
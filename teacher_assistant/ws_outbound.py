@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import deque
+
+KIND_CONTROL = "control"
+KIND_TEXT = "text"
+KIND_AUDIO = "audio"
+KIND_MEDIA = "media"
+
+
+class OutboundQueueFull(Exception):
+    """The client fell so far behind that undroppable messages exceed the queue's budget."""
+
+
+class OutboundQueue:
+    """Bounded per-connection queue of messages waiting to go to a client.
+
+    The agent side never blocks on a slow client: it enqueues and moves on,
+    while a separate sender task drains the queue onto the WebSocket. When the
+    client falls behind, the queue applies a drop policy instead of growing:
+
+    - audio: the oldest queued audio is dropped once more than
+      ``max_audio_bytes`` are waiting, and all queued audio is discarded when
+      the turn is interrupted;
+    - text partials: consecutive partials for the same role are merged into
+      one message;
+    - control messages (turn_complete/interrupted) and media are never dropped.
+
+    Every message counts toward ``max_bytes`` and ``max_items``. Over either
+    limit queued audio is dropped first; if that is not enough the put raises
+    OutboundQueueFull and the connection should be closed.
+    """
+
+    def __init__(
+        self,
+        max_audio_bytes: int = 96000,
+        max_bytes: int = 8 * 1024 * 1024,
+        max_items: int = 1000,
+    ):
+        self.max_audio_bytes = max_audio_bytes
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._items = deque()
+        self._ready = asyncio.Event()
+        self._audio_bytes = 0
+        self._bytes = 0
+
+        self.enqueued = 0
+        self.sent = 0
+        self.sent_bytes = 0
+        self.coalesced = 0
+        self.dropped_messages = 0
+        self.dropped_bytes = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put_control(self, message: dict):
+        """Queues a control message; an interruption discards stale audio."""
+        if message.get("interrupted"):
+            self._drop_audio(lambda item: True)
+        self._append([KIND_CONTROL, message, len(str(message))])
+
+    def put_text(self, message: dict):
+        """Queues a text partial, merging it into a queued one for the same role."""
+        if self._items:
+            last = self._items[-1]
+            if last[0] == KIND_TEXT and last[1]["role"] == message["role"]:
+                last[1]["data"] += message["data"]
+                last[2] += len(message["data"])
+                self._bytes += len(message["data"])
+                self.coalesced += 1
+                self._check_budget()
+                return
+        self._append([KIND_TEXT, dict(message), len(message["data"])])
+
+    def put_audio(self, data: bytes, mime_type: str):
+        """Queues an audio chunk, dropping the oldest queued audio if over budget."""
+        size = len(data)
+        if self._audio_bytes + size > self.max_audio_bytes:
+            self._drop_audio(
+                lambda item: self._audio_bytes + size > self.max_audio_bytes
+            )
+        self._audio_bytes += size
+        self._append([KIND_AUDIO, (data, mime_type), size])
+
+    def put_media(self, message: dict, size: int = 0):
+        """Queues a non-droppable media message such as an image."""
+        self._append([KIND_MEDIA, message, size])
+
+    async def get(self) -> tuple:
+        """Waits for the next message.
+
+        Returns:
+            tuple: (kind, message, queued_ms), where queued_ms is how long the
+            message waited in the queue.
+        """
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        kind, message, size, enqueued_at = self._items.popleft()
+        self._bytes -= size
+        if kind == KIND_AUDIO:
+            self._audio_bytes -= size
+        return kind, message, (time.monotonic() - enqueued_at) * 1000
+
+    def mark_sent(self, nbytes: int):
+        self.sent += 1
+        self.sent_bytes += nbytes
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "queued_bytes": self._bytes,
+            "queued_audio_bytes": self._audio_bytes,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            "coalesced": self.coalesced,
+            "dropped_messages": self.dropped_messages,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def _append(self, item: list):
+        item.append(time.monotonic())
+        self._items.append(item)
+        self._bytes += item[2]
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+        self._check_budget()
+
+    def _over_budget(self) -> bool:
+        return self._bytes > self.max_bytes or len(self._items) > self.max_items
+
+    def _check_budget(self):
+        if self._over_budget():
+            self._drop_audio(lambda item: self._over_budget())
+        if self._over_budget():
+            raise OutboundQueueFull(
+                f"{len(self._items)} messages, {self._bytes} bytes waiting for the client"
+            )
+
+    def _drop_audio(self, should_drop):
+        # Oldest audio first; everything else keeps its place in the queue
+        kept = deque()
+        for item in self._items:
+            if item[0] == KIND_AUDIO and should_drop(item):
+                self._audio_bytes -= item[2]
+                self._bytes -= item[2]
+                self.dropped_messages += 1
+                self.dropped_bytes += item[2]
+            else:
+                kept.append(item)
+        self._items = kept
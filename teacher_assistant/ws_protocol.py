@@ -0,0 +1,41 @@
+import struct
+
+# WebSocket sub-protocol for raw PCM audio in binary frames. Clients that do
+# not request it keep using base64 audio inside JSON text frames.
+BINARY_SUBPROTOCOL = "adk-pcm.v1"
+
+FRAME_VERSION = 1
+FRAME_AUDIO_PCM = 0x01
+
+# version (uint8), kind (uint8), sample rate in Hz (uint16), network order
+FRAME_HEADER = struct.Struct("!BBH")
+
+DEFAULT_OUTPUT_SAMPLE_RATE = 24000
+
+
+def encode_frame(payload: bytes, sample_rate: int, kind: int = FRAME_AUDIO_PCM) -> bytes:
+    """Prefixes a payload with the 4-byte binary frame header."""
+    return FRAME_HEADER.pack(FRAME_VERSION, kind, sample_rate) + payload
+
+
+def decode_frame(frame: bytes) -> tuple[int, int, bytes]:
+    """Splits a binary frame into (kind, sample_rate, payload).
+
+    Raises:
+        ValueError: If the frame is too short or has an unknown version.
+    """
+    if len(frame) < FRAME_HEADER.size:
+        raise ValueError(f"Binary frame too short: {len(frame)} bytes")
+    version, kind, sample_rate = FRAME_HEADER.unpack_from(frame)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported binary frame version: {version}")
+    return kind, sample_rate, frame[FRAME_HEADER.size:]
+
+
+def pcm_sample_rate(mime_type: str, default: int = DEFAULT_OUTPUT_SAMPLE_RATE) -> int:
+    """Reads the rate parameter from a mime type such as 'audio/pcm;rate=24000'."""
+    for param in mime_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key == "rate" and value.isdigit():
+            return int(value)
+    return default
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# teacher_assistant.server creates its engines at import; point it at a
+# throwaway SQLite file instead of the Cloud SQL default
+os.environ.setdefault(
+    "DATABASE_URL",
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="teacher_assistant_tests_"), "school.db"),
+)
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from teacher_assistant.analytics_snapshot import AnalyticsSnapshot
+
+STUDENTS = 40
+DAYS = 60
+FIRST_DAY = date(2024, 1, 1)
+STAMP = datetime(2024, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = str(tmp_path / "school.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'main.db'}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("ATTACH DATABASE ? AS app", (path,))
+        cursor.close()
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE app.students (id INTEGER PRIMARY KEY, student_id INTEGER,"
+                " student_name TEXT, class_value TEXT, section TEXT, updated_at TIMESTAMP)"
+            ))
+            await conn.execute(text(
+                "CREATE TABLE app.attendance (id INTEGER PRIMARY KEY, student_id INTEGER,"
+                " attendance_date DATE, status TEXT, created_at TIMESTAMP)"
+            ))
+            await conn.execute(
+                text("INSERT INTO app.students VALUES (:id, :id, :name, '5', 'A', :stamp)"),
+                [{"id": i, "name": f"Student {i:02d}", "stamp": STAMP} for i in range(1, STUDENTS + 1)],
+            )
+            await conn.execute(
+                text("INSERT INTO app.attendance (student_id, attendance_date, status, created_at)"
+                     " VALUES (:student_id, :day, 'present', :stamp)"),
+                [
+                    {"student_id": student_id, "day": FIRST_DAY + timedelta(days=day), "stamp": STAMP}
+                    for day in range(DAYS)
+                    for student_id in range(1, STUDENTS + 1)
+                ],
+            )
+
+    asyncio.run(create())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def test_reads_during_a_refresh_see_whole_tables(engine):
+    snapshot = AnalyticsSnapshot(enabled=True, batch_size=8)
+    tables = ("attendance", "students")
+
+    def read(conn):
+        assert snapshot.refresh(conn, tables)
+        return int(snapshot.attendance_by_student()["total_days"].sum())
+
+    async def run_sync(func):
+        async with engine.connect() as conn:
+            return await conn.run_sync(func)
+
+    async def scenario():
+        assert await run_sync(read) == STUDENTS * DAYS
+
+        # As mark_attendance_bulk does: upsert a class's attendance for a day
+        # without a new created_at, then mark the day's rows stale
+        day = FIRST_DAY + timedelta(days=DAYS // 2)
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("UPDATE app.attendance SET status = 'absent' WHERE attendance_date = :day"),
+                {"day": day},
+            )
+        snapshot.mark_stale("attendance", "attendance_date", day)
+        return await asyncio.gather(*(run_sync(read) for _ in range(8)))
+
+    totals = asyncio.run(scenario())
+    assert totals == [STUDENTS * DAYS] * 8
+    absent = snapshot.attendance_by_student()["absent_days"]
+    assert absent.sum() == STUDENTS
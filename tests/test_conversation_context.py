@@ -0,0 +1,96 @@
+import json
+
+from teacher_assistant.conversation_context import (
+    LEGACY_CONTEXT_KEY,
+    SUMMARY_KEY,
+    TURNS_KEY,
+    append_turn,
+    context_size_bytes,
+    read_context,
+    turn_state_delta,
+)
+
+
+def run_turns(count, message="message", **budget):
+    context = []
+    for i in range(count):
+        context = append_turn(context, f"{message} {i}", f"reply {i}", **budget)
+    return context
+
+
+def apply_delta(state, delta):
+    state = dict(state)
+    state.update(delta)
+    return state
+
+
+def test_append_turn_keeps_turns_within_budget():
+    context = run_turns(3, max_turns=5)
+    assert context == [
+        {"user_message": f"message {i}", "agent_response": f"reply {i}"} for i in range(3)
+    ]
+
+
+def test_append_turn_folds_oldest_turns_down_to_half_the_turn_budget():
+    context = run_turns(7, max_turns=6)
+    summary, turns = context[0], context[1:]
+    assert [turn["user_message"] for turn in turns] == ["message 4", "message 5", "message 6"]
+    assert summary["compacted_turns"] == 4
+    assert summary["summary"].splitlines()[0] == "User: message 0 | Assistant: reply 0"
+
+
+def test_append_turn_does_not_modify_its_input():
+    context = run_turns(6, max_turns=6)
+    before = json.dumps(context)
+    append_turn(context, "new", "turn", max_turns=6)
+    assert json.dumps(context) == before
+
+
+def test_append_turn_stays_within_byte_budget():
+    context = run_turns(200, message="x" * 900, max_bytes=4096)
+    assert context_size_bytes(context) <= 4096
+    assert context[-1]["user_message"].endswith(" 199")
+
+
+def test_append_turn_keeps_latest_turn_even_if_over_budget():
+    context = append_turn([], "y" * 5000, "z" * 5000, max_bytes=1024)
+    assert context[-1] == {"user_message": "y" * 5000, "agent_response": "z" * 5000}
+
+
+def test_turn_state_delta_round_trips_through_read_context():
+    state, context = {}, []
+    for i in range(50):
+        delta = turn_state_delta(state, f"message {i}", f"reply {i}", max_turns=6)
+        state = apply_delta(state, delta)
+        context = append_turn(context, f"message {i}", f"reply {i}", max_turns=6)
+        assert read_context(state) == context
+
+
+def test_turn_state_delta_stays_small():
+    state = {}
+    sizes, summary_writes = [], 0
+    for i in range(100):
+        delta = turn_state_delta(state, "x" * 500, "y" * 500, max_bytes=8 * 1024)
+        state = apply_delta(state, delta)
+        sizes.append(context_size_bytes(delta))
+        summary_writes += SUMMARY_KEY in delta
+    # Each delta holds one turn and the index; only folding turns add the summary
+    assert max(sizes) < 8 * 1024
+    assert sorted(sizes)[len(sizes) // 2] < 2 * 1024
+    assert 0 < summary_writes < 50
+
+
+def test_turn_state_delta_converts_legacy_context_once():
+    legacy = run_turns(3)
+    state = {LEGACY_CONTEXT_KEY: legacy}
+    assert read_context(state) == legacy
+
+    delta = turn_state_delta(state, "message 3", "reply 3")
+    assert delta[LEGACY_CONTEXT_KEY] is None
+    assert delta[TURNS_KEY] == {"first": 0, "next": 4, "slots": 20}
+    state = apply_delta(state, delta)
+    assert read_context(state) == append_turn(legacy, "message 3", "reply 3")
+
+    delta = turn_state_delta(state, "message 4", "reply 4")
+    assert LEGACY_CONTEXT_KEY not in delta
+    assert set(delta) == {TURNS_KEY, "conversation_turn_4"}
@@ -0,0 +1,18 @@
+import importlib
+
+import pytest
+
+MODULE = "teacher_assistant.sub_agents.database_analytics.agent"
+
+
+@pytest.mark.parametrize("mode", ["mpc", "in-process", ""])
+def test_unknown_db_tools_mode_is_rejected(monkeypatch, mode):
+    monkeypatch.setenv("DB_TOOLS_MODE", mode)
+    with pytest.raises(ValueError, match="DB_TOOLS_MODE must be one of mcp, inprocess"):
+        importlib.reload(importlib.import_module(MODULE))
+
+
+def test_mcp_mode_is_the_default(monkeypatch):
+    monkeypatch.delenv("DB_TOOLS_MODE", raising=False)
+    module = importlib.reload(importlib.import_module(MODULE))
+    assert module.DB_TOOLS_MODE == "mcp"
@@ -0,0 +1,102 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from teacher_assistant import server
+from teacher_assistant.server import (
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    keyset_condition,
+    order_by_clause,
+    page_info,
+    page_limit,
+)
+
+ORDER = [("day", "DESC", "day"), ("student_id", "ASC", "student_id")]
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE attendance (student_id INTEGER, day TEXT)"))
+        # Several students share each day, so the day alone does not order the rows
+        conn.execute(
+            text("INSERT INTO attendance VALUES (:student_id, :day)"),
+            [
+                {"student_id": student_id, "day": f"2024-01-{day:02d}"}
+                for day in range(1, 8)
+                for student_id in (3, 1, 2)
+            ],
+        )
+        yield conn
+    engine.dispose()
+
+
+def test_cursor_round_trip():
+    values = ["2024-01-05", 42, None, "O'Brien"]
+    assert decode_cursor(encode_cursor(values), 4) == values
+
+
+def test_cursor_serializes_dates_and_decimals():
+    cursor = encode_cursor([date(2024, 1, 5), Decimal("87.5")])
+    assert decode_cursor(cursor, 2) == ["2024-01-05", 87.5]
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not base64!", encode_cursor([1]), encode_cursor({"day": 1}), "e30="]
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid pagination cursor."):
+        decode_cursor(cursor, 2)
+
+
+def test_page_limit(monkeypatch):
+    monkeypatch.setattr(server, "DB_DEFAULT_PAGE_SIZE", 100)
+    monkeypatch.setattr(server, "DB_MAX_PAGE_SIZE", 1000)
+    assert page_limit(None) == 100
+    assert page_limit(25) == 25
+    assert page_limit(0) == 1
+    assert page_limit(-5) == 1
+    assert page_limit(5000) == 1000
+
+
+def test_keyset_pages_cover_every_row_once(conn):
+    query = "SELECT student_id, day FROM attendance"
+    expected = [
+        dict(row._mapping)
+        for row in conn.execute(text(query + order_by_clause(ORDER)))
+    ]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {}
+        page_query = query
+        if cursor is not None:
+            page_query += " WHERE " + keyset_condition(ORDER, cursor, params)
+        records, has_more = fetch_page(
+            conn, page_query + order_by_clause(ORDER), params, limit=4
+        )
+        info = page_info(records, len(expected), 4, None, has_more, ORDER)
+        seen.extend(records)
+        pages += 1
+        if not has_more:
+            assert info["next_cursor"] is None
+            break
+        cursor = info["next_cursor"]
+
+    assert seen == expected
+    assert pages == 6
+
+
+def test_offset_page_info(conn):
+    records, has_more = fetch_page(
+        conn, "SELECT student_id, day FROM attendance" + order_by_clause(ORDER),
+        {}, limit=5, offset=5,
+    )
+    info = page_info(records, 21, 5, 5, has_more, ORDER)
+    assert (info["next_offset"], info["has_more"]) == (10, True)
+    assert decode_cursor(info["next_cursor"], 2) == [records[-1]["day"], records[-1]["student_id"]]
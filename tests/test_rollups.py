@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import pytest
+
+from teacher_assistant.server import rollup_date_ranges
+
+
+def covered_days(months, edges, lower, upper):
+    """Expands the ranges to days, bounding open ends by [lower, upper)."""
+    days = []
+    ranges = list(edges)
+    if months is not None:
+        ranges.append((months[0] or lower, months[1] or upper))
+    for first, end in ranges:
+        day = first
+        while day < end:
+            days.append(day)
+            day += timedelta(days=1)
+    return sorted(days)
+
+
+def test_open_range_is_all_months():
+    assert rollup_date_ranges(None, None) == ((None, None), [])
+
+
+def test_whole_months():
+    assert rollup_date_ranges(date(2024, 1, 1), date(2024, 3, 31)) == (
+        (date(2024, 1, 1), date(2024, 4, 1)), []
+    )
+
+
+def test_partial_months_at_both_edges():
+    assert rollup_date_ranges(date(2024, 1, 15), date(2024, 4, 10)) == (
+        (date(2024, 2, 1), date(2024, 4, 1)),
+        [(date(2024, 1, 15), date(2024, 2, 1)), (date(2024, 4, 1), date(2024, 4, 11))],
+    )
+
+
+def test_range_within_one_month_reads_days_only():
+    assert rollup_date_ranges(date(2024, 2, 3), date(2024, 2, 20)) == (
+        None, [(date(2024, 2, 3), date(2024, 2, 21))]
+    )
+
+
+def test_range_across_a_month_boundary_without_a_whole_month():
+    assert rollup_date_ranges(date(2024, 1, 20), date(2024, 2, 10)) == (
+        None, [(date(2024, 1, 20), date(2024, 2, 11))]
+    )
+
+
+def test_year_end():
+    assert rollup_date_ranges(date(2023, 12, 2), date(2024, 1, 31)) == (
+        (date(2024, 1, 1), date(2024, 2, 1)), [(date(2023, 12, 2), date(2024, 1, 1))]
+    )
+
+
+def test_open_ends():
+    assert rollup_date_ranges(None, date(2024, 3, 5)) == (
+        (None, date(2024, 3, 1)), [(date(2024, 3, 1), date(2024, 3, 6))]
+    )
+    assert rollup_date_ranges(date(2024, 3, 5), None) == (
+        (date(2024, 4, 1), None), [(date(2024, 3, 5), date(2024, 4, 1))]
+    )
+
+
+@pytest.mark.parametrize("start_offset", range(0, 70, 3))
+@pytest.mark.parametrize("length", [0, 1, 27, 28, 31, 45, 62, 400])
+def test_ranges_cover_each_day_once(start_offset, length):
+    start = date(2023, 12, 1) + timedelta(days=start_offset)
+    end = start + timedelta(days=length)
+    months, edges = rollup_date_ranges(start, end)
+    expected = [start + timedelta(days=i) for i in range(length + 1)]
+    assert covered_days(months, edges, start, end + timedelta(days=1)) == expected
+    if months is not None:
+        assert months[0].day == 1 and months[1].day == 1
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions import DatabaseSessionService
+
+from teacher_assistant.session_backend import CachedSessionService, StaleSessionError
+
+APP_NAME = "test_app"
+USER_ID = "user"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingBackend(DatabaseSessionService):
+    """Counts reads and fails the writes of the events listed in fail_events."""
+
+    def __init__(self, db_url):
+        super().__init__(db_url)
+        self.reads = 0
+        self.fail_events = set()
+
+    async def get_session(self, **kwargs):
+        self.reads += 1
+        return await super().get_session(**kwargs)
+
+    async def append_event(self, session, event):
+        if event.id in self.fail_events:
+            self.fail_events.discard(event.id)
+            raise RuntimeError("database unavailable")
+        return await super().append_event(session=session, event=event)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sessions.db'}"
+
+
+def service(db_url, **options):
+    options.setdefault("flush_interval", 3600)
+    return CachedSessionService(CountingBackend(db_url), **options)
+
+
+def state_event(**delta):
+    return Event(author="user", actions=EventActions(state_delta=delta))
+
+
+async def load(service, session_id):
+    return await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+
+
+def test_queued_events_are_written_on_flush(db_url):
+    async def scenario():
+        writer, reader = service(db_url), service(db_url)
+        session = await writer.create_session(app_name=APP_NAME, user_id=USER_ID, state={"n": 0})
+        await writer.append_event(session, state_event(n=1))
+        await writer.append_event(session, state_event(n=2))
+        before = await load(reader, session.id)
+        await writer.flush()
+        reader.cache_ttl_seconds = 0
+        after = await load(reader, session.id)
+        return writer, before, after
+
+    writer, before, after = asyncio.run(scenario())
+    assert before.state["n"] == 0
+    assert after.state["n"] == 2
+    assert len(after.events) == 2
+    assert writer.stats()["flushed_events"] == 2
+
+
+def test_batch_size_triggers_a_flush(db_url):
+    async def scenario():
+        cached = service(db_url, batch_size=2)
+        session = await cached.create_session(app_name=APP_NAME, user_id=USER_ID)
+        await cached.append_event(session, state_event(n=1))
+        pending = cached.stats()["pending_events"]
+        await cached.append_event(session, state_event(n=2))
+        return pending, cached.stats()
+
+    pending, stats = asyncio.run(scenario())
+    assert pending == 1
+    assert (stats["pending_events"], stats["flushes"]) == (0, 1)
+
+
+def test_cache_hits_skip_the_database_until_the_ttl(db_url):
+    async def scenario():
+        clock = FakeClock()
+        cached = service(db_url, cache_ttl_seconds=5, clock=clock)
+        session = await cached.create_session(app_name=APP_NAME, user_id=USER_ID)
+        clock.now = 5
+        await load(cached, session.id)
+        reads_within_ttl = cached.backend.reads
+        clock.now = 5.5
+        await load(cached, session.id)
+        return reads_within_ttl, cached.backend.reads, cached.stats()
+
+    reads_within_ttl, reads, stats = asyncio.run(scenario())
+    assert reads_within_ttl == 0
+    assert reads == 1
+    assert (stats["cache_hits"], stats["cache_misses"]) == (1, 1)
+
+
+def test_sessions_with_queued_events_are_served_from_the_cache(db_url):
+    async def scenario():
+        clock = FakeClock()
+        cached = service(db_url, cache_ttl_seconds=5, clock=clock)
+        session = await cached.create_session(app_name=APP_NAME, user_id=USER_ID)
+        await cached.append_event(session, state_event(n=1))
+        clock.now = 60
+        loaded = await load(cached, session.id)
+        return loaded, cached.backend.reads
+
+    loaded, reads = asyncio.run(scenario())
+    assert loaded.state["n"] == 1
+    assert reads == 0
+
+
+def test_failed_write_requeues_only_unwritten_events(db_url):
+    async def scenario():
+        cached = service(db_url)
+        session = await cached.create_session(app_name=APP_NAME, user_id=USER_ID)
+        events = [state_event(n=i) for i in range(1, 4)]
+        cached.backend.fail_events.add(events[1].id)
+        for event in events:
+            await cached.append_event(session, event)
+        with pytest.raises(RuntimeError):
+            await cached.flush()
+        pending = cached.stats()["pending_events"]
+        await cached.flush()
+        stored = await cached.backend.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+        )
+        return pending, stored, [event.id for event in events]
+
+    pending, stored, event_ids = asyncio.run(scenario())
+    assert pending == 2
+    assert [event.id for event in stored.events] == event_ids
+    assert stored.state["n"] == 3
+
+
+def test_events_on_a_stale_copy_are_rejected(db_url):
+    async def scenario():
+        first, second = service(db_url), service(db_url)
+        session = await first.create_session(app_name=APP_NAME, user_id=USER_ID, state={"n": 0})
+        stale_copy = await load(first, session.id)
+        # SQLite timestamps have one-second resolution
+        time.sleep(1.1)
+        fresh_copy = await load(second, session.id)
+        await second.append_event(fresh_copy, state_event(n=1))
+        await second.flush()
+
+        await first.append_event(stale_copy, state_event(n=99))
+        with pytest.raises(StaleSessionError):
+            await first.flush()
+        reloaded = await load(first, session.id)
+        return first, reloaded
+
+    first, reloaded = asyncio.run(scenario())
+    assert reloaded.state["n"] == 1
+    assert first.stats()["pending_events"] == 0
+
+
+def test_events_of_a_deleted_session_are_dropped(db_url):
+    async def scenario():
+        first, second = service(db_url), service(db_url)
+        session = await first.create_session(app_name=APP_NAME, user_id=USER_ID)
+        await first.append_event(session, state_event(n=1))
+        await second.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        with pytest.raises(StaleSessionError):
+            await first.flush()
+        return first
+
+    first = asyncio.run(scenario())
+    assert first.stats()["pending_events"] == 0
+    assert first.stats()["cached_sessions"] == 0
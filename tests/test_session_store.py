@@ -0,0 +1,170 @@
+import asyncio
+import logging
+
+from google.adk.sessions import InMemorySessionService
+
+from teacher_assistant import session_store
+from teacher_assistant.session_store import HttpSessionCache
+
+APP_NAME = "test_app"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingService:
+    def __init__(self):
+        self.deleted = []
+        self.evicted = []
+
+    async def delete_session(self, app_name, user_id, session_id):
+        self.deleted.append(session_id)
+
+    def evict_local(self, app_name, user_id, session_id):
+        self.evicted.append(session_id)
+
+
+def make_cache(service=None, **kwargs):
+    return HttpSessionCache(service or RecordingService(), APP_NAME, **kwargs)
+
+
+def put(cache, session_id, size_bytes=0):
+    return cache.put(session_id, {"user_id": f"user_{session_id}"}, size_bytes)
+
+
+def test_evicts_least_recently_used_over_max_entries():
+    async def scenario():
+        service = RecordingService()
+        cache = make_cache(service, max_entries=2)
+        await put(cache, "a")
+        await put(cache, "b")
+        await cache.get("a")
+        await put(cache, "c")
+        return cache, service
+
+    cache, service = asyncio.run(scenario())
+    assert cache.keys() == ["a", "c"]
+    assert service.deleted == ["b"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_to_stay_within_max_bytes():
+    async def scenario():
+        cache = make_cache(max_bytes=100)
+        await put(cache, "a", 40)
+        await put(cache, "b", 40)
+        await put(cache, "c", 40)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.keys() == ["b", "c"]
+    assert cache.total_bytes == 80
+
+
+def test_resize_evicts_others_but_keeps_the_resized_session():
+    async def scenario():
+        cache = make_cache(max_bytes=100)
+        await put(cache, "a", 10)
+        await put(cache, "b", 10)
+        await cache.resize("b", 500)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.keys() == ["b"]
+    assert cache.total_bytes == 500
+
+
+def test_idle_sessions_expire():
+    async def scenario():
+        clock = FakeClock()
+        service = RecordingService()
+        cache = make_cache(service, ttl_seconds=10, clock=clock)
+        await put(cache, "a")
+        clock.now = 5
+        await put(cache, "b")
+        clock.now = 11
+        expired = await cache.get("a")
+        # Putting a new session sweeps the idle ones at the front
+        clock.now = 16
+        await put(cache, "c")
+        return cache, service, expired
+
+    cache, service, expired = asyncio.run(scenario())
+    assert expired is None
+    assert cache.keys() == ["c"]
+    assert service.deleted == ["a", "b"]
+    stats = cache.stats()
+    assert stats["expirations"] == 2
+    assert stats["misses"] == 1
+
+
+def test_shared_store_evicts_locally_only():
+    async def scenario():
+        service = RecordingService()
+        cache = make_cache(service, max_entries=1, delete_on_evict=False)
+        await put(cache, "a")
+        await put(cache, "b")
+        return service
+
+    service = asyncio.run(scenario())
+    assert service.deleted == []
+    assert service.evicted == ["a"]
+
+
+def test_delete_and_stats():
+    async def scenario():
+        service = RecordingService()
+        cache = make_cache(service)
+        await put(cache, "a", 7)
+        hit = await cache.get("a")
+        miss = await cache.get("missing")
+        deleted = await cache.delete("a")
+        deleted_again = await cache.delete("a")
+        return cache, service, hit, miss, deleted, deleted_again
+
+    cache, service, hit, miss, deleted, deleted_again = asyncio.run(scenario())
+    assert hit["size_bytes"] == 7
+    assert miss is None
+    assert (deleted, deleted_again) == (True, False)
+    assert service.deleted == ["a"]
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"]) == (0, 0)
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_eviction_deletes_in_memory_sessions():
+    async def scenario():
+        service = InMemorySessionService()
+        cache = make_cache(service, max_entries=1)
+        for session_id in ("a", "b"):
+            user_id = f"user_{session_id}"
+            await service.create_session(
+                app_name=APP_NAME, user_id=user_id, session_id=session_id
+            )
+            await put(cache, session_id)
+        remaining = await service.get_session(
+            app_name=APP_NAME, user_id="user_a", session_id="a"
+        )
+        return service, remaining
+
+    service, remaining = asyncio.run(scenario())
+    assert remaining is None
+    assert "user_a" not in service.sessions.get(APP_NAME, {})
+
+
+def test_unknown_adk_version_warns_that_users_are_not_pruned(monkeypatch, caplog):
+    monkeypatch.setattr(session_store, "adk_version", "99.0.0")
+    with caplog.at_level(logging.WARNING):
+        make_cache(InMemorySessionService())
+    assert "99.0.0 is not in PRUNE_EMPTY_USERS_ADK_VERSIONS" in caplog.text
+
+
+def test_other_session_services_do_not_warn(caplog):
+    with caplog.at_level(logging.WARNING):
+        make_cache()
+    assert caplog.text == ""
@@ -0,0 +1,197 @@
+import asyncio
+import types
+
+import pytest
+
+from teacher_assistant import server
+from teacher_assistant.server import ToolResultCache
+
+
+def make_tool(name="read_tool"):
+    calls = []
+
+    async def tool(student_id: int, limit: int = 10):
+        calls.append((student_id, limit))
+        return {"success": True, "student_id": student_id, "call": len(calls)}
+
+    tool.__name__ = name
+    return tool, calls
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(server, "time", types.SimpleNamespace(monotonic=lambda: fake.now))
+    return fake
+
+
+def test_identical_calls_are_served_from_the_cache():
+    cache = ToolResultCache()
+    tool, calls = make_tool()
+    cached = cache.cached(tool, ("students",))
+
+    async def scenario():
+        return [await cached(1), await cached(1, limit=10), await cached(student_id=1)]
+
+    results = asyncio.run(scenario())
+    assert calls == [(1, 10)]
+    assert results[0] == results[1] == results[2]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["tools"] == {"read_tool": {"hits": 2, "misses": 1}}
+
+
+def test_callers_modifying_results_do_not_change_the_cache():
+    cache = ToolResultCache()
+
+    async def tool(student_id: int):
+        return {"success": True, "records": [{"student_id": student_id}]}
+
+    cached = cache.cached(tool, ("students",))
+
+    async def scenario():
+        first = await cached(1)
+        first["records"].append({"student_id": 2})
+        second = await cached(1)
+        second["records"][0]["student_id"] = 3
+        return await cached(1)
+
+    assert asyncio.run(scenario()) == {"success": True, "records": [{"student_id": 1}]}
+    assert cache.stats()["hits"] == 2
+
+
+def test_failed_results_are_not_cached():
+    cache = ToolResultCache()
+    calls = []
+
+    async def failing(student_id: int):
+        calls.append(student_id)
+        return {"success": False, "error": "boom"}
+
+    cached = cache.cached(failing, ("students",))
+
+    async def scenario():
+        await cached(1)
+        await cached(1)
+
+    asyncio.run(scenario())
+    assert calls == [1, 1]
+    assert cache.stats()["entries"] == 0
+
+
+def test_write_invalidates_results_reading_the_table():
+    cache = ToolResultCache()
+    read_students, student_calls = make_tool("read_students")
+    read_grades, grade_calls = make_tool("read_grades")
+    cached_students = cache.cached(read_students, ("students",))
+    cached_grades = cache.cached(read_grades, ("grades", "students"))
+
+    async def write(student_id: int):
+        return {"success": True}
+
+    update = cache.invalidating(write, ("grades",))
+
+    async def scenario():
+        await cached_students(1)
+        await cached_grades(1)
+        await update(1)
+        await cached_students(1)
+        await cached_grades(1)
+
+    asyncio.run(scenario())
+    assert len(student_calls) == 1
+    assert len(grade_calls) == 2
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_generic_write_invalidates_the_named_table():
+    cache = ToolResultCache()
+    tool, calls = make_tool()
+    cached = cache.cached(tool, ("attendance",))
+
+    async def insert(table_name: str, data: dict):
+        return {"success": True}
+
+    insert_data = cache.invalidating(insert)
+
+    async def scenario():
+        await cached(1)
+        await insert_data("students", {})
+        await cached(1)
+        await insert_data(table_name="attendance", data={})
+        await cached(1)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_write_during_a_read_keeps_the_stale_result_out():
+    cache = ToolResultCache()
+    tool_calls = []
+
+    async def slow_read(student_id: int):
+        tool_calls.append(student_id)
+        # A write to the table lands while the read is in flight
+        cache.invalidate(("students",))
+        return {"success": True}
+
+    cached = cache.cached(slow_read, ("students",))
+
+    async def scenario():
+        await cached(1)
+        await cached(1)
+
+    asyncio.run(scenario())
+    assert tool_calls == [1, 1]
+
+
+def test_put_ignores_results_from_an_old_generation():
+    cache = ToolResultCache()
+    generations = cache._snapshot(("students",))
+    cache.invalidate(("students",))
+    cache.put("key", ("students",), {"success": True}, generations)
+    assert cache.get("key") is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ToolResultCache(ttl_seconds=10)
+    cache.put("key", ("students",), {"success": True}, cache._snapshot(("students",)))
+    clock.now = 10
+    assert cache.get("key") == {"success": True}
+    clock.now = 10.5
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ToolResultCache(max_entries=2)
+    generations = cache._snapshot(("students",))
+    for key in ("a", "b"):
+        cache.put(key, ("students",), {"key": key}, generations)
+    cache.get("a")
+    cache.put("c", ("students",), {"key": "c"}, generations)
+    assert cache.get("b") is None
+    assert cache.get("a") == {"key": "a"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_always_calls_the_tool():
+    cache = ToolResultCache(ttl_seconds=0)
+    tool, calls = make_tool()
+    cached = cache.cached(tool, ("students",))
+
+    async def scenario():
+        await cached(1)
+        await cached(1)
+
+    asyncio.run(scenario())
+    assert not cache.enabled
+    assert len(calls) == 2
+
+
+def test_clear_drops_every_entry():
+    cache = ToolResultCache()
+    cache.put("a", ("students",), {"key": "a"}, cache._snapshot(("students",)))
+    cache.put("b", ("grades",), {"key": "b"}, cache._snapshot(("grades",)))
+    cache.clear()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from teacher_assistant.ws_outbound import (
+    KIND_AUDIO,
+    KIND_CONTROL,
+    KIND_MEDIA,
+    KIND_TEXT,
+    OutboundQueue,
+    OutboundQueueFull,
+)
+
+
+def drain(queue):
+    async def collect():
+        items = []
+        while len(queue):
+            kind, message, _ = await queue.get()
+            items.append((kind, message))
+        return items
+
+    return asyncio.run(collect())
+
+
+def test_text_partials_for_the_same_role_merge():
+    queue = OutboundQueue()
+    queue.put_text({"role": "model", "data": "Hel"})
+    queue.put_text({"role": "model", "data": "lo"})
+    queue.put_text({"role": "user", "data": "Hi"})
+    assert queue.stats()["coalesced"] == 1
+    assert drain(queue) == [
+        (KIND_TEXT, {"role": "model", "data": "Hello"}),
+        (KIND_TEXT, {"role": "user", "data": "Hi"}),
+    ]
+
+
+def test_text_merge_does_not_modify_the_callers_message():
+    queue = OutboundQueue()
+    first = {"role": "model", "data": "a"}
+    queue.put_text(first)
+    queue.put_text({"role": "model", "data": "b"})
+    assert first["data"] == "a"
+
+
+def test_oldest_audio_is_dropped_over_the_audio_budget():
+    queue = OutboundQueue(max_audio_bytes=10)
+    for chunk in (b"1111", b"2222", b"3333"):
+        queue.put_audio(chunk, "audio/pcm")
+    stats = queue.stats()
+    assert (stats["dropped_messages"], stats["dropped_bytes"]) == (1, 4)
+    assert stats["queued_audio_bytes"] == 8
+    assert [message[0] for _, message in drain(queue)] == [b"2222", b"3333"]
+
+
+def test_interruption_discards_queued_audio_only():
+    queue = OutboundQueue()
+    queue.put_audio(b"stale", "audio/pcm")
+    queue.put_text({"role": "model", "data": "kept"})
+    queue.put_control({"interrupted": True})
+    assert drain(queue) == [
+        (KIND_TEXT, {"role": "model", "data": "kept"}),
+        (KIND_CONTROL, {"interrupted": True}),
+    ]
+    assert queue.stats()["queued_audio_bytes"] == 0
+
+
+def test_audio_is_dropped_before_the_queue_overflows():
+    queue = OutboundQueue(max_items=3)
+    queue.put_audio(b"a", "audio/pcm")
+    queue.put_control({"turn_complete": True})
+    queue.put_media({"mime_type": "image/png"}, size=10)
+    queue.put_control({"turn_complete": True})
+    kinds = [kind for kind, _ in drain(queue)]
+    assert kinds == [KIND_CONTROL, KIND_MEDIA, KIND_CONTROL]
+
+
+def test_full_queue_of_undroppable_messages_raises():
+    queue = OutboundQueue(max_bytes=100)
+    queue.put_media({"mime_type": "image/png"}, size=60)
+    with pytest.raises(OutboundQueueFull):
+        queue.put_media({"mime_type": "image/png"}, size=60)
+
+
+def test_merged_text_counts_toward_the_byte_budget():
+    queue = OutboundQueue(max_bytes=10)
+    queue.put_text({"role": "model", "data": "12345"})
+    with pytest.raises(OutboundQueueFull):
+        queue.put_text({"role": "model", "data": "678901"})
+
+
+def test_get_releases_queued_bytes():
+    queue = OutboundQueue()
+    queue.put_audio(b"1234", "audio/pcm")
+    queue.put_text({"role": "model", "data": "hi"})
+    assert queue.stats()["queued_bytes"] == 6
+    drain(queue)
+    stats = queue.stats()
+    assert (stats["queued_bytes"], stats["queued_audio_bytes"], stats["depth"]) == (0, 0, 0)
+    assert (stats["enqueued"], stats["max_depth"]) == (2, 2)
+
+
+def test_get_waits_for_a_message():
+    async def scenario():
+        queue = OutboundQueue()
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        queue.put_audio(b"pcm", "audio/pcm;rate=24000")
+        kind, message, queued_ms = await asyncio.wait_for(waiter, 1)
+        return kind, message, queued_ms
+
+    kind, message, queued_ms = asyncio.run(scenario())
+    assert (kind, message) == (KIND_AUDIO, (b"pcm", "audio/pcm;rate=24000"))
+    assert queued_ms >= 0
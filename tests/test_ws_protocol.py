@@ -0,0 +1,50 @@
+import pytest
+
+from teacher_assistant.ws_protocol import (
+    FRAME_AUDIO_PCM,
+    FRAME_HEADER,
+    decode_frame,
+    encode_frame,
+    pcm_sample_rate,
+)
+
+
+def test_frame_round_trip():
+    payload = bytes(range(256)) * 4
+    frame = encode_frame(payload, 16000)
+    assert len(frame) == FRAME_HEADER.size + len(payload)
+    assert decode_frame(frame) == (FRAME_AUDIO_PCM, 16000, payload)
+
+
+def test_header_layout():
+    assert encode_frame(b"", 24000, kind=0x02) == b"\x01\x02\x5d\xc0"
+    assert decode_frame(b"\x01\x02\x5d\xc0") == (0x02, 24000, b"")
+
+
+def test_decode_rejects_short_frame():
+    with pytest.raises(ValueError, match="too short"):
+        decode_frame(b"\x01\x01\x3e")
+
+
+def test_decode_rejects_unknown_version():
+    frame = b"\x02" + encode_frame(b"pcm", 16000)[1:]
+    with pytest.raises(ValueError, match="version"):
+        decode_frame(frame)
+
+
+@pytest.mark.parametrize(
+    "mime_type, expected",
+    [
+        ("audio/pcm;rate=16000", 16000),
+        ("audio/pcm; rate=48000", 48000),
+        ("audio/pcm;channels=1;rate=22050", 22050),
+        ("audio/pcm", 24000),
+        ("audio/pcm;rate=fast", 24000),
+    ],
+)
+def test_pcm_sample_rate(mime_type, expected):
+    assert pcm_sample_rate(mime_type) == expected
+
+
+def test_pcm_sample_rate_default():
+    assert pcm_sample_rate("audio/pcm", default=8000) == 8000